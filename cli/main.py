@@ -0,0 +1,581 @@
+"""
+Interfaz de línea de comandos de PyLaragon, pensada para scripts y
+contenedores sin pantalla.
+
+Los servicios pertenecen al supervisor (services/supervisor.py): `start`
+lo ejecuta en primer plano, o en segundo plano con `--detach`, y el resto
+de órdenes son clientes de su socket de control. Cada orden importa sólo
+lo que necesita: `status`, `stop`, `reload`, `switch-php`, `logs`,
+`runtimes` y `bench` no cargan psutil, Tk ni cryptography.
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+
+# --- Utilidades ---
+
+def load_config(base_path):
+    """Lee services.json sin crearlo: las consultas no deben escribir nada."""
+    config_path = base_path / "config" / "services.json"
+    try:
+        with open(config_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {'apache_http_port': 80, 'apache_https_port': 443, 'mysql_port': 3306}
+
+
+def save_config(base_path, config):
+    config_path = base_path / "config" / "services.json"
+    config_path.parent.mkdir(exist_ok=True)
+    with open(config_path, 'w', encoding='utf-8') as f:
+        json.dump(config, f, indent=4, ensure_ascii=False)
+
+
+def installed_php_versions(base_path):
+    php_dir = base_path / "bin" / "php"
+    return sorted(d.name for d in php_dir.iterdir() if d.is_dir()) if php_dir.is_dir() else []
+
+
+def service_ports(base_path, config):
+    """
+    Puerto de cada servicio conocido. El pool FPM sigue la misma regla que
+    ServiceManager.get_fpm_manager: `php_fpm_port` más la posición de la
+    versión entre las instaladas.
+    """
+    ports = {'apache': config.get('apache_http_port', 80), 'mysql': config.get('mysql_port', 3306)}
+    if config.get('php_mode', 'mod_php') == 'fpm':
+        installed = installed_php_versions(base_path)
+        version = config.get('php_version', '')
+        offset = installed.index(version) if version in installed else len(installed)
+        ports['php_fpm'] = config.get('php_fpm_port', 9000) + offset
+    from services.cache_services import create_services
+
+    for name, service in create_services(base_path / "bin", config).items():
+        ports[name] = service.port
+    return ports
+
+
+def emit(args, data, lines):
+    """Escribe `data` como JSON con --json, si no las líneas de texto."""
+    out = args.out
+    if args.json:
+        out.write(json.dumps(data, ensure_ascii=False, default=str) + "\n")
+    else:
+        for line in lines:
+            out.write(line + "\n")
+    out.flush()
+
+
+def call_supervisor(base_path, method, **params):
+    """Resultado de `method` en el supervisor, o ConnectionError si no está en marcha."""
+    from services.supervisor_client import SupervisorClient
+
+    with SupervisorClient(base_path).connect(timeout=0.5) as client:
+        return client.call(method, **params)
+
+
+def not_running(args):
+    emit(args, {'ok': False, 'error': "PyLaragon no está en marcha"}, ["⚠️ PyLaragon no está en marcha."])
+    return 1
+
+
+def result_lines(results):
+    return [f"{'✅' if r['ok'] else '❌'} {name} ({r['seconds']:.2f} s)" for name, r in results.items()]
+
+
+# --- Órdenes ---
+
+def cmd_status(args, base_path):
+    try:
+        status = call_supervisor(base_path, 'status')
+    except ConnectionError:
+        status = None
+
+    if status is not None:
+        services = status['services']
+        lines = [
+            f"{'🟢' if s['running'] else '🔴'} {name:<16} pid {s['pid'] or '-':<8} "
+            f"activo {int(s['uptime'] or 0)} s"
+            for name, s in services.items()
+        ]
+        for key, (original, port) in status.get('port_overrides', {}).items():
+            lines.append(f"🔧 {key}: {port} (ocupado el {original} de services.json)")
+        lines.append(f"Supervisor: pid {status['pid']}, PHP {status['php_version']}")
+        watch = status.get('watch') or {}
+        if watch.get('watching'):
+            latency = watch['latency']
+            applied = f", p50 {latency['p50'] * 1000:.0f} ms" if latency['batches'] else ""
+            lines.append(f"Vigilancia: {watch['backend']}, {latency['batches']} lotes{applied}")
+        emit(args, {'supervisor': True, **status}, lines)
+        return 0
+
+    # Sin supervisor sólo se sabe si algo atiende en cada puerto.
+    from services.readiness import tcp_probe
+
+    services = {}
+    for name, port in service_ports(base_path, load_config(base_path)).items():
+        services[name] = {'running': tcp_probe('127.0.0.1', port, timeout=0.3), 'port': port, 'pid': None}
+    lines = [f"{'🟢' if s['running'] else '🔴'} {name:<16} puerto {s['port']}" for name, s in services.items()]
+    lines.append("Supervisor: no está en marcha")
+    emit(args, {'supervisor': False, 'services': services}, lines)
+    return 0
+
+
+def cmd_start(args, base_path):
+    from services.supervisor_client import is_running, spawn_daemon
+
+    services = args.services or None
+    if args.detach or is_running(base_path):
+        if not spawn_daemon(base_path):
+            emit(args, {'ok': False, 'error': "el supervisor no arrancó"},
+                 ["❌ El supervisor no arrancó; revisa logs/supervisor.log."])
+            return 1
+        results = call_supervisor(base_path, 'start', services=services)
+        ok = all(r['ok'] for r in results.values())
+        emit(args, {'ok': ok, 'services': results}, result_lines(results))
+        return 0 if ok else 1
+
+    # En primer plano este proceso es el supervisor hasta Ctrl+C, SIGTERM o `stop`.
+    from services.supervisor import Supervisor
+
+    Supervisor(base_path).serve_forever(start_services=args.services)
+    return 0
+
+
+def cmd_stop(args, base_path):
+    try:
+        if args.services:
+            results = call_supervisor(base_path, 'stop', services=args.services)
+            ok = all(r['ok'] for r in results.values())
+            emit(args, {'ok': ok, 'services': results}, result_lines(results))
+            return 0 if ok else 1
+        call_supervisor(base_path, 'shutdown')
+    except ConnectionError:
+        return not_running(args)
+
+    from services.supervisor_client import is_running
+
+    deadline = time.monotonic() + args.timeout
+    while is_running(base_path) and time.monotonic() < deadline:
+        time.sleep(0.1)
+    stopped = not is_running(base_path)
+    emit(args, {'ok': stopped}, ["🛑 PyLaragon detenido." if stopped else "❌ El supervisor no terminó a tiempo."])
+    return 0 if stopped else 1
+
+
+def cmd_restart(args, base_path):
+    try:
+        results = call_supervisor(base_path, 'restart', services=args.services or None)
+    except ConnectionError:
+        args.detach = True
+        return cmd_start(args, base_path)
+    ok = all(r['ok'] for r in results['start'].values())
+    emit(args, {'ok': ok, **results}, result_lines(results['start']))
+    return 0 if ok else 1
+
+
+def cmd_reload(args, base_path):
+    try:
+        results = call_supervisor(base_path, 'reload', services=args.services or None)
+    except ConnectionError:
+        return not_running(args)
+    ok = all(r['ok'] for r in results)
+    emit(args, {'ok': ok, 'results': results},
+         [f"🔄 {r['service']}: {r['action']} ({'ok' if r['ok'] else r['error']})" for r in results])
+    return 0 if ok else 1
+
+
+def cmd_switch_php(args, base_path):
+    installed = installed_php_versions(base_path)
+    if args.version not in installed:
+        emit(args, {'ok': False, 'error': f"PHP {args.version} no está instalado", 'installed': installed},
+             [f"❌ PHP {args.version} no está instalado. Disponibles: {', '.join(installed) or 'ninguna'}"])
+        return 1
+
+    try:
+        result = call_supervisor(base_path, 'switch_php', version=args.version)
+    except ConnectionError:
+        # Sin supervisor basta con guardar la versión para el próximo arranque.
+        config = load_config(base_path)
+        config['php_version'] = args.version
+        save_config(base_path, config)
+        result = None
+    ok = result is None or result['ok']
+    emit(args, {'ok': ok, 'version': args.version, 'reload': result},
+         [f"{'✅' if ok else '❌'} PHP {args.version} seleccionado."])
+    return 0 if ok else 1
+
+
+def tail_lines(path, count):
+    """Últimas `count` líneas de `path` leyendo desde el final por bloques."""
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        data = b""
+        while position > 0 and data.count(b"\n") <= count:
+            size = min(65536, position)
+            position -= size
+            f.seek(position)
+            data = f.read(size) + data
+    lines = data.decode('utf-8', 'replace').splitlines()
+    return lines[-count:] if count else []
+
+
+def cmd_logs(args, base_path):
+    path = base_path / "logs" / f"{args.service}.log"
+
+    def show(line):
+        emit(args, {'service': args.service, 'line': line}, [line])
+
+    if path.exists():
+        for line in tail_lines(path, args.lines):
+            show(line)
+    elif not args.follow:
+        emit(args, {'service': args.service, 'error': "sin log"}, [f"⚠️ No hay log para {args.service}."])
+        return 1
+    if not args.follow:
+        return 0
+
+    # Seguimiento por sondeo: si el archivo rota (cambia de inodo o encoge) se
+    # abre el nuevo y se lee desde el principio.
+    f, inode, partial = None, None, b""
+    from_start = not path.exists()
+    try:
+        while True:
+            if f is None and path.exists():
+                f = open(path, 'rb')
+                inode = os.fstat(f.fileno()).st_ino
+                if not from_start:
+                    f.seek(0, os.SEEK_END)
+            if f is None:
+                time.sleep(0.25)
+                continue
+            chunk = f.read()
+            if chunk:
+                *complete, partial = (partial + chunk).split(b"\n")
+                for line in complete:
+                    show(line.decode('utf-8', 'replace'))
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                stat = None
+            if stat is None or stat.st_ino != inode or stat.st_size < f.tell():
+                f.close()
+                f, from_start = None, True
+                continue
+            time.sleep(0.25)
+    except KeyboardInterrupt:
+        return 0
+    finally:
+        if f is not None:
+            f.close()
+
+
+def cmd_runtimes(args, base_path):
+    try:
+        manifest = call_supervisor(base_path, 'runtimes', refresh=args.refresh)
+    except ConnectionError:
+        # El índice es un archivo en run/: sin supervisor se consulta aquí.
+        from services.runtime_registry import RuntimeRegistry
+
+        registry = RuntimeRegistry(base_path / "bin", base_path / "run" / "runtimes.json")
+        manifest = registry.refresh(force=args.refresh)
+
+    lines = []
+    for folder, php in sorted(manifest['php'].items()):
+        build = {True: "ZTS", False: "NTS"}.get(php['zts'], "?")
+        handlers = [name for name, key in (("mod_php", 'apache_module'), ("fpm", 'fpm')) if php[key]]
+        note = "" if php['executable'] else " (no ejecutable aquí)"
+        lines.append(
+            f"🐘 PHP {php['version']:<10} {folder:<10} {build}  {', '.join(handlers) or 'sin módulo ni fpm'}, "
+            f"{len(php['shared_extensions'])} extensiones{note}"
+        )
+    for kind, label in (('apache', "Apache"), ('mysql', "MySQL")):
+        entry = manifest.get(kind)
+        if entry and entry['executable']:
+            lines.append(f"✅ {label} {entry['version'] or '(versión desconocida)'}")
+        else:
+            lines.append(f"❌ {label} no instalado en bin/{kind}")
+    emit(args, manifest, lines)
+    return 0
+
+
+def cmd_assets(args, base_path):
+    method, params = ('clean_assets', {}) if args.clean else ('build_assets', {'force': args.force})
+    try:
+        result = call_supervisor(base_path, method, **params)
+    except ConnectionError:
+        # Sin supervisor la pasada se hace aquí mismo sobre www/.
+        from services.asset_pipeline import AssetPipeline
+
+        config = load_config(base_path)
+        pipeline = AssetPipeline(
+            base_path / "www", base_path / "run" / "assets.json",
+            workers=config.get('asset_workers'), use_brotli=config.get('asset_brotli', True),
+        )
+        result = pipeline.clean() if args.clean else pipeline.build(args.force)
+
+    if args.clean:
+        emit(args, {'ok': True, 'removed': result}, [f"🧹 Variantes de {result} recursos eliminadas."])
+        return 0
+    lines = [
+        f"✅ {len(result['compressed'])} comprimidos, {result['unchanged']} sin cambios, "
+        f"{len(result['removed'])} eliminados, {result['saved_bytes'] // 1024} KB ahorrados ({result['seconds']:.2f} s)"
+    ]
+    lines += [f"❌ {path}: {error}" for path, error in result['errors'].items()]
+    emit(args, {'ok': not result['errors'], **result}, lines)
+    return 0 if not result['errors'] else 1
+
+
+def cmd_metrics(args, base_path):
+    try:
+        exported = call_supervisor(base_path, 'export_metrics', fmt=args.format)
+    except ConnectionError:
+        return not_running(args)
+    # Ya viene serializado (texto de Prometheus o JSON): se escribe tal cual.
+    args.out.write(exported if exported.endswith("\n") else exported + "\n")
+    args.out.flush()
+    return 0
+
+
+def cmd_db_list(args, base_path):
+    try:
+        snapshots = call_supervisor(base_path, 'db_snapshots', database=args.database)
+    except ConnectionError:
+        # Las instantáneas son carpetas en snapshots/: para listarlas no hace falta MySQL.
+        from services.db_snapshot import SnapshotManager
+
+        snapshots = SnapshotManager(None, {}, base_path / "snapshots").list_snapshots(args.database)
+    lines = [f"📸 {s['database']}/{s['name']}  {s['created']}  {s['tables']} tabla(s)" for s in snapshots]
+    emit(args, snapshots, lines or ["⚠️ No hay instantáneas guardadas."])
+    return 0
+
+
+def snapshot_lines(result, done):
+    if result['ok']:
+        return [done]
+    errors = result.get('errors') or {'mysql': result.get('error')}
+    return [f"❌ {key}: {error}" for key, error in errors.items()]
+
+
+def cmd_db_snapshot(args, base_path):
+    try:
+        result = call_supervisor(base_path, 'db_snapshot', database=args.database, name=args.name)
+    except ConnectionError:
+        return not_running(args)
+    emit(args, result, snapshot_lines(
+        result, f"✅ Instantánea {args.database}/{result['name']} en {result['seconds']:.1f} s."))
+    return 0 if result['ok'] else 1
+
+
+def cmd_db_restore(args, base_path):
+    try:
+        result = call_supervisor(base_path, 'db_restore', database=args.database, name=args.name, target=args.target)
+    except ConnectionError:
+        return not_running(args)
+    emit(args, result, snapshot_lines(
+        result, f"✅ {args.target or args.database} restaurada en {result['seconds']:.1f} s."))
+    return 0 if result['ok'] else 1
+
+
+def cmd_db_reset(args, base_path):
+    try:
+        result = call_supervisor(base_path, 'db_reset')
+    except ConnectionError:
+        return not_running(args)
+    emit(args, result, snapshot_lines(result, f"✅ Datos de MySQL restablecidos en {result['seconds']:.1f} s."))
+    return 0 if result['ok'] else 1
+
+
+def format_latency(latency):
+    keys = ('p50', 'p90', 'p99', 'p99.9', 'max')
+    return "  ".join(f"{key} {latency[key]:.2f}" for key in keys if key in latency)
+
+
+def cmd_bench_run(args, base_path):
+    from services.benchmark import BenchmarkStore, run_benchmark
+
+    try:
+        status = call_supervisor(base_path, 'status')
+        tags = call_supervisor(base_path, 'benchmark_tags')
+    except ConnectionError:
+        return not_running(args)
+    if not status['services'].get('apache', {}).get('running'):
+        emit(args, {'ok': False, 'error': "Apache no está en ejecución"}, ["❌ Apache no está en ejecución."])
+        return 1
+
+    # La carga se genera en este proceso, no en el supervisor, para no
+    # competir con él por la CPU mientras atiende a los servicios.
+    ports = status['ports']['apache']
+    port = ports['apache_https_port' if args.https else 'apache_http_port']
+    result = run_benchmark(
+        '127.0.0.1', port, args.paths or ['/'], concurrency=args.concurrency,
+        duration=args.duration, requests=args.requests, rate=args.rate,
+        warmup=args.warmup, https=args.https, host_header=args.host,
+    )
+    result['tags'] = tags
+    name = BenchmarkStore(base_path / "benchmarks").save(result, args.label)
+    summary = result['summary']
+    lines = [
+        f"{'✅' if not summary['errors'] else '⚠️'} {summary['requests']} peticiones en {summary['seconds']:.1f} s: "
+        f"{summary['throughput']:.1f}/s, {summary['error_rate'] * 100:.2f} % errores",
+        f"   latencia ms: {format_latency(result['latency_ms'])}",
+        f"   PHP {tags['php_version']} ({tags['php_mode']}), configuración {tags['config_hash']}",
+        f"   guardado como {name}",
+    ]
+    emit(args, {'ok': True, **result}, lines)
+    return 0
+
+
+def cmd_bench_list(args, base_path):
+    from services.benchmark import BenchmarkStore
+
+    runs = BenchmarkStore(base_path / "benchmarks").list()
+    lines = [
+        f"{r['name']:<32} PHP {r['php_version'] or '-':<6} {r['config_hash'] or '-':<16} "
+        f"{r['throughput']:>9.1f}/s  p99 {r['p99'] or 0:.2f} ms"
+        for r in runs
+    ]
+    emit(args, runs, lines or ["⚠️ No hay resultados guardados."])
+    return 0
+
+
+def cmd_bench_compare(args, base_path):
+    from services.benchmark import BenchmarkStore
+
+    try:
+        diff = BenchmarkStore(base_path / "benchmarks").compare(args.a, args.b)
+    except (LookupError, OSError) as e:
+        emit(args, {'ok': False, 'error': str(e)}, [f"❌ {e}"])
+        return 1
+    lines = [f"{diff['a']} → {diff['b']}"]
+    for key, change in diff['tags'].items():
+        lines.append(f"   {key}: {change['a']} → {change['b']}")
+    for name, change in diff['metrics'].items():
+        if change['delta'] is None:
+            continue
+        lines.append(
+            f"   {name:<11} {change['a']:>10.2f} → {change['b']:>10.2f}  "
+            f"({change['percent']:+.1f} %) {change['verdict']}"
+        )
+    emit(args, diff, lines)
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="pylaragon-cli", description="Controla PyLaragon sin interfaz gráfica.")
+    parser.add_argument("--json", action="store_true", help="salida en JSON para scripts")
+    parser.add_argument("--base", default=".", help="directorio de PyLaragon (por defecto el actual)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    start = commands.add_parser("start", help="inicia el supervisor y los servicios (en primer plano)")
+    start.add_argument("services", nargs="*")
+    start.add_argument("-d", "--detach", action="store_true", help="supervisor en segundo plano")
+    start.set_defaults(func=cmd_start)
+
+    stop = commands.add_parser("stop", help="detiene los servicios indicados, o todo y el supervisor")
+    stop.add_argument("services", nargs="*")
+    stop.add_argument("--timeout", type=float, default=15.0)
+    stop.set_defaults(func=cmd_stop)
+
+    restart = commands.add_parser("restart", help="reinicia los servicios")
+    restart.add_argument("services", nargs="*")
+    restart.set_defaults(func=cmd_restart)
+
+    status = commands.add_parser("status", help="estado de cada servicio según su puerto")
+    status.set_defaults(func=cmd_status)
+
+    reload_ = commands.add_parser("reload", help="aplica services.json sin cortar conexiones")
+    reload_.add_argument("services", nargs="*")
+    reload_.set_defaults(func=cmd_reload)
+
+    switch = commands.add_parser("switch-php", help="cambia la versión de PHP")
+    switch.add_argument("version")
+    switch.set_defaults(func=cmd_switch_php)
+
+    logs = commands.add_parser("logs", help="muestra el log de un servicio")
+    logs.add_argument("service")
+    logs.add_argument("-n", "--lines", type=int, default=100)
+    logs.add_argument("-f", "--follow", action="store_true")
+    logs.set_defaults(func=cmd_logs)
+
+    runtimes = commands.add_parser("runtimes", help="PHP, Apache y MySQL instalados en bin/ y sus capacidades")
+    runtimes.add_argument("--refresh", action="store_true", help="vuelve a sondear aunque nada haya cambiado")
+    runtimes.set_defaults(func=cmd_runtimes)
+
+    assets = commands.add_parser("assets", help="precomprime los recursos estáticos de www/ (.br/.gz)")
+    assets.add_argument("--force", action="store_true", help="recomprime todo aunque no haya cambiado")
+    assets.add_argument("--clean", action="store_true", help="borra las variantes generadas")
+    assets.set_defaults(func=cmd_assets)
+
+    metrics = commands.add_parser("metrics", help="última muestra de CPU, memoria y sockets por servicio")
+    metrics.add_argument("--format", choices=("json", "prometheus"), default="json")
+    metrics.set_defaults(func=cmd_metrics)
+
+    db = commands.add_parser("db", help="instantáneas y restablecimiento de MySQL")
+    db_commands = db.add_subparsers(dest="db_command", required=True)
+    db_list = db_commands.add_parser("list", help="instantáneas guardadas")
+    db_list.add_argument("database", nargs="?")
+    db_list.set_defaults(func=cmd_db_list)
+    db_snapshot = db_commands.add_parser("snapshot", help="toma una instantánea de una base de datos")
+    db_snapshot.add_argument("database")
+    db_snapshot.add_argument("--name", help="nombre de la instantánea (por defecto la fecha)")
+    db_snapshot.set_defaults(func=cmd_db_snapshot)
+    db_restore = db_commands.add_parser("restore", help="restaura una instantánea")
+    db_restore.add_argument("database")
+    db_restore.add_argument("name")
+    db_restore.add_argument("--target", help="base de datos de destino (por defecto la original)")
+    db_restore.set_defaults(func=cmd_db_restore)
+    db_reset = db_commands.add_parser("reset", help="deja los datos de MySQL como recién instalados")
+    db_reset.set_defaults(func=cmd_db_reset)
+
+    bench = commands.add_parser("bench", help="mide Apache/PHP con carga HTTP local")
+    bench_commands = bench.add_subparsers(dest="bench_command", required=True)
+    run = bench_commands.add_parser("run", help="lanza la carga y guarda el resultado")
+    run.add_argument("paths", nargs="*", help="rutas de www/ (por defecto /)")
+    run.add_argument("-c", "--concurrency", type=int, default=10)
+    run.add_argument("-d", "--duration", type=float, default=10.0, help="segundos de medición")
+    run.add_argument("-n", "--requests", type=int, help="número fijo de peticiones en vez de duración")
+    run.add_argument("--rate", type=float, help="peticiones/s constantes (corrige la omisión coordinada)")
+    run.add_argument("--warmup", type=float, default=1.0)
+    run.add_argument("--https", action="store_true")
+    run.add_argument("--host", default="localhost", help="cabecera Host (hosts virtuales)")
+    run.add_argument("--label", help="etiqueta para el nombre del resultado")
+    run.set_defaults(func=cmd_bench_run)
+    listing = bench_commands.add_parser("list", help="resultados guardados")
+    listing.set_defaults(func=cmd_bench_list)
+    compare = bench_commands.add_parser("compare", help="diferencias entre dos resultados (o latest/previous)")
+    compare.add_argument("a")
+    compare.add_argument("b")
+    compare.set_defaults(func=cmd_bench_compare)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.out = sys.stdout
+    base_path = Path(args.base).resolve()
+    # Con --json los mensajes de los gestores van a stderr y stdout sólo
+    # lleva JSON.
+    redirect = contextlib.redirect_stdout(sys.stderr) if args.json else contextlib.nullcontext()
+    from services.supervisor_client import SupervisorError
+
+    with redirect:
+        try:
+            return args.func(args, base_path)
+        except SupervisorError as e:
+            # El supervisor está en marcha pero rechazó la orden (p. ej. services.json no válido).
+            emit(args, {'ok': False, 'error': str(e), 'code': e.code}, [f"❌ {e}"])
+            return 1
+
+
+if __name__ == "__main__":
+    # Ejecutado como `python cli/main.py`: los paquetes están en el directorio padre.
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    sys.exit(main())
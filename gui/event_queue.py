@@ -0,0 +1,32 @@
+import threading
+
+
+class CoalescingQueue:
+    """
+    Cola entre los hilos de trabajo y el hilo de Tk.
+
+    Los hilos publican con put(clave, valor) y la GUI la vacía a ritmo fijo
+    con drain(). Si entre dos vaciados llegan varios eventos con la misma
+    clave (p. ej. ('status', 'apache')) sólo se aplica el último: una ráfaga
+    de cambios cuesta una actualización de widgets, no una por evento.
+    Los eventos que no deben fusionarse llevan una clave única.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+        self.received = 0
+        self.coalesced = 0
+
+    def put(self, key, value=None):
+        with self._lock:
+            if key in self._pending:
+                self.coalesced += 1
+            self._pending[key] = value
+            self.received += 1
+
+    def drain(self):
+        """Eventos pendientes en orden de llegada (de la primera vez que apareció cada clave)."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        return list(pending.items())
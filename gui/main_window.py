@@ -1,14 +1,41 @@
+import itertools
+import time
 import tkinter as tk
 from tkinter import ttk, messagebox, Menu
-import threading
+from concurrent.futures import ThreadPoolExecutor
+from .event_queue import CoalescingQueue
+
+# Cada cuánto se vacía la cola de eventos (≈10 fotogramas por segundo) y
+# cada cuánto se pide una muestra nueva para el panel.
+FRAME_MS = 100
+DASHBOARD_MS = 2000
+DASHBOARD_COLUMNS = (
+    ("state", "Estado", 80),
+    ("pid", "PID", 70),
+    ("uptime", "Activo", 80),
+    ("cpu", "CPU %", 70),
+    ("rss", "RSS MB", 80),
+    ("rate", "Pet./s", 70),
+)
 
 class LaragonCloneGUI:
     def __init__(self, service_manager):
         self.root = tk.Tk()
         self.root.title("PyLaragon - Entorno de Desarrollo")
-        self.root.geometry("600x400")
+        self.root.geometry("720x560")
         
         self.service_manager = service_manager
+        # Los hilos nunca tocan widgets: publican en la cola y el hilo de Tk
+        # la vacía cada FRAME_MS. Las operaciones largas van al ejecutor.
+        self.events = CoalescingQueue()
+        self.executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="gui-worker")
+        self.tasks = {}
+        self._task_ids = itertools.count(1)
+        self._dashboard_busy = False
+        self._dashboard_values = {}
+        self._running = {}
+        self._last_task_text = ""
+        self._progress_running = False
         self.service_manager.set_status_callback(self.update_service_status_from_thread)
 
         self.service_buttons = {}
@@ -16,6 +43,7 @@ class LaragonCloneGUI:
         
         self.setup_ui()
         self.update_all_statuses()
+        self.root.after(FRAME_MS, self.drain_events)
 
     def setup_ui(self):
         # Crear menú
@@ -46,7 +74,7 @@ class LaragonCloneGUI:
         services_frame.grid(row=0, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=5)
 
         # Renderizar servicios dinámicamente
-        services = ['apache', 'mysql']
+        services = list(self.service_manager.processes)
         for i, service_name in enumerate(services):
             ttk.Label(services_frame, text=f"{service_name.capitalize()}:").grid(row=i, column=0, sticky=tk.W)
             
@@ -67,19 +95,159 @@ class LaragonCloneGUI:
         ttk.Button(config_frame, text="Gestionar Hosts Virtuales", 
                   command=self.manage_vhosts).grid(row=0, column=1, padx=5)
 
+        # Panel: una fila fija por servicio que sólo se reescribe si cambia.
+        dashboard_frame = ttk.LabelFrame(main_frame, text="Panel", padding="10")
+        dashboard_frame.grid(row=2, column=0, columnspan=2, sticky=(tk.W, tk.E, tk.N, tk.S), pady=5)
+        self.dashboard = ttk.Treeview(
+            dashboard_frame, columns=[c[0] for c in DASHBOARD_COLUMNS], show="tree headings", height=5,
+        )
+        self.dashboard.heading("#0", text="Servicio")
+        self.dashboard.column("#0", width=120)
+        for column, title, width in DASHBOARD_COLUMNS:
+            self.dashboard.heading(column, text=title)
+            self.dashboard.column(column, width=width, anchor=tk.E)
+        self.dashboard.pack(fill=tk.BOTH, expand=True)
+        for service_name in services:
+            self.dashboard.insert("", tk.END, iid=service_name, text=service_name)
+
+        # Barra de estado con las tareas en curso.
+        status_bar = ttk.Frame(main_frame)
+        status_bar.grid(row=3, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(5, 0))
+        self.task_text = tk.StringVar(value="Listo.")
+        ttk.Label(status_bar, textvariable=self.task_text).pack(side=tk.LEFT)
+        self.progress = ttk.Progressbar(status_bar, mode="indeterminate", length=120)
+        self.progress.pack(side=tk.RIGHT)
+
+        self.root.columnconfigure(0, weight=1)
+        self.root.rowconfigure(0, weight=1)
+        main_frame.columnconfigure(0, weight=1)
+        main_frame.rowconfigure(2, weight=1)
+
+    # --- Cola de eventos y tareas ---
+
+    def drain_events(self):
+        """Aplica de una vez lo que publicaron los hilos desde el último fotograma."""
+        try:
+            for key, value in self.events.drain():
+                kind = key[0]
+                if kind == 'status':
+                    self.update_service_status(key[1], value)
+                elif kind == 'dashboard':
+                    self.update_dashboard(value)
+                elif kind == 'task':
+                    self.finish_task(key[1], value)
+            self.update_task_progress()
+        finally:
+            self.root.after(FRAME_MS, self.drain_events)
+
+    def run_task(self, label, function, *args, on_done=None):
+        """
+        Ejecuta `function(*args)` en el ejecutor sin bloquear la ventana. Al
+        terminar, `on_done(resultado)` se llama en el hilo de Tk; si falla se
+        muestra el error.
+        """
+        task_id = next(self._task_ids)
+        self.tasks[task_id] = (label, time.monotonic(), on_done)
+        future = self.executor.submit(function, *args)
+        future.add_done_callback(lambda f: self.events.put(('task', task_id), f))
+        self.update_task_progress()
+        return task_id
+
+    def finish_task(self, task_id, future):
+        label, started, on_done = self.tasks.pop(task_id)
+        elapsed = time.monotonic() - started
+        error = future.exception()
+        if error is not None:
+            self.task_text.set(f"❌ {label}: {error}")
+            messagebox.showerror("PyLaragon", f"{label}:\n{error}")
+        else:
+            self.task_text.set(f"✅ {label} ({elapsed:.1f} s)")
+            if on_done:
+                on_done(future.result())
+        self._last_task_text = ""
+
+    def update_task_progress(self):
+        if not self.tasks:
+            if self._progress_running:
+                self.progress.stop()
+                self._progress_running = False
+            return
+        label, started, _ = min(self.tasks.values(), key=lambda t: t[1])
+        others = f" (+{len(self.tasks) - 1})" if len(self.tasks) > 1 else ""
+        text = f"⏳ {label}... {int(time.monotonic() - started)} s{others}"
+        if not self._progress_running:
+            self.progress.start(15)
+            self._progress_running = True
+        # Sólo se toca el widget cuando cambia el texto (una vez por segundo).
+        if text != self._last_task_text:
+            self.task_text.set(text)
+            self._last_task_text = text
+
+    # --- Panel ---
+
+    def poll_dashboard(self):
+        """Pide una muestra en segundo plano; nunca hay dos consultas a la vez."""
+        if not self._dashboard_busy:
+            self._dashboard_busy = True
+            self.executor.submit(self._fetch_dashboard)
+        self.root.after(DASHBOARD_MS, self.poll_dashboard)
+
+    def _fetch_dashboard(self):
+        try:
+            self.events.put(('dashboard',), self.service_manager.get_dashboard())
+        except Exception as e:
+            print(f"⚠️ No se pudo actualizar el panel: {e}")
+        finally:
+            self._dashboard_busy = False
+
+    def update_dashboard(self, rows):
+        for service_name, row in rows.items():
+            values = self.format_dashboard_row(row)
+            if not self.dashboard.exists(service_name):
+                self.dashboard.insert("", tk.END, iid=service_name, text=service_name)
+            if self._dashboard_values.get(service_name) != values:
+                self.dashboard.item(service_name, values=values)
+                self._dashboard_values[service_name] = values
+            self.update_service_status(service_name, row['running'])
+
+    @staticmethod
+    def format_dashboard_row(row):
+        def number(value, fmt):
+            return "-" if value is None else format(value, fmt)
+
+        uptime = "-"
+        if row['uptime'] is not None:
+            seconds = int(row['uptime'])
+            uptime = f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+        return (
+            "Corriendo" if row['running'] else "Detenido",
+            row['pid'] or "-",
+            uptime,
+            number(row['cpu_percent'], ".1f"),
+            number(row['rss'] / (1024 * 1024) if row['rss'] is not None else None, ".1f"),
+            number(row['requests_per_sec'], ".1f"),
+        )
+
+    # --- Acciones ---
+
     def on_php_version_change(self):
         new_version = self.php_version_var.get()
-        threading.Thread(target=self.service_manager.switch_php_version, args=(new_version,), daemon=True).start()
+        self.run_task(f"Cambiando a PHP {new_version}", self.service_manager.switch_php_version, new_version)
 
     def toggle_service(self, service_name):
-        """Alterna el estado de un servicio en un hilo separado."""
-        if self.service_manager.get_service_status(service_name):
-            threading.Thread(target=self.service_manager.stop_service, args=(service_name,), daemon=True).start()
+        """Alterna el estado de un servicio en el ejecutor, según el último estado conocido."""
+        if self._running.get(service_name):
+            self.run_task(f"Deteniendo {service_name}", self.service_manager.stop_service, service_name)
         else:
-            threading.Thread(target=self.service_manager.start_service, args=(service_name,), daemon=True).start()
+            self.run_task(f"Iniciando {service_name}", self.service_manager.start_service, service_name)
 
     def update_service_status(self, service_name, is_running):
-        """Actualiza la GUI para un servicio específico."""
+        """Actualiza la GUI para un servicio específico (sólo si cambió)."""
+        is_running = bool(is_running)
+        if self._running.get(service_name) == is_running or service_name not in self.status_labels:
+            self._running[service_name] = is_running
+            return
+        self._running[service_name] = is_running
         status_label = self.status_labels[service_name]
         button = self.service_buttons[service_name]
         
@@ -91,36 +259,96 @@ class LaragonCloneGUI:
             button.config(text="Iniciar")
 
     def update_all_statuses(self):
-        """Actualiza el estado de todos los servicios al iniciar."""
-        for service_name in self.service_buttons.keys():
-            is_running = self.service_manager.get_service_status(service_name)
-            self.update_service_status(service_name, is_running)
+        """Estado inicial de todos los servicios: lo trae la primera muestra del panel."""
+        self.poll_dashboard()
 
     def update_service_status_from_thread(self, service_name, is_running):
         """Método seguro para ser llamado desde otros hilos."""
-        self.root.after(0, self.update_service_status, service_name, is_running)
+        self.events.put(('status', service_name), is_running)
 
     def setup_ssl(self):
-        """Genera un certificado SSL."""
+        """Genera un certificado SSL sin bloquear la ventana."""
         # Esta función podría abrir una nueva ventana para pedir un dominio
         domain = "localhost" # Por ahora, lo dejamos fijo
-        success = self.service_manager.ssl_manager.generate_self_signed_cert(domain)
-        if success:
-            messagebox.showinfo("SSL", f"Certificado SSL generado para '{domain}'.\nReinicia Apache para aplicarlo.")
-        else:
-            messagebox.showerror("Error SSL", "No se pudo generar el certificado SSL.")
+
+        def done(success):
+            if success:
+                messagebox.showinfo("SSL", f"Certificado SSL generado para '{domain}'.\nReinicia Apache para aplicarlo.")
+            else:
+                messagebox.showerror("Error SSL", "No se pudo generar el certificado SSL.")
+
+        self.run_task(f"Generando certificado SSL para {domain}", self.service_manager.generate_ssl_cert, domain, on_done=done)
             
     def manage_vhosts(self):
         """Abre ventana de gestión de hosts virtuales."""
-        messagebox.showinfo("En desarrollo", "La gestión de Virtual Hosts aún está en desarrollo.")
+        window = tk.Toplevel(self.root)
+        window.title("Hosts Virtuales")
+        window.geometry("640x320")
+
+        columns = ("server_name", "document_root")
+        tree = ttk.Treeview(window, columns=columns, show="tree headings")
+        tree.heading("#0", text="Sitio")
+        tree.heading("server_name", text="Dominio")
+        tree.heading("document_root", text="Carpeta")
+        tree.column("#0", width=120)
+        tree.column("server_name", width=160)
+        tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+        def fill(sites):
+            if not window.winfo_exists():
+                return
+            tree.delete(*tree.get_children())
+            for name, site in sorted(sites.items()):
+                tree.insert("", tk.END, text=name, values=(site['server_name'], site['document_root']))
+
+        def refresh():
+            self.run_task("Leyendo hosts virtuales", self.service_manager.get_vhosts, on_done=fill)
+
+        def synced(summary):
+            refresh()
+            if window.winfo_exists():
+                messagebox.showinfo(
+                    "Hosts Virtuales",
+                    f"{len(summary['added'])} nuevos, {len(summary['updated'])} actualizados, "
+                    f"{len(summary['removed'])} eliminados.",
+                    parent=window,
+                )
+
+        def sync():
+            self.run_task("Sincronizando hosts virtuales", self.service_manager.sync_vhosts, on_done=synced)
+
+        ttk.Button(window, text="Sincronizar con www/", command=sync).pack(pady=(0, 10))
+        refresh()
 
     def on_closing(self):
-        """Asegura que todos los servicios se detengan al cerrar."""
-        if messagebox.askokcancel("Salir", "¿Quieres detener todos los servicios y salir?"):
-            print("🛑 Deteniendo todos los servicios antes de salir...")
-            for service_name in self.service_buttons.keys():
-                self.service_manager.stop_service(service_name)
-            self.root.destroy()
+        """Al cerrar, detiene los servicios o (con supervisor) permite dejarlos en marcha."""
+        if not getattr(self.service_manager, 'remote', False):
+            if messagebox.askokcancel("Salir", "¿Quieres detener todos los servicios y salir?"):
+                self.stop_all_and_close()
+            return
+
+        answer = messagebox.askyesnocancel(
+            "Salir", "¿Detener también los servicios?\n\nSi eliges «No» seguirán en marcha en segundo plano."
+        )
+        if answer is None:
+            return
+        if answer:
+            self.stop_all_and_close()
+        else:
+            self.close()
+
+    def stop_all_and_close(self):
+        # La ventana sigue respondiendo (y mostrando el progreso) mientras se detienen.
+        print("🛑 Deteniendo todos los servicios antes de salir...")
+        self.run_task(
+            "Deteniendo todos los servicios",
+            self.service_manager.stop_all, list(self.service_buttons.keys()),
+            on_done=lambda _: self.close(),
+        )
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.root.destroy()
 
     def run(self):
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
@@ -1,7 +1,8 @@
+import multiprocessing
 import os
+import sys
 from pathlib import Path
-from services.service_manager import ServiceManager
-from gui.main_window import LaragonCloneGUI
+from services.supervisor_client import SUPERVISOR_FLAG, RemoteServiceManager
 
 def create_default_files():
     """Crea los directorios y archivos por defecto si no existen."""
@@ -36,9 +37,24 @@ def create_default_files():
 
 def main():
     """Punto de entrada principal de la aplicación."""
+    if sys.argv[1:2] == [SUPERVISOR_FLAG]:
+        # El ejecutable empaquetado se relanza a sí mismo como supervisor (ver spawn_daemon).
+        from services.supervisor import main as supervisor_main
+        return supervisor_main(sys.argv[2:])
+
+    from gui.main_window import LaragonCloneGUI
+
     create_default_files()
     
-    service_manager = ServiceManager()
+    # Los servicios pertenecen al supervisor, que sobrevive a la GUI y se
+    # comparte con otras ventanas y con la CLI. Si no se puede lanzar, la GUI
+    # gestiona los procesos ella misma como antes.
+    service_manager = RemoteServiceManager.connect(Path.cwd())
+    if service_manager is None:
+        print("⚠️ No se pudo iniciar el supervisor; los servicios se gestionarán desde esta ventana.")
+        from services.service_manager import ServiceManager
+        service_manager = ServiceManager()
+        service_manager.start_watching()
     
     # Iniciar la GUI
     gui = LaragonCloneGUI(service_manager)
@@ -46,4 +62,7 @@ def main():
 
 
 if __name__ == "__main__":
+    # Los procesos de AssetPipeline usan 'spawn': en el ejecutable de
+    # PyInstaller cada uno volvería a abrir la GUI sin esto.
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
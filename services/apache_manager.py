@@ -1,14 +1,26 @@
 import os
+import signal
 import subprocess
 from pathlib import Path
+from .config_renderer import ConfigRenderer
+from .apache_tuning import DEFAULT_PROFILE, default_mpm, detect_host, render_tuning, size_profile
+from .asset_pipeline import render_apache_block
+from .ssl_manager import cert_fingerprint
 
 class ApacheManager:
-    def __init__(self, bin_path, php_manager, config, ssl_manager):
+    def __init__(self, bin_path, php_manager, config, ssl_manager, vhost_manager=None, php_handler=None):
         self.apache_path = bin_path / "apache"
         self.php_manager = php_manager
         self.config = config
         self.ssl_manager = ssl_manager
+        self.vhost_manager = vhost_manager
+        # En modo FPM: versión de PHP -> destino proxy:fcgi:// del pool que la sirve.
+        self.php_handler = php_handler
         self.www_path = Path.cwd() / "www"
+        self.conf_path = self.apache_path / "conf" / "httpd.conf"
+        # Módulo PHP con el que se generó la última configuración.
+        self.php_module_path = None
+        self.renderer = ConfigRenderer()
 
     def update_php_manager(self, php_manager):
         self.php_manager = php_manager
@@ -18,8 +30,52 @@ class ApacheManager:
         executable = "httpd.exe" if os.name == 'nt' else "httpd"
         return [str(self.apache_path / "bin" / executable), "-D", "FOREGROUND"]
 
-    def generate_httpd_conf(self):
-        php_module_path = self.php_manager.get_php_module_path()
+    def get_config_test_command(self, conf_path=None):
+        """Comando que valida la sintaxis de httpd.conf (u otro archivo) sin tocar el servidor en marcha."""
+        executable = "httpd.exe" if os.name == 'nt' else "httpd"
+        return [str(self.apache_path / "bin" / executable), "-t", "-f", str(conf_path or self.conf_path)]
+
+    def test_config(self, conf_path=None):
+        """Devuelve (ok, salida) de `httpd -t`."""
+        try:
+            result = subprocess.run(self.get_config_test_command(conf_path), capture_output=True, text=True, timeout=30)
+        except (OSError, subprocess.TimeoutExpired) as e:
+            return False, str(e)
+        return result.returncode == 0, (result.stderr or result.stdout).strip()
+
+    def supports_graceful_reload(self):
+        # En Windows httpd sólo acepta `-k restart` como servicio instalado.
+        return os.name != 'nt'
+
+    def graceful_reload(self, pid):
+        """
+        Pide al proceso padre de httpd un reinicio elegante (SIGUSR1, lo mismo
+        que `httpd -k graceful`): relee la configuración y los workers terminan
+        las peticiones en curso antes de reemplazarse.
+        """
+        os.kill(pid, signal.SIGUSR1)
+
+    def get_tuning(self):
+        """Perfil elegido en `apache_profile` y su dimensionado para esta máquina."""
+        name = self.config.get('apache_profile', DEFAULT_PROFILE)
+        mpm = self.config.get('apache_mpm') or default_mpm(self.uses_fpm())
+        cpus, available_mb = detect_host()
+        return name, size_profile(name, mpm, cpus, available_mb)
+
+    def uses_fpm(self):
+        return self.config.get('php_mode', 'mod_php') == 'fpm' and self.php_handler is not None
+
+    def generate_php_block(self):
+        """Bloque de httpd.conf que conecta Apache con PHP (mod_php o PHP-FPM)."""
+        if self.uses_fpm():
+            return f"""# Configuración PHP (PHP-FPM vía mod_proxy_fcgi)
+LoadModule proxy_module modules/mod_proxy.so
+LoadModule proxy_fcgi_module modules/mod_proxy_fcgi.so
+<FilesMatch "\\.php$">
+    SetHandler "{self.php_handler(self.php_manager.version)}"
+</FilesMatch>
+"""
+        php_module_path = self.php_module_path
         if not php_module_path or not php_module_path.exists():
             error_message = (
                 f"❌ No se pudo encontrar el módulo de Apache para la versión de PHP '{self.php_manager.version}'.\n\n"
@@ -29,9 +85,55 @@ class ApacheManager:
                 "    - En Linux/macOS: Busca un archivo como 'libphp.so'.\n"
             )
             raise FileNotFoundError(error_message)
+        return f"""# Configuración PHP
+LoadModule php_module "{php_module_path.as_posix()}"
+<IfModule php_module>
+    PHPINIDir "{self.php_manager.php_path.as_posix()}"
+    AddHandler application/x-httpd-php .php
+    AddType application/x-httpd-php .php .html
+</IfModule>
+"""
+
+    def generate_status_block(self):
+        """
+        mod_status en /server-status, sólo para esta máquina: el panel de la
+        GUI lee de ahí las peticiones por segundo. Sin mod_status o sin
+        mod_authz_host (que es el que permite `Require local`) no se genera
+        nada: la página heredaría `Require all granted` en todas las interfaces.
+        """
+        modules_dir = self.apache_path / "modules"
+        required = ("mod_status.so", "mod_authz_host.so")
+        if not self.config.get('apache_status', True) or not all((modules_dir / m).exists() for m in required):
+            return ""
+        return """
+# Estado del servidor para el panel de PyLaragon
+LoadModule authz_host_module modules/mod_authz_host.so
+LoadModule status_module modules/mod_status.so
+<Location "/server-status">
+    SetHandler server-status
+    Require local
+</Location>
+"""
+
+    def generate_app_env_block(self):
+        """
+        SetEnv con los DSN de los servicios de caché (REDIS_URL, CACHE_DSN...):
+        llegan a PHP tanto con mod_php como por FastCGI a PHP-FPM.
+        """
+        env = self.php_manager.get_app_env(self.config.get('php_cache_backend'))
+        if not env:
+            return ""
+        lines = ["", "# Servicios de caché para las aplicaciones (getenv / $_SERVER)"]
+        lines += [f'SetEnv {name} "{value}"' for name, value in sorted(env.items())]
+        return "\n".join(lines) + "\n"
+
+    def generate_httpd_conf(self):
+        self.php_module_path = None if self.uses_fpm() else self.php_manager.get_php_module_path()
+        php_block = self.generate_php_block()
 
         server_root = self.apache_path.as_posix()
         document_root = self.www_path.as_posix()
+        profile_name, sizing = self.get_tuning()
 
         # --- MÓDULO FINAL AÑADIDO ---
         config = f"""
@@ -44,14 +146,8 @@ LoadModule dir_module modules/mod_dir.so
 LoadModule authz_core_module modules/mod_authz_core.so
 LoadModule rewrite_module modules/mod_rewrite.so
 
-# Configuración PHP
-LoadModule php_module "{php_module_path.as_posix()}"
-<IfModule php_module>
-    PHPINIDir "{self.php_manager.php_path.as_posix()}"
-    AddHandler application/x-httpd-php .php
-    AddType application/x-httpd-php .php .html
-</IfModule>
-
+{render_tuning(profile_name, sizing, self.apache_path / "modules")}
+{php_block}
 # Configuración del servidor
 DocumentRoot "{document_root}"
 <Directory "{document_root}">
@@ -62,27 +158,79 @@ DocumentRoot "{document_root}"
 
 DirectoryIndex index.php index.html
 """
+        if self.config.get('precompressed_assets', True):
+            config += "\n" + render_apache_block(document_root)
+        config += self.generate_status_block()
+        config += self.generate_app_env_block()
         if self.ssl_manager.certs_exist():
             ssl_cert = self.ssl_manager.cert_path.as_posix()
             ssl_key = self.ssl_manager.key_path.as_posix()
+            fingerprint = cert_fingerprint(self.ssl_manager.cert_path)
             config += f"""
 
-# Configuración SSL
+# Configuración SSL (sitio por defecto; cada host virtual lleva su propio certificado)
 Listen {self.config['apache_https_port']}
 LoadModule ssl_module modules/mod_ssl.so
 
 <IfModule ssl_module>
+<VirtualHost _default_:{self.config['apache_https_port']}>
+    ServerName localhost
+    DocumentRoot "{document_root}"
     SSLEngine on
+    # Certificado SHA-256: {fingerprint}
     SSLCertificateFile "{ssl_cert}"
     SSLCertificateKeyFile "{ssl_key}"
+</VirtualHost>
 </IfModule>
+"""
+        if self.vhost_manager:
+            include_dir = self.vhost_manager.include_dir.as_posix()
+            config += f"""
+
+# Hosts virtuales: el primero es el sitio por defecto para 'localhost'
+<VirtualHost *:{self.config['apache_http_port']}>
+    ServerName localhost
+    DocumentRoot "{document_root}"
+</VirtualHost>
+IncludeOptional "{include_dir}/*.conf"
 """
         return config
 
-    def configure(self):
-        conf_content = self.generate_httpd_conf()
-        conf_path = self.apache_path / "conf" / "httpd.conf"
-        conf_path.parent.mkdir(exist_ok=True)
-        with open(conf_path, "w", encoding='utf-8') as f:
-            f.write(conf_content)
-        print("✅ Configuración de Apache actualizada correctamente.")
\ No newline at end of file
+    def get_config_inputs(self):
+        """Todo lo que influye en httpd.conf; si no cambia, el archivo tampoco."""
+        php_module_path = None if self.uses_fpm() else self.php_manager.get_php_module_path()
+        self.php_module_path = php_module_path
+        return {
+            'config': self.config,
+            'php_version': self.php_manager.version,
+            'php_module_path': php_module_path,
+            'php_handler': self.php_handler(self.php_manager.version) if self.uses_fpm() else None,
+            'server_root': self.apache_path,
+            'www_path': self.www_path,
+            'cert': cert_fingerprint(self.ssl_manager.cert_path) if self.ssl_manager.certs_exist() else None,
+            'vhosts': bool(self.vhost_manager),
+            'tuning': self.get_tuning(),
+            'app_env': self.php_manager.get_app_env(self.config.get('php_cache_backend')),
+        }
+
+    def configure(self, validate=False):
+        """
+        Escribe php.ini, httpd.conf y los includes de hosts virtuales que
+        cambiaron. Devuelve True si algún archivo cambió. Con `validate` el
+        httpd.conf nuevo pasa `httpd -t` antes de sustituir al que está en
+        uso (InvalidConfigError si no es válido).
+        """
+        # Con mod_php, php.ini se lee al (re)cargar Apache; con FPM lo gestiona el pool.
+        changed = False if self.uses_fpm() else self.php_manager.configure()
+        if self.vhost_manager:
+            summary = self.vhost_manager.sync()
+            changed = bool(summary['added'] or summary['updated'] or summary['removed']) or changed
+        result = self.renderer.render(
+            self.conf_path, self.get_config_inputs(), self.generate_httpd_conf,
+            self.test_config if validate else None,
+        )
+        if result.changed:
+            print("✅ Configuración de Apache actualizada correctamente.")
+        elif not changed:
+            print("✅ Configuración de Apache sin cambios.")
+        return result.changed or changed
\ No newline at end of file
@@ -0,0 +1,50 @@
+import time
+import urllib.error
+import urllib.request
+
+
+def fetch_server_status(port, host='127.0.0.1', timeout=1.0):
+    """
+    Lee /server-status?auto de mod_status y lo devuelve como dict
+    ('Total Accesses', 'BusyWorkers', 'IdleWorkers'...). None si Apache no
+    lo expone o no responde.
+    """
+    url = f"http://{host}:{port}/server-status?auto"
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            body = response.read(65536).decode('latin-1')
+    except (urllib.error.URLError, OSError, ValueError):
+        return None
+    status = {}
+    for line in body.splitlines():
+        key, sep, value = line.partition(':')
+        if sep:
+            status[key.strip()] = value.strip()
+    return status if 'Total Accesses' in status else None
+
+
+class RequestRateMeter:
+    """
+    Peticiones por segundo a partir de dos lecturas sucesivas del contador
+    'Total Accesses'. La propia consulta a /server-status cuenta como una
+    petición y se descuenta.
+    """
+
+    def __init__(self):
+        self._last = None
+
+    def reset(self):
+        self._last = None
+
+    def update(self, status):
+        now = time.monotonic()
+        try:
+            accesses = int(status['Total Accesses'])
+        except (KeyError, TypeError, ValueError):
+            self._last = None
+            return None
+        previous, self._last = self._last, (accesses, now)
+        # Sin lectura anterior, o con el contador reiniciado (Apache reiniciado), no hay tasa.
+        if previous is None or accesses < previous[0] or now <= previous[1]:
+            return None
+        return max(0, accesses - previous[0] - 1) / (now - previous[1])
@@ -0,0 +1,201 @@
+import os
+from functools import lru_cache
+
+import psutil
+
+# Cada perfil fija cuánta memoria disponible puede usar Apache, cuántos hilos
+# o procesos por CPU lanza y cómo trata las conexiones persistentes.
+PROFILES = {
+    'light': {
+        'memory_share': 0.15,
+        'workers_per_cpu': 8,
+        'processes_per_cpu': 2,
+        'threads_per_child': 16,
+        'timeout': 60,
+        'keepalive': True,
+        'keepalive_timeout': 5,
+        'max_keepalive_requests': 100,
+        'max_connections_per_child': 1000,
+        'modules': ('headers',),
+    },
+    'balanced': {
+        'memory_share': 0.35,
+        'workers_per_cpu': 25,
+        'processes_per_cpu': 4,
+        'threads_per_child': 25,
+        'timeout': 60,
+        'keepalive': True,
+        'keepalive_timeout': 5,
+        'max_keepalive_requests': 500,
+        'max_connections_per_child': 10000,
+        'modules': ('headers', 'deflate', 'expires'),
+    },
+    'load-test': {
+        'memory_share': 0.6,
+        'workers_per_cpu': 64,
+        'processes_per_cpu': 8,
+        'threads_per_child': 64,
+        'timeout': 30,
+        'keepalive': True,
+        'keepalive_timeout': 2,
+        'max_keepalive_requests': 10000,
+        'max_connections_per_child': 0,
+        'modules': ('headers', 'deflate', 'expires'),
+    },
+}
+
+DEFAULT_PROFILE = 'light'
+
+# Memoria aproximada por worker: un proceso prefork con mod_php pesa mucho más
+# que un hilo de event/worker.
+MB_PER_PROCESS = 40
+MB_PER_THREAD = 4
+
+MODULE_FILES = {
+    'headers': ('headers_module', 'mod_headers.so'),
+    'deflate': ('deflate_module', 'mod_deflate.so'),
+    'expires': ('expires_module', 'mod_expires.so'),
+    'filter': ('filter_module', 'mod_filter.so'),
+}
+
+
+def default_mpm(uses_fpm=False):
+    """
+    MPM por defecto: winnt en Windows; en POSIX, prefork con mod_php (un
+    mod_php compilado sin ZTS no arranca con un MPM de hilos) y event con
+    PHP-FPM. Se puede forzar otro con `apache_mpm` en services.json.
+    """
+    if os.name == 'nt':
+        return 'winnt'
+    return 'event' if uses_fpm else 'prefork'
+
+
+@lru_cache(maxsize=None)
+def detect_host():
+    """
+    CPU lógicas y memoria disponible (MB, redondeada a 256 MB). Se mide una
+    vez por sesión para que httpd.conf no cambie en cada arranque por
+    pequeñas variaciones de memoria libre.
+    """
+    cpus = psutil.cpu_count(logical=True) or 1
+    available_mb = psutil.virtual_memory().available // (1024 * 1024)
+    return cpus, max(256, available_mb // 256 * 256)
+
+
+def size_profile(name, mpm, cpus, available_mb):
+    """Calcula las directivas de un perfil para una máquina concreta."""
+    if name not in PROFILES:
+        raise ValueError(f"Perfil de Apache desconocido: {name}. Disponibles: {', '.join(PROFILES)}")
+    profile = PROFILES[name]
+    budget_mb = available_mb * profile['memory_share']
+    sizing = {'mpm': mpm}
+
+    if mpm == 'prefork':
+        workers = min(cpus * profile['processes_per_cpu'], int(budget_mb // MB_PER_PROCESS))
+        workers = max(workers, 2)
+        sizing.update(
+            max_request_workers=workers,
+            server_limit=workers,
+            start_servers=max(1, min(workers, cpus)),
+            min_spare_servers=max(1, min(workers, cpus)),
+            max_spare_servers=max(2, min(workers, cpus * 2)),
+        )
+    elif mpm in ('event', 'worker'):
+        threads = profile['threads_per_child']
+        workers = min(cpus * profile['workers_per_cpu'], int(budget_mb // MB_PER_THREAD))
+        server_limit = max(1, workers // threads)
+        sizing.update(
+            threads_per_child=threads,
+            server_limit=server_limit,
+            max_request_workers=server_limit * threads,
+            start_servers=max(1, min(server_limit, 2)),
+            min_spare_threads=threads,
+            max_spare_threads=max(threads * 2, min(server_limit * threads, threads * 4)),
+        )
+    elif mpm == 'winnt':
+        threads = min(cpus * profile['workers_per_cpu'], int(budget_mb // MB_PER_THREAD), 1920)
+        sizing.update(threads_per_child=max(threads, 16))
+    else:
+        raise ValueError(f"MPM desconocido: {mpm}")
+    return sizing
+
+
+def render_tuning(name, sizing, modules_dir):
+    """Genera el bloque de httpd.conf del perfil (MPM, KeepAlive y módulos)."""
+    profile = PROFILES[name]
+    mpm = sizing['mpm']
+    lines = [f"# Perfil de rendimiento: {name} (MPM {mpm})"]
+
+    # Con MPM compilados como módulos hay que cargar el elegido; si el binario
+    # lo trae incorporado el archivo no existe y no se carga nada.
+    if mpm != 'winnt' and (modules_dir / f"mod_mpm_{mpm}.so").exists():
+        lines.append(f"LoadModule mpm_{mpm}_module modules/mod_mpm_{mpm}.so")
+
+    modules = list(profile['modules'])
+    if 'deflate' in modules:
+        modules.insert(0, 'filter')
+    for module in modules:
+        module_name, file_name = MODULE_FILES[module]
+        lines.append(f"LoadModule {module_name} modules/{file_name}")
+
+    lines += [
+        f"Timeout {profile['timeout']}",
+        f"KeepAlive {'On' if profile['keepalive'] else 'Off'}",
+        f"KeepAliveTimeout {profile['keepalive_timeout']}",
+        f"MaxKeepAliveRequests {profile['max_keepalive_requests']}",
+        "",
+    ]
+
+    if mpm == 'prefork':
+        lines += [
+            "<IfModule mpm_prefork_module>",
+            f"    StartServers {sizing['start_servers']}",
+            f"    MinSpareServers {sizing['min_spare_servers']}",
+            f"    MaxSpareServers {sizing['max_spare_servers']}",
+            f"    ServerLimit {sizing['server_limit']}",
+            f"    MaxRequestWorkers {sizing['max_request_workers']}",
+            f"    MaxConnectionsPerChild {profile['max_connections_per_child']}",
+            "</IfModule>",
+        ]
+    elif mpm in ('event', 'worker'):
+        lines += [
+            f"<IfModule mpm_{mpm}_module>",
+            f"    StartServers {sizing['start_servers']}",
+            f"    ServerLimit {sizing['server_limit']}",
+            f"    ThreadsPerChild {sizing['threads_per_child']}",
+            f"    ThreadLimit {sizing['threads_per_child']}",
+            f"    MinSpareThreads {sizing['min_spare_threads']}",
+            f"    MaxSpareThreads {sizing['max_spare_threads']}",
+            f"    MaxRequestWorkers {sizing['max_request_workers']}",
+            f"    MaxConnectionsPerChild {profile['max_connections_per_child']}",
+            "</IfModule>",
+        ]
+    else:
+        lines += [
+            "<IfModule mpm_winnt_module>",
+            f"    ThreadsPerChild {sizing['threads_per_child']}",
+            f"    MaxConnectionsPerChild {profile['max_connections_per_child']}",
+            "</IfModule>",
+        ]
+
+    if 'deflate' in modules:
+        lines += [
+            "",
+            "<IfModule deflate_module>",
+            "    AddOutputFilterByType DEFLATE text/html text/plain text/css text/xml",
+            "    AddOutputFilterByType DEFLATE application/javascript application/json application/xml image/svg+xml",
+            "</IfModule>",
+        ]
+    if 'expires' in modules:
+        lines += [
+            "",
+            "<IfModule expires_module>",
+            "    ExpiresActive On",
+            '    ExpiresByType image/png "access plus 1 week"',
+            '    ExpiresByType image/jpeg "access plus 1 week"',
+            '    ExpiresByType image/svg+xml "access plus 1 week"',
+            '    ExpiresByType text/css "access plus 1 day"',
+            '    ExpiresByType application/javascript "access plus 1 day"',
+            "</IfModule>",
+        ]
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,272 @@
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+
+from .config_renderer import atomic_write
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Tipo MIME de cada extensión comprimible: Apache lo necesita para servir
+# la variante .br/.gz con el Content-Type del original. No incluye .html:
+# con mod_php se ejecuta como PHP y la variante se saltaría el intérprete.
+COMPRESSIBLE_TYPES = {
+    'css': 'text/css',
+    'js': 'application/javascript',
+    'mjs': 'application/javascript',
+    'json': 'application/json',
+    'map': 'application/json',
+    'svg': 'image/svg+xml',
+    'txt': 'text/plain',
+    'xml': 'application/xml',
+    'wasm': 'application/wasm',
+    'ico': 'image/x-icon',
+    'ttf': 'font/ttf',
+    'otf': 'font/otf',
+}
+ENCODINGS = (('br', 'br'), ('gz', 'gzip'))
+# Por debajo de este tamaño la cabecera Content-Encoding cuesta más de lo que se ahorra.
+MIN_SIZE = 1024
+# Una variante que no baja del 95 % del original no merece la pena.
+MAX_RATIO = 0.95
+SKIP_DIRS = {'node_modules'}
+# Archivos con huella en el nombre (app.3f9a2c1b.js, app-3f9a2c1b.css):
+# su contenido nunca cambia, así que se pueden cachear para siempre.
+FINGERPRINT_PATTERN = r"[.-][0-9a-fA-F]{8,}"
+# Con menos archivos que esto no compensa arrancar procesos.
+POOL_THRESHOLD = 8
+
+
+def _write_bytes(path, data, mtime_ns):
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.utime(tmp_name, ns=(mtime_ns, mtime_ns))
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
+
+
+def compress_asset(path, previous_digest=None, use_brotli=True):
+    """
+    Genera las variantes .br y .gz de `path` junto al original. Si el
+    contenido no cambió (`previous_digest`) y las variantes siguen ahí no se
+    recomprime. Se ejecuta en los procesos del pool: sólo recibe y devuelve
+    tipos simples.
+    """
+    path = Path(path)
+    data = path.read_bytes()
+    stat = path.stat()
+    digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+    encodings = [(ext, name) for ext, name in ENCODINGS if ext != 'br' or (use_brotli and brotli)]
+    if digest == previous_digest and all(path.with_name(f"{path.name}.{ext}").exists() for ext, _ in encodings):
+        return {'digest': digest, 'compressed': False, 'variants': None}
+
+    variants = {}
+    for ext, _ in encodings:
+        if ext == 'br':
+            compressed = brotli.compress(data, quality=11)
+        else:
+            # mtime=0: la misma entrada produce siempre el mismo .gz.
+            compressed = gzip.compress(data, compresslevel=9, mtime=0)
+        target = path.with_name(f"{path.name}.{ext}")
+        if len(compressed) <= len(data) * MAX_RATIO:
+            _write_bytes(target, compressed, stat.st_mtime_ns)
+            variants[ext] = len(compressed)
+        elif target.exists():
+            target.unlink()
+    return {'digest': digest, 'compressed': True, 'variants': variants}
+
+
+class AssetPipeline:
+    """
+    Precomprime los recursos estáticos de www/ para que Apache sirva el
+    .br o .gz ya hecho en vez de comprimir en cada petición.
+
+    El índice guarda por archivo su mtime, tamaño, huella de contenido y las
+    variantes generadas; una pasada sólo recomprime lo que cambió y borra
+    las variantes de archivos que desaparecieron. La compresión (brotli 11,
+    gzip 9) se reparte entre procesos.
+    """
+
+    def __init__(self, www_path, index_path, workers=None, use_brotli=True):
+        self.www_path = Path(www_path)
+        self.index_path = Path(index_path)
+        self.workers = workers or os.cpu_count() or 1
+        self.use_brotli = use_brotli
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def brotli_available():
+        return brotli is not None
+
+    def load_index(self):
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def save_index(self, index):
+        atomic_write(self.index_path, json.dumps(index, indent=1, sort_keys=True))
+
+    def scan(self):
+        """{ruta relativa: stat} de los recursos comprimibles de www/."""
+        assets = {}
+        for root, dirs, files in os.walk(self.www_path):
+            dirs[:] = [d for d in dirs if not d.startswith('.') and d not in SKIP_DIRS]
+            for name in files:
+                extension = name.rsplit('.', 1)[-1].lower() if '.' in name else ''
+                if extension not in COMPRESSIBLE_TYPES or name.startswith('.'):
+                    continue
+                path = Path(root) / name
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                if stat.st_size >= MIN_SIZE:
+                    assets[path.relative_to(self.www_path).as_posix()] = stat
+        return assets
+
+    def _remove_variants(self, relative, entry):
+        for ext in entry.get('variants') or {}:
+            try:
+                (self.www_path / f"{relative}.{ext}").unlink()
+            except FileNotFoundError:
+                pass
+
+    def build(self, force=False):
+        """
+        Pasada incremental sobre www/. Devuelve un resumen con los archivos
+        comprimidos, los que no cambiaron, los eliminados, los bytes ahorrados
+        y los segundos empleados.
+        """
+        with self._lock:
+            return self._build(force)
+
+    def _build(self, force):
+        start = time.perf_counter()
+        index = {} if force else self.load_index()
+        assets = self.scan()
+        summary = {'compressed': [], 'unchanged': 0, 'removed': [], 'errors': {}, 'saved_bytes': 0}
+
+        for relative in [r for r in index if r not in assets]:
+            self._remove_variants(relative, index.pop(relative))
+            summary['removed'].append(relative)
+
+        jobs = []
+        for relative, stat in assets.items():
+            entry = index.get(relative)
+            if entry and entry['mtime_ns'] == stat.st_mtime_ns and entry['size'] == stat.st_size:
+                summary['unchanged'] += 1
+                continue
+            jobs.append((relative, stat, entry.get('digest') if entry else None))
+
+        def finish(relative, stat, result):
+            entry = index.get(relative, {})
+            if result['compressed']:
+                stale = set(entry.get('variants') or {}) - set(result['variants'])
+                self._remove_variants(relative, {'variants': dict.fromkeys(stale)})
+                entry['variants'] = result['variants']
+                summary['compressed'].append(relative)
+                summary['saved_bytes'] += sum(stat.st_size - size for size in result['variants'].values())
+            else:
+                summary['unchanged'] += 1
+            entry.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size, digest=result['digest'])
+            index[relative] = entry
+
+        if len(jobs) < POOL_THRESHOLD or self.workers == 1:
+            for relative, stat, digest in jobs:
+                try:
+                    finish(relative, stat, compress_asset(self.www_path / relative, digest, self.use_brotli))
+                except Exception as e:
+                    summary['errors'][relative] = f"{type(e).__name__}: {e}"
+        elif jobs:
+            # 'spawn' en todas las plataformas: el supervisor tiene hilos y
+            # hacer fork de un proceso con hilos no es seguro.
+            workers = min(self.workers, len(jobs))
+            with ProcessPoolExecutor(max_workers=workers, mp_context=get_context('spawn')) as pool:
+                futures = {
+                    pool.submit(compress_asset, str(self.www_path / relative), digest, self.use_brotli): (relative, stat)
+                    for relative, stat, digest in jobs
+                }
+                for future, (relative, stat) in futures.items():
+                    # Cualquier fallo (brotli.error, BrokenProcessPool...) se anota
+                    # por archivo: el índice de lo que sí se comprimió se guarda igual.
+                    try:
+                        finish(relative, stat, future.result())
+                    except Exception as e:
+                        summary['errors'][relative] = f"{type(e).__name__}: {e}"
+
+        self.save_index(index)
+        summary['seconds'] = time.perf_counter() - start
+        return summary
+
+    def clean(self):
+        """Borra todas las variantes generadas y el índice."""
+        with self._lock:
+            index = self.load_index()
+            for relative, entry in index.items():
+                self._remove_variants(relative, entry)
+            try:
+                self.index_path.unlink()
+            except FileNotFoundError:
+                pass
+            return len(index)
+
+
+def render_apache_block(document_root):
+    """
+    Bloque de httpd.conf que sirve las variantes precomprimidas: si el
+    cliente acepta br (o gzip) y existe el archivo hermano, se reescribe a él
+    con el Content-Type del original y su Content-Encoding. Los archivos con
+    huella en el nombre se marcan como inmutables durante un año.
+    """
+    extensions = "|".join(COMPRESSIBLE_TYPES)
+    lines = [
+        "# Recursos precomprimidos (.br/.gz generados por PyLaragon)",
+        "<IfModule headers_module>",
+        f'<Directory "{document_root}">',
+        "    RewriteEngine On",
+    ]
+    for ext, encoding in ENCODINGS:
+        lines += [
+            f'    RewriteCond "%{{HTTP:Accept-Encoding}}" "{encoding}"',
+            f'    RewriteCond "%{{REQUEST_FILENAME}}.{ext}" -s',
+            f'    RewriteRule "^(.+\\.(?:{extensions}))$" "$1.{ext}" [L]',
+        ]
+    for extension, mime in COMPRESSIBLE_TYPES.items():
+        lines.append(f'    RewriteRule "\\.{extension}\\.(br|gz)$" "-" [T={mime},E=no-gzip:1,E=no-brotli:1]')
+    for ext, encoding in ENCODINGS:
+        lines += [
+            f'    <FilesMatch "\\.(?:{extensions})\\.{ext}$">',
+            f"        Header set Content-Encoding {encoding}",
+            "        Header append Vary Accept-Encoding",
+            "    </FilesMatch>",
+        ]
+    lines += [
+        f'    <FilesMatch "\\.(?:{extensions})$">',
+        "        Header append Vary Accept-Encoding",
+        "    </FilesMatch>",
+        f'    <FilesMatch "{FINGERPRINT_PATTERN}\\.(?:{extensions})(?:\\.br|\\.gz)?$">',
+        '        Header set Cache-Control "public, max-age=31536000, immutable"',
+        "    </FilesMatch>",
+        "</Directory>",
+        "</IfModule>",
+        "",
+    ]
+    return "\n".join(lines)
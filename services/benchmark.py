@@ -0,0 +1,524 @@
+import asyncio
+import hashlib
+import json
+import math
+import re
+import ssl
+import time
+from datetime import datetime
+from pathlib import Path
+
+from .config_renderer import atomic_write
+
+# Precisión del histograma: 2**(SUB_BUCKET_BITS - 1) = 64 sub-cubos por potencia
+# de dos, es decir, un error relativo máximo de 1/64 (~1,6 %) en cualquier rango.
+SUB_BUCKET_BITS = 7
+SUB_BUCKET_HALF = 1 << (SUB_BUCKET_BITS - 1)
+PERCENTILES = (50, 75, 90, 99, 99.9)
+
+# Métricas que muestra la comparación y si un valor mayor es mejor.
+COMPARED_METRICS = (
+    ('throughput', True),
+    ('error_rate', False),
+    ('p50', False),
+    ('p90', False),
+    ('p99', False),
+    ('p99.9', False),
+    ('max', False),
+)
+# Diferencias por debajo de este porcentaje se consideran ruido.
+NOISE_PERCENT = 3.0
+
+
+class LatencyHistogram:
+    """
+    Histograma logarítmico-lineal al estilo HdrHistogram, en microsegundos.
+
+    Cada potencia de dos se divide en 64 cubos, así que el error relativo es
+    constante desde microsegundos hasta minutos y la memoria sólo depende de
+    los cubos ocupados. Los percentiles se dan con el valor más alto del cubo,
+    como HdrHistogram, para no subestimar la cola.
+    """
+
+    def __init__(self, counts=None):
+        self.counts = dict(counts or {})
+        self.total = sum(self.counts.values())
+        self.min = None
+        self.max = None
+        self.sum = 0
+        if self.counts:
+            self.min = self.lowest(min(self.counts))
+            self.max = self.highest(max(self.counts))
+            self.sum = sum(self._midpoint(i) * n for i, n in self.counts.items())
+
+    @staticmethod
+    def index_of(value):
+        if value < 2 * SUB_BUCKET_HALF:
+            return value
+        shift = value.bit_length() - SUB_BUCKET_BITS
+        return shift * SUB_BUCKET_HALF + (value >> shift)
+
+    @staticmethod
+    def lowest(index):
+        if index < 2 * SUB_BUCKET_HALF:
+            return index
+        shift = index // SUB_BUCKET_HALF - 1
+        return (index - shift * SUB_BUCKET_HALF) << shift
+
+    @classmethod
+    def highest(cls, index):
+        if index < 2 * SUB_BUCKET_HALF:
+            return index
+        shift = index // SUB_BUCKET_HALF - 1
+        return cls.lowest(index) + (1 << shift) - 1
+
+    def _midpoint(self, index):
+        return (self.lowest(index) + self.highest(index)) / 2
+
+    def record(self, micros):
+        micros = max(0, int(micros))
+        index = self.index_of(micros)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.total += 1
+        self.sum += micros
+        self.min = micros if self.min is None else min(self.min, micros)
+        self.max = micros if self.max is None else max(self.max, micros)
+
+    def merge(self, other):
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.total += other.total
+        self.sum += other.sum
+        if other.total:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def percentile(self, q):
+        if not self.total:
+            return None
+        wanted = max(1, math.ceil(self.total * q / 100))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= wanted:
+                return min(self.highest(index), self.max)
+        return self.max
+
+    def mean(self):
+        return self.sum / self.total if self.total else None
+
+    def summary_ms(self):
+        """Resumen en milisegundos: min, media, percentiles y máximo."""
+        if not self.total:
+            return {}
+        summary = {'min': self.min / 1000, 'mean': self.mean() / 1000}
+        for q in PERCENTILES:
+            summary[f"p{q:g}"] = self.percentile(q) / 1000
+        summary['max'] = self.max / 1000
+        return summary
+
+    def to_dict(self):
+        # Las claves JSON son cadenas; se guardan como pares para no convertirlas.
+        return {'unit': 'us', 'sub_bucket_bits': SUB_BUCKET_BITS, 'counts': sorted(self.counts.items())}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls({int(index): count for index, count in data.get('counts', [])})
+
+
+class _PathStats:
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.requests = 0
+        self.errors = 0
+        self.bytes = 0
+
+    def to_dict(self):
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'bytes': self.bytes,
+            'latency_ms': self.latency.summary_ms(),
+        }
+
+
+class _Connection:
+    """Conexión HTTP/1.1 persistente mínima: GET, Content-Length o chunked."""
+
+    def __init__(self, host, port, ssl_context, host_header, timeout):
+        self.host = host
+        self.port = port
+        self.ssl_context = ssl_context
+        self.host_header = host_header
+        self.timeout = timeout
+        self.reader = None
+        self.writer = None
+
+    async def open(self):
+        self.reader, self.writer = await asyncio.wait_for(
+            asyncio.open_connection(
+                self.host, self.port, ssl=self.ssl_context,
+                server_hostname=self.host_header.split(':')[0] if self.ssl_context else None,
+            ),
+            self.timeout,
+        )
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.reader = self.writer = None
+
+    async def get(self, path):
+        """Devuelve (estado, bytes de cuerpo). Cierra la conexión si el servidor lo pide."""
+        if self.writer is None:
+            await self.open()
+        request = (
+            f"GET {path} HTTP/1.1\r\nHost: {self.host_header}\r\n"
+            "User-Agent: pylaragon-bench\r\nAccept-Encoding: identity\r\n\r\n"
+        )
+        self.writer.write(request.encode('latin-1'))
+        return await asyncio.wait_for(self._read_response(), self.timeout)
+
+    async def _read_response(self):
+        reader = self.reader
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionResetError("el servidor cerró la conexión")
+        parts = status_line.split(None, 2)
+        if len(parts) < 2 or not parts[0].startswith(b"HTTP/"):
+            raise ValueError(f"respuesta no válida: {status_line[:40]!r}")
+        status = int(parts[1])
+        length, chunked, close = None, False, parts[0] == b"HTTP/1.0"
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.partition(b":")
+            name, value = name.strip().lower(), value.strip().lower()
+            if name == b"content-length":
+                length = int(value)
+            elif name == b"transfer-encoding":
+                chunked = b"chunked" in value
+            elif name == b"connection":
+                close = value == b"close"
+
+        size = 0
+        if status in (204, 304) or 100 <= status < 200:
+            pass
+        elif chunked:
+            while True:
+                chunk = int((await reader.readline()).split(b";")[0], 16)
+                if chunk == 0:
+                    while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                        pass
+                    break
+                await reader.readexactly(chunk + 2)
+                size += chunk
+        elif length is not None:
+            await reader.readexactly(length)
+            size = length
+        else:
+            size = len(await reader.read())
+            close = True
+        if close:
+            self.close()
+        return status, size
+
+
+def _classify_error(error):
+    if isinstance(error, asyncio.TimeoutError):
+        return 'timeout'
+    if isinstance(error, ConnectionRefusedError):
+        return 'refused'
+    if isinstance(error, (ConnectionError, asyncio.IncompleteReadError)):
+        return 'reset'
+    if isinstance(error, ssl.SSLError):
+        return 'tls'
+    if isinstance(error, ValueError):
+        return 'protocol'
+    return type(error).__name__
+
+
+class HttpBenchmark:
+    """
+    Genera carga HTTP con `concurrency` conexiones persistentes desde un
+    único bucle asyncio, repartiendo las peticiones entre `paths`.
+
+    Sin `rate` cada conexión lanza la siguiente petición en cuanto recibe la
+    respuesta (carga cerrada). Con `rate` las peticiones siguen un calendario
+    fijo de `rate` por segundo y la latencia se mide desde el instante en que
+    debían salir, de modo que un servidor que se atasca no esconde la espera
+    (omisión coordinada). Lo que ocurre durante `warmup` no se registra.
+    """
+
+    def __init__(self, host, port, paths, concurrency=10, duration=10.0, requests=None,
+                 rate=None, warmup=1.0, https=False, host_header=None, timeout=10.0):
+        self.host = host
+        self.port = port
+        self.paths = list(paths) or ['/']
+        self.concurrency = max(1, int(concurrency))
+        self.duration = duration
+        self.requests = requests
+        self.rate = rate
+        self.warmup = warmup if not requests else 0.0
+        self.https = https
+        self.host_header = host_header or (host if port in (80, 443) else f"{host}:{port}")
+        self.timeout = timeout
+
+        self.latency = LatencyHistogram()
+        self.per_path = {path: _PathStats() for path in self.paths}
+        self.status = {}
+        self.error_kinds = {}
+        self.completed = 0
+        self.errors = 0
+        self.bytes = 0
+        self._issued = 0
+
+    def _ssl_context(self):
+        if not self.https:
+            return None
+        # Certificados de la CA local o autofirmados: se mide, no se valida.
+        context = ssl.create_default_context()
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+        return context
+
+    def _next_slot(self, loop):
+        """(ruta, instante previsto) de la siguiente petición, o None si se acabó."""
+        if self.requests and self._issued >= self.requests:
+            return None
+        slot = self._issued
+        self._issued += 1
+        if self.rate:
+            intended = self._t0 + slot / self.rate
+        else:
+            intended = loop.time()
+        if not self.requests and intended >= self._deadline:
+            return None
+        return self.paths[slot % len(self.paths)], intended
+
+    def _record(self, path, intended, now, status=None, size=0, error=None):
+        if intended < self._measure_from:
+            return
+        stats = self.per_path[path]
+        micros = (now - intended) * 1_000_000
+        stats.requests += 1
+        self.completed += 1
+        if error is not None:
+            kind = _classify_error(error)
+            self.error_kinds[kind] = self.error_kinds.get(kind, 0) + 1
+        else:
+            self.status[status] = self.status.get(status, 0) + 1
+            stats.bytes += size
+            self.bytes += size
+            stats.latency.record(micros)
+            self.latency.record(micros)
+        if error is not None or status >= 400:
+            stats.errors += 1
+            self.errors += 1
+
+    async def _worker(self, ssl_context):
+        loop = asyncio.get_running_loop()
+        connection = _Connection(self.host, self.port, ssl_context, self.host_header, self.timeout)
+        try:
+            while True:
+                slot = self._next_slot(loop)
+                if slot is None:
+                    return
+                path, intended = slot
+                delay = intended - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                try:
+                    status, size = await connection.get(path)
+                except Exception as e:
+                    connection.close()
+                    self._record(path, intended, loop.time(), error=e)
+                    if isinstance(e, (ConnectionRefusedError, ssl.SSLError)):
+                        await asyncio.sleep(0.05)
+                    continue
+                self._record(path, intended, loop.time(), status, size)
+        finally:
+            connection.close()
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        self._t0 = loop.time()
+        self._measure_from = self._t0 + self.warmup
+        self._deadline = self._measure_from + self.duration
+        ssl_context = self._ssl_context()
+        started = time.time()
+        await asyncio.gather(*(self._worker(ssl_context) for _ in range(self.concurrency)))
+        elapsed = max(loop.time() - self._measure_from, 1e-9)
+        return self.result(started, elapsed)
+
+    def result(self, started, elapsed):
+        scheme = 'https' if self.https else 'http'
+        return {
+            'created': datetime.fromtimestamp(started).isoformat(timespec='seconds'),
+            'target': {
+                'url': f"{scheme}://{self.host}:{self.port}",
+                'host': self.host_header,
+                'paths': self.paths,
+            },
+            'load': {
+                'concurrency': self.concurrency,
+                'duration': None if self.requests else self.duration,
+                'requests': self.requests,
+                'rate': self.rate,
+                'warmup': self.warmup,
+            },
+            'summary': {
+                'requests': self.completed,
+                'errors': self.errors,
+                'error_rate': self.errors / self.completed if self.completed else 0.0,
+                'throughput': self.completed / elapsed,
+                'bytes': self.bytes,
+                'seconds': elapsed,
+                'status': {str(code): count for code, count in sorted(self.status.items())},
+                'error_kinds': self.error_kinds,
+            },
+            'latency_ms': self.latency.summary_ms(),
+            'per_path': {path: stats.to_dict() for path, stats in self.per_path.items()},
+            'histogram': self.latency.to_dict(),
+        }
+
+
+def run_benchmark(host, port, paths, **options):
+    """Ejecuta HttpBenchmark en un bucle propio; se puede llamar desde cualquier hilo."""
+    return asyncio.run(HttpBenchmark(host, port, paths, **options).run())
+
+
+def config_fingerprint(paths):
+    """
+    Huella de la configuración generada: SHA-256 del contenido de cada
+    archivo existente. Devuelve (huella corta, {ruta: huella}).
+    """
+    digests = {}
+    for path in sorted(Path(p) for p in paths):
+        try:
+            digests[str(path)] = hashlib.sha256(path.read_bytes()).hexdigest()
+        except OSError:
+            continue
+    combined = hashlib.sha256(json.dumps(digests, sort_keys=True).encode('utf-8')).hexdigest()
+    return combined[:16], digests
+
+
+def _change(a, b, higher_is_better):
+    if a is None or b is None:
+        return {'a': a, 'b': b, 'delta': None, 'percent': None, 'verdict': None}
+    delta = b - a
+    percent = delta / a * 100 if a else (0.0 if not delta else math.inf)
+    if abs(percent) < NOISE_PERCENT:
+        verdict = 'igual'
+    else:
+        verdict = 'mejor' if (delta > 0) == higher_is_better else 'peor'
+    return {'a': a, 'b': b, 'delta': delta, 'percent': percent, 'verdict': verdict}
+
+
+def compare_runs(a, b):
+    """
+    Diferencias de `b` respecto a `a`: etiquetas que cambiaron (versión de
+    PHP, huella de configuración...) y cada métrica con su variación y si
+    mejora, empeora o queda dentro del ruido.
+    """
+    def metrics(run):
+        values = dict(run['latency_ms'])
+        values['throughput'] = run['summary']['throughput']
+        values['error_rate'] = run['summary']['error_rate']
+        return values
+
+    values_a, values_b = metrics(a), metrics(b)
+    tags_a, tags_b = a.get('tags', {}), b.get('tags', {})
+    changed_tags = {
+        key: {'a': tags_a.get(key), 'b': tags_b.get(key)}
+        for key in sorted(set(tags_a) | set(tags_b))
+        if key != 'config_files' and tags_a.get(key) != tags_b.get(key)
+    }
+    paths = [p for p in a.get('per_path', {}) if p in b.get('per_path', {})]
+    return {
+        'a': a.get('name'),
+        'b': b.get('name'),
+        'tags': changed_tags,
+        'metrics': {
+            name: _change(values_a.get(name), values_b.get(name), higher_is_better)
+            for name, higher_is_better in COMPARED_METRICS
+        },
+        'per_path': {
+            path: _change(
+                a['per_path'][path]['latency_ms'].get('p99'),
+                b['per_path'][path]['latency_ms'].get('p99'),
+                False,
+            )
+            for path in paths
+        },
+    }
+
+
+class BenchmarkStore:
+    """Resultados guardados como benchmarks/<fecha>-<etiqueta>.json."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+
+    def save(self, result, label=None):
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        slug = re.sub(r'[^A-Za-z0-9_.-]+', '-', label or '').strip('-')
+        name = f"{stamp}-{slug}" if slug else stamp
+        candidate, n = name, 1
+        while (self.path / f"{candidate}.json").exists():
+            n += 1
+            candidate = f"{name}-{n}"
+        result['name'] = candidate
+        result['label'] = label
+        atomic_write(self.path / f"{candidate}.json", json.dumps(result, indent=2, ensure_ascii=False))
+        return candidate
+
+    def names(self):
+        if not self.path.is_dir():
+            return []
+        return sorted(p.stem for p in self.path.glob("*.json"))
+
+    def load(self, name):
+        """
+        Carga un resultado por nombre (o prefijo único), por ruta a un JSON, o
+        'latest' / 'previous' para los dos últimos.
+        """
+        names = self.names()
+        if name in ('latest', 'previous'):
+            position = -1 if name == 'latest' else -2
+            if len(names) < -position:
+                raise LookupError("No hay suficientes resultados guardados")
+            name = names[position]
+        elif Path(name).suffix == '.json' and Path(name).exists():
+            with open(name, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        elif name not in names:
+            matches = [n for n in names if n.startswith(name)]
+            if len(matches) != 1:
+                raise LookupError(f"Resultado desconocido o ambiguo: {name}")
+            name = matches[0]
+        with open(self.path / f"{name}.json", 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def list(self):
+        runs = []
+        for name in self.names():
+            try:
+                run = self.load(name)
+            except (OSError, json.JSONDecodeError):
+                continue
+            runs.append({
+                'name': name,
+                'label': run.get('label'),
+                'created': run.get('created'),
+                'php_version': run.get('tags', {}).get('php_version'),
+                'config_hash': run.get('tags', {}).get('config_hash'),
+                'throughput': run['summary']['throughput'],
+                'p99': run['latency_ms'].get('p99'),
+                'error_rate': run['summary']['error_rate'],
+            })
+        return runs
+
+    def compare(self, a, b):
+        return compare_runs(self.load(a), self.load(b))
@@ -0,0 +1,255 @@
+import os
+import socket
+from abc import ABC, abstractmethod
+from .config_renderer import ConfigRenderer, inputs_digest
+from .readiness import memcached_probe, redis_probe
+
+HOST = '127.0.0.1'
+REDIS_EVICTION_POLICIES = (
+    'noeviction', 'allkeys-lru', 'allkeys-lfu', 'allkeys-random',
+    'volatile-lru', 'volatile-lfu', 'volatile-random', 'volatile-ttl',
+)
+# Instantáneas RDB cuando `redis_persistence` está activo (las de redis.conf por defecto).
+REDIS_SAVE_RULES = "3600 1 300 100 60 10000"
+
+
+class ManagedService(ABC):
+    """
+    Definición de un servicio gestionado que no es Apache, MySQL ni PHP-FPM.
+
+    ServiceManager sólo habla con este interfaz, el mismo que ya cumplen los
+    otros gestores: configure() (True si la configuración cambió),
+    get_start_command(), get_start_env(), get_ports() ({clave de
+    services.json: puerto}), probe() y, para recargar sin reiniciar,
+    supports_graceful_reload(), test_config() y graceful_reload(pid). Añadir
+    un servicio es escribir la subclase y registrarla en SERVICE_DEFINITIONS.
+
+    Para PHP cada definición dice qué extensión la usa como gestor de
+    sesiones (`php_extension`, session.save_path) y qué DSN recibe la
+    aplicación en `env_var` y CACHE_DSN.
+    """
+
+    name = None
+    port_key = None
+    default_port = None
+    executable_name = None
+    php_extension = None
+    env_var = None
+
+    def __init__(self, bin_path, config):
+        self.config = config
+        self.path = bin_path / self.name
+        self.renderer = ConfigRenderer()
+
+    @property
+    def port(self):
+        return self.config.get(self.port_key, self.default_port)
+
+    def get_executable(self):
+        executable = f"{self.executable_name}.exe" if os.name == 'nt' else self.executable_name
+        for candidate in (self.path / executable, self.path / "bin" / executable):
+            if candidate.exists():
+                return candidate
+        raise FileNotFoundError(
+            f"❌ No se encontró {executable} en {self.path}.\n\n"
+            f" Descárgalo en bin/{self.name}/ o quítalo de `cache_services` en services.json."
+        )
+
+    def is_installed(self):
+        try:
+            self.get_executable()
+        except FileNotFoundError:
+            return False
+        return True
+
+    def get_ports(self):
+        return {self.port_key: self.port}
+
+    def dsn(self):
+        return f"{self.name}://{HOST}:{self.port}"
+
+    @abstractmethod
+    def configure(self):
+        """Genera la configuración del servicio. Devuelve True si cambió."""
+
+    @abstractmethod
+    def get_start_command(self):
+        """Orden con la que se lanza el servicio en primer plano."""
+
+    @abstractmethod
+    def probe(self):
+        """True cuando el servicio atiende en su puerto."""
+
+    @abstractmethod
+    def session_save_path(self):
+        """session.save_path para la extensión `php_extension`."""
+
+    def app_env(self):
+        """Variables de entorno con las que la aplicación encuentra el servicio."""
+        return {self.env_var: self.dsn()}
+
+    def get_start_env(self):
+        return None
+
+    def supports_graceful_reload(self):
+        return False
+
+
+class RedisManager(ManagedService):
+    """Redis sólo en 127.0.0.1, con límite de memoria y política de expulsión."""
+
+    name = 'redis'
+    port_key = 'redis_port'
+    default_port = 6379
+    executable_name = 'redis-server'
+    php_extension = 'redis'
+    env_var = 'REDIS_URL'
+
+    def __init__(self, bin_path, config):
+        super().__init__(bin_path, config)
+        self.conf_path = self.path / "redis.conf"
+        self.data_path = self.path / "data"
+        self._running_port = None
+
+    def get_settings(self):
+        policy = self.config.get('redis_eviction_policy', 'allkeys-lru')
+        if policy not in REDIS_EVICTION_POLICIES:
+            raise ValueError(
+                f"redis_eviction_policy debe ser una de {', '.join(REDIS_EVICTION_POLICIES)}, no '{policy}'"
+            )
+        return {
+            'maxmemory': str(self.config.get('redis_maxmemory', '128mb')),
+            'maxmemory-policy': policy,
+            'save': REDIS_SAVE_RULES if self.config.get('redis_persistence', False) else "",
+        }
+
+    def generate_conf(self):
+        settings = self.get_settings()
+        return f"""# Generado por PyLaragon: cambia redis_* en services.json en lugar de editar aquí.
+bind {HOST}
+protected-mode yes
+port {self.port}
+daemonize no
+logfile ""
+dir "{self.data_path.as_posix()}"
+maxmemory {settings['maxmemory']}
+maxmemory-policy {settings['maxmemory-policy']}
+save {settings['save'] or '""'}
+appendonly no
+"""
+
+    def configure(self):
+        """Escribe redis.conf si su contenido cambió. Devuelve True si hubo cambios."""
+        self.data_path.mkdir(parents=True, exist_ok=True)
+        inputs = {'settings': self.get_settings(), 'port': self.port, 'path': self.path}
+        return self.renderer.render(self.conf_path, inputs, self.generate_conf).changed
+
+    def get_start_command(self):
+        executable = str(self.get_executable())
+        self._running_port = self.port
+        return [executable, str(self.conf_path)]
+
+    def probe(self):
+        return redis_probe(HOST, self.port)
+
+    def session_save_path(self):
+        return f"tcp://{HOST}:{self.port}"
+
+    def supports_graceful_reload(self):
+        # Memoria, política y persistencia se cambian en caliente con CONFIG SET;
+        # un cambio de puerto exige reiniciar.
+        return self._running_port == self.port
+
+    def test_config(self):
+        try:
+            self.get_settings()
+        except ValueError as e:
+            return False, str(e)
+        return True, ""
+
+    def graceful_reload(self, pid):
+        for key, value in self.get_settings().items():
+            reply = self.command("CONFIG", "SET", key, value)
+            if not reply.startswith(b"+OK"):
+                raise OSError(f"CONFIG SET {key}: {reply.decode('utf-8', 'replace').strip()}")
+
+    def command(self, *args):
+        """Envía un comando en RESP y devuelve la primera línea de la respuesta."""
+        parts = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            data = str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        with socket.create_connection((HOST, self._running_port or self.port), timeout=2) as sock:
+            sock.sendall(b"".join(parts))
+            return sock.makefile('rb').readline()
+
+
+class MemcachedManager(ManagedService):
+    """
+    Memcached sólo en 127.0.0.1. No tiene archivo de configuración: todo va
+    en la línea de órdenes, así que cualquier cambio exige reiniciarlo.
+    """
+
+    name = 'memcached'
+    port_key = 'memcached_port'
+    default_port = 11211
+    executable_name = 'memcached'
+    php_extension = 'memcached'
+    env_var = 'MEMCACHED_SERVERS'
+
+    def __init__(self, bin_path, config):
+        super().__init__(bin_path, config)
+        self._running_digest = None
+
+    def get_arguments(self):
+        arguments = [
+            "-l", HOST, "-p", str(self.port), "-U", "0",
+            "-m", str(int(self.config.get('memcached_memory_mb', 64))),
+            "-c", str(int(self.config.get('memcached_max_connections', 1024))),
+            "-t", str(int(self.config.get('memcached_threads', 4))),
+        ]
+        # -M: con la memoria llena devuelve error en vez de expulsar las claves más viejas.
+        if not self.config.get('memcached_eviction', True):
+            arguments.append("-M")
+        return arguments
+
+    def configure(self):
+        """True si los argumentos difieren de los del proceso en marcha."""
+        return inputs_digest(self.get_arguments()) != self._running_digest
+
+    def get_start_command(self):
+        arguments = self.get_arguments()
+        self._running_digest = inputs_digest(arguments)
+        return [str(self.get_executable()), *arguments]
+
+    def probe(self):
+        return memcached_probe(HOST, self.port)
+
+    def session_save_path(self):
+        return f"{HOST}:{self.port}"
+
+    def app_env(self):
+        # Formato de lista de servidores que esperan Memcached::addServers y los frameworks.
+        return {self.env_var: f"{HOST}:{self.port}"}
+
+
+SERVICE_DEFINITIONS = {
+    RedisManager.name: RedisManager,
+    MemcachedManager.name: MemcachedManager,
+}
+
+
+def create_services(bin_path, config):
+    """
+    Gestores de los servicios opcionales activos: los de `cache_services`
+    en services.json o, si no se indica, los que estén instalados en bin/.
+    """
+    names = config.get('cache_services')
+    services = {}
+    for name, definition in SERVICE_DEFINITIONS.items():
+        if names is not None and name not in names:
+            continue
+        service = definition(bin_path, config)
+        if names is not None or service.is_installed():
+            services[name] = service
+    return services
@@ -0,0 +1,102 @@
+import hashlib
+import json
+import os
+import tempfile
+from collections import namedtuple
+from pathlib import Path
+
+RenderResult = namedtuple("RenderResult", "path changed digest")
+
+
+class InvalidConfigError(ValueError):
+    """La configuración generada no pasó la validación; el archivo en uso no se tocó."""
+
+
+def content_digest(content):
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def inputs_digest(inputs):
+    """Huella estable de las entradas de una plantilla (dicts, rutas, versiones...)."""
+    encoded = json.dumps(inputs, sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def atomic_write(path, content, validate=None):
+    """
+    Escribe en un temporal del mismo directorio y lo renombra encima del
+    destino, de modo que nadie llegue a leer un archivo a medio escribir.
+
+    `validate(ruta_temporal)` -> (ok, salida) se ejecuta antes del rename;
+    si falla se lanza InvalidConfigError y el destino queda como estaba.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        if validate is not None:
+            ok, output = validate(Path(tmp_name))
+            if not ok:
+                raise InvalidConfigError(output)
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
+
+
+class ConfigRenderer:
+    """
+    Genera archivos de configuración sólo cuando hace falta.
+
+    Si las entradas no cambiaron se reutiliza el texto ya generado, y el
+    archivo sólo se reescribe cuando su contenido en disco difiere. El
+    resultado indica si hubo cambios, para que el llamador decida si debe
+    recargar o reiniciar el servicio. Con `validate` el texto nuevo se
+    comprueba en un temporal antes de sustituir al archivo en uso (ver
+    atomic_write); si no es válido no se recuerda, y la próxima llamada lo
+    vuelve a intentar.
+    """
+
+    def __init__(self):
+        # ruta -> (huella de entradas, contenido, huella de contenido, (mtime_ns, tamaño))
+        self._cache = {}
+
+    def render(self, path, inputs, render_fn, validate=None):
+        path = Path(path)
+        key = str(path)
+        digest_in = inputs_digest(inputs)
+        cached = self._cache.get(key)
+
+        if cached and cached[0] == digest_in:
+            content, digest = cached[1], cached[2]
+        else:
+            content = render_fn()
+            digest = content_digest(content)
+
+        if not self._matches_disk(path, digest, cached):
+            atomic_write(path, content, validate)
+            changed = True
+        else:
+            changed = False
+
+        stat = path.stat()
+        self._cache[key] = (digest_in, content, digest, (stat.st_mtime_ns, stat.st_size))
+        return RenderResult(path, changed, digest)
+
+    def _matches_disk(self, path, digest, cached):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return False
+        # Si nadie tocó el archivo desde nuestra última escritura no hace falta leerlo.
+        if cached and cached[2] == digest and cached[3] == (stat.st_mtime_ns, stat.st_size):
+            return True
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            return content_digest(f.read()) == digest
@@ -0,0 +1,361 @@
+import ctypes
+import ctypes.util
+import math
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+from .asset_pipeline import COMPRESSIBLE_TYPES
+from .vhost_manager import PUBLIC_DIRS
+
+# Claves de services.json que no afectan a ningún proceso en marcha: se leen
+# cuando hacen falta (reinicios, telemetría, instantáneas...).
+NO_RELOAD_KEYS = (
+    'php_version',  # el cambio de versión tiene su propio camino sin cortes
+    'restart_', 'crash_loop_', 'telemetry_', 'readiness_', 'auto_ports', 'watch_',
+    'snapshot_', 'asset_', 'service_dependencies', 'mysql_user', 'mysql_password',
+    'ssl_key_type', 'ssl_renew_days',
+)
+# Servicios afectados por cada prefijo de clave; 'php_fpm' abarca todos los pools.
+KEY_SERVICES = (
+    ('apache_', ('apache',)),
+    ('mysql_', ('mysql',)),
+    ('php_fpm', ('php_fpm',)),
+    ('php_', ('php_fpm', 'apache')),
+    ('precompressed_assets', ('apache',)),
+    ('vhost_', ('apache',)),
+    # El puerto de un servicio de caché también cambia php.ini y los DSN de Apache.
+    ('redis_', ('redis', 'php_fpm', 'apache')),
+    ('memcached_', ('memcached', 'php_fpm', 'apache')),
+)
+SKIP_DIRS = {'node_modules', 'vendor'}
+# Extensiones que escriben el propio PyLaragon dentro de www/.
+GENERATED_SUFFIXES = ('.br', '.gz', '.tmp')
+
+# inotify(7)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = (
+    IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+)
+EVENT_HEADER = struct.Struct('iIII')
+
+
+def affected_services(changed_keys, services):
+    """
+    Servicios de `services` que dependen de alguna clave de `changed_keys`.
+    Una clave desconocida afecta a todos: reload_service ya descarta los que
+    no cambian. Los pools FPM van primero para que Apache los encuentre listos.
+    """
+    affected = set()
+    for key in changed_keys:
+        if key.startswith(NO_RELOAD_KEYS):
+            continue
+        for prefix, names in KEY_SERVICES:
+            if key.startswith(prefix):
+                affected.update(s for s in services if any(s == n or s.startswith(n) for n in names))
+                break
+        else:
+            affected.update(services)
+    return sorted(affected, key=lambda name: (not name.startswith('php_fpm'), name))
+
+
+def classify_changes(paths, config_path, vhosts_path, www_path):
+    """
+    Qué hay que hacer con un lote de rutas cambiadas: releer services.json,
+    resincronizar hosts virtuales (vhosts.json, un proyecto nuevo o borrado
+    en www/, o su carpeta pública) o precomprimir recursos. El resto de
+    cambios en www/ (código PHP, plantillas...) no necesita nada.
+    """
+    plan = {'config': False, 'vhosts': False, 'assets': False, 'ignored': 0}
+    for path in paths:
+        path = Path(path)
+        if path == config_path:
+            plan['config'] = True
+            continue
+        if path == config_path.parent:
+            # El directorio entero (se perdieron eventos): se revisa todo.
+            plan['config'] = plan['vhosts'] = True
+            continue
+        if path == vhosts_path:
+            plan['vhosts'] = True
+            continue
+        try:
+            parts = path.relative_to(www_path).parts
+        except ValueError:
+            plan['ignored'] += 1
+            continue
+        if not parts:
+            plan['vhosts'] = plan['assets'] = True
+        elif len(parts) == 1 or (len(parts) == 2 and parts[1] in PUBLIC_DIRS):
+            plan['vhosts'] = True
+        elif path.suffix[1:].lower() in COMPRESSIBLE_TYPES:
+            plan['assets'] = True
+        else:
+            plan['ignored'] += 1
+    return plan
+
+
+def _ignored(name):
+    return name.startswith('.') or name.endswith(GENERATED_SUFFIXES)
+
+
+class _Inotify:
+    """Backend inotify (Linux) por ctypes: un watch por directorio."""
+
+    name = 'inotify'
+
+    def __init__(self, roots):
+        libc_name = ctypes.util.find_library('c') or 'libc.so.6'
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1")
+        self._dirs = {}
+        self._recursive = {}
+        for root, recursive in roots:
+            self._add_tree(Path(root), recursive)
+
+    def _add_watch(self, path, recursive):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(str(path)), WATCH_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            # ENOENT/ENOTDIR: el directorio desapareció mientras se recorría.
+            if errno not in (2, 20):
+                raise OSError(errno, f"inotify_add_watch {path}")
+            return
+        self._dirs[wd] = path
+        self._recursive[wd] = recursive
+
+    def _add_tree(self, root, recursive):
+        """
+        Vigila `root` (y sus subdirectorios si `recursive`). Devuelve lo que ya
+        contenía: en un directorio recién creado pueden haberse escrito
+        archivos antes de que llegara a tener su propio watch.
+        """
+        found = []
+        if not root.is_dir():
+            return found
+        self._add_watch(root, recursive)
+        if not recursive:
+            return found
+        for current, dirs, files in os.walk(root):
+            dirs[:] = [d for d in dirs if not _ignored(d) and d not in SKIP_DIRS]
+            for d in dirs:
+                self._add_watch(Path(current) / d, True)
+            found.extend(Path(current) / name for name in dirs + files if not _ignored(name))
+        return found
+
+    def read(self, timeout):
+        """Rutas cambiadas que llegan antes de `timeout` segundos (lista vacía si ninguna)."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 65536)
+        except BlockingIOError:
+            return []
+        changed = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0').decode(sys.getfilesystemencoding(), 'replace')
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                # Se perdieron eventos: se dan por cambiados todos los directorios.
+                changed.extend(self._dirs.values())
+                continue
+            directory = self._dirs.get(wd)
+            if directory is None:
+                continue
+            if mask & IN_IGNORED:
+                self._dirs.pop(wd, None)
+                self._recursive.pop(wd, None)
+                continue
+            if not name:
+                changed.append(directory)
+                continue
+            if _ignored(name):
+                continue
+            path = directory / name
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO) and self._recursive.get(wd):
+                if name not in SKIP_DIRS:
+                    changed.extend(self._add_tree(path, True))
+            changed.append(path)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class _Polling:
+    """Backend portátil: compara mtime y tamaño de cada entrada en cada vuelta."""
+
+    name = 'polling'
+
+    def __init__(self, roots, interval=1.0):
+        self.roots = [(Path(root), recursive) for root, recursive in roots]
+        self.interval = interval
+        self._snapshot = self._scan()
+
+    def _scan(self):
+        snapshot = {}
+        for root, recursive in self.roots:
+            if not root.is_dir():
+                continue
+            for current, dirs, files in os.walk(root):
+                dirs[:] = [d for d in dirs if not _ignored(d) and d not in SKIP_DIRS] if recursive else []
+                for name in dirs + files:
+                    if _ignored(name):
+                        continue
+                    path = Path(current) / name
+                    try:
+                        stat = path.stat()
+                    except OSError:
+                        continue
+                    snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def read(self, timeout):
+        time.sleep(min(timeout, self.interval))
+        current = self._scan()
+        previous, self._snapshot = self._snapshot, current
+        return [
+            path for path in previous.keys() | current.keys()
+            if previous.get(path) != current.get(path)
+        ]
+
+    def close(self):
+        pass
+
+
+class ConfigWatcher:
+    """
+    Vigila config/ y www/ y agrupa las ráfagas de cambios: un editor que
+    guarda en varios pasos o un `git checkout` producen una sola llamada a
+    `callback(rutas, primer_evento)` cuando pasan `debounce` segundos sin
+    cambios (o `max_wait` desde el primero, si no paran de llegar).
+    `primer_evento` es time.monotonic() del primer cambio del lote.
+
+    Usa inotify en Linux y sondeo en el resto de plataformas (o si inotify
+    no está disponible).
+    """
+
+    def __init__(self, roots, callback, debounce=0.25, max_wait=2.0, poll_interval=1.0, backend=None):
+        self.roots = roots
+        self.callback = callback
+        self.debounce = debounce
+        self.max_wait = max_wait
+        self.poll_interval = poll_interval
+        self.backend_name = backend
+        self.backend = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def _open_backend(self):
+        if self.backend_name != 'polling' and sys.platform.startswith('linux'):
+            try:
+                return _Inotify(self.roots)
+            except (OSError, AttributeError) as e:
+                print(f"⚠️ inotify no disponible ({e}); se vigilarán los archivos por sondeo.")
+        return _Polling(self.roots, self.poll_interval)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self.backend = self._open_backend()
+        self._thread = threading.Thread(target=self._run, name="config-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self.backend is not None:
+            self.backend.close()
+            self.backend = None
+
+    def _run(self):
+        pending = set()
+        first_seen = last_seen = None
+        while not self._stop.is_set():
+            if pending:
+                now = time.monotonic()
+                timeout = max(0.0, min(last_seen + self.debounce, first_seen + self.max_wait) - now)
+            else:
+                timeout = 0.5
+            try:
+                changed = self.backend.read(timeout)
+            except OSError as e:
+                # Límite de vigilancias agotado (ENOSPC) al añadir una carpeta
+                # nueva, descriptor cerrado...: sin esto el hilo moriría en silencio.
+                if isinstance(self.backend, _Polling):
+                    raise
+                print(f"⚠️ inotify falló ({e}); se vigilarán los archivos por sondeo.")
+                self.backend.close()
+                self.backend = _Polling(self.roots, self.poll_interval)
+                # Lo que cambió antes del cambio de backend ya no se verá:
+                # las raíces en el lote fuerzan a revisarlo todo.
+                now = time.monotonic()
+                if not pending:
+                    first_seen = now
+                pending.update(Path(root) for root, _ in self.roots)
+                last_seen = now
+                continue
+            now = time.monotonic()
+            if changed:
+                if not pending:
+                    first_seen = now
+                pending.update(changed)
+                last_seen = now
+            if pending and (now - last_seen >= self.debounce or now - first_seen >= self.max_wait):
+                batch, pending = pending, set()
+                try:
+                    self.callback(batch, first_seen)
+                except Exception as e:
+                    print(f"❌ Error aplicando cambios de archivos: {e}")
+
+
+class LatencyLog:
+    """Últimos lotes aplicados y su latencia desde el primer evento hasta el efecto."""
+
+    def __init__(self, capacity=100):
+        self.entries = deque(maxlen=capacity)
+
+    def add(self, entry):
+        self.entries.append(entry)
+
+    def summary(self):
+        totals = sorted(e['total_seconds'] for e in self.entries)
+        if not totals:
+            return {'batches': 0}
+
+        def percentile(q):
+            return totals[min(len(totals) - 1, max(0, math.ceil(len(totals) * q / 100) - 1))]
+
+        return {
+            'batches': len(totals),
+            'p50': percentile(50),
+            'p95': percentile(95),
+            'max': totals[-1],
+        }
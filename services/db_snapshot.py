@@ -0,0 +1,573 @@
+import gzip
+import hashlib
+import json
+import os
+import re
+import secrets
+import shutil
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from .config_renderer import atomic_write
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+CHUNK_SIZE = 1024 * 1024
+MANIFEST_NAME = "manifest.json"
+OBJECTS_NAME = "_objects"
+
+# Índices secundarios de un CREATE TABLE de mysqldump. PRIMARY KEY se queda en
+# la tabla: InnoDB organiza los datos por ella y cambiarla después la reescribe.
+_SECONDARY_KEY_RE = re.compile(r"^\s+(UNIQUE |FULLTEXT |SPATIAL )?KEY ")
+_AUTO_INCREMENT_RE = re.compile(r"^\s+`((?:[^`]|``)+)`.*\bAUTO_INCREMENT\b")
+_PRIMARY_KEY_RE = re.compile(r"^\s+PRIMARY KEY \((.*)\)")
+_REFERENCES_RE = re.compile(r"REFERENCES `((?:[^`]|``)+)`")
+
+
+def quote_name(name):
+    return "`" + name.replace("`", "``") + "`"
+
+
+def quote_string(value):
+    return "'" + value.replace("\\", "\\\\").replace("'", "''") + "'"
+
+
+def _read_stderr(file):
+    file.seek(0)
+    return file.read().decode('utf-8', 'replace').strip()
+
+
+def referenced_tables(create_sql):
+    """Tablas a las que apuntan las claves foráneas de un CREATE TABLE."""
+    return {name.replace("``", "`") for name in _REFERENCES_RE.findall(create_sql)}
+
+
+def split_secondary_indexes(create_sql, keep=False):
+    """
+    Separa los índices secundarios de un CREATE TABLE. Devuelve
+    (sql_sin_índices, [definición, ...]). No se separa nada con `keep` (otra
+    tabla la referencia), si tiene claves foráneas o si su columna
+    AUTO_INCREMENT no está en la clave primaria: todas necesitan sus índices
+    desde el primer INSERT.
+    """
+    lines = create_sql.split("\n")
+    if keep or "FOREIGN KEY" in create_sql:
+        return create_sql, []
+
+    auto_increment = None
+    primary_key = ""
+    for line in lines:
+        match = _AUTO_INCREMENT_RE.match(line)
+        if match:
+            auto_increment = match.group(1)
+        match = _PRIMARY_KEY_RE.match(line)
+        if match:
+            primary_key = match.group(1)
+    if auto_increment and quote_name(auto_increment) not in primary_key:
+        return create_sql, []
+
+    kept, indexes = [], []
+    for line in lines:
+        if _SECONDARY_KEY_RE.match(line):
+            indexes.append(line.strip().rstrip(","))
+        else:
+            kept.append(line)
+    if not indexes:
+        return create_sql, []
+
+    # La última definición que queda antes del paréntesis de cierre no puede
+    # terminar en coma.
+    for i, line in enumerate(kept):
+        if line.startswith(")") and i > 0:
+            kept[i - 1] = kept[i - 1].rstrip(",")
+            break
+    return "\n".join(kept), indexes
+
+
+class _Compression:
+    """Escritura y lectura en streaming con zstd (si está instalado) o gzip."""
+
+    def __init__(self, name):
+        if name == 'zstd' and zstandard is None:
+            raise RuntimeError("La instantánea usa zstd y el paquete `zstandard` no está instalado.")
+        if name not in ('zstd', 'gzip'):
+            raise ValueError(f"Compresión desconocida: {name}")
+        self.name = name
+        self.suffix = ".zst" if name == 'zstd' else ".gz"
+
+    def writer(self, f):
+        if self.name == 'zstd':
+            return zstandard.ZstdCompressor(level=3, threads=0).stream_writer(f)
+        # Nivel 1: al volcar varios GB la velocidad importa más que el tamaño.
+        return gzip.GzipFile(fileobj=f, mode='wb', compresslevel=1)
+
+    def reader(self, f):
+        if self.name == 'zstd':
+            return zstandard.ZstdDecompressor().stream_reader(f)
+        return gzip.GzipFile(fileobj=f, mode='rb')
+
+
+class SnapshotManager:
+    """
+    Instantáneas de bases de datos con mysqldump, una tabla por hilo.
+
+    Cada tabla se vuelca en dos archivos comprimidos (estructura y datos) sin
+    cargarla nunca entera en memoria: la salida de mysqldump pasa por bloques
+    al compresor y al checksum. El manifiesto se escribe al final, así una
+    instantánea sin manifest.json está incompleta y no se puede restaurar.
+
+    Cada tabla es consistente en sí misma (--single-transaction), pero las
+    tablas se vuelcan en transacciones distintas: conviene no escribir en la
+    base de datos mientras se toma la instantánea.
+    """
+
+    def __init__(self, mysql_manager, config, snapshots_path):
+        self.mysql_manager = mysql_manager
+        self.config = config
+        self.snapshots_path = Path(snapshots_path)
+
+    # --- Clientes de MySQL ---
+
+    def find_client(self, *names):
+        bin_dir = self.mysql_manager.mysql_path / "bin"
+        for name in names:
+            for candidate in (bin_dir / f"{name}.exe", bin_dir / name):
+                if candidate.exists():
+                    return str(candidate)
+        found = shutil.which(names[0])
+        if found:
+            return found
+        raise FileNotFoundError(f"❌ No se encontró {names[0]} en {bin_dir} ni en el PATH.")
+
+    def _connection_args(self):
+        return [
+            "--protocol=TCP",
+            "--host=127.0.0.1",
+            f"--port={self.config['mysql_port']}",
+            f"--user={self.config.get('mysql_user', 'root')}",
+            "--default-character-set=utf8mb4",
+        ]
+
+    def _env(self):
+        env = os.environ.copy()
+        password = self.config.get('mysql_password', '')
+        if password:
+            env['MYSQL_PWD'] = password
+        return env
+
+    def _dump_command(self, database, *args):
+        return [self.find_client("mysqldump", "mariadb-dump"), *self._connection_args(), *args, database]
+
+    def _client_command(self, *args):
+        return [self.find_client("mysql", "mariadb"), *self._connection_args(), *args]
+
+    def query(self, sql, database=None):
+        """Ejecuta `sql` con el cliente mysql y devuelve las filas como listas."""
+        cmd = self._client_command("--batch", "--skip-column-names", "-e", sql)
+        if database:
+            cmd.append(database)
+        result = subprocess.run(cmd, capture_output=True, text=True, env=self._env())
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip())
+        return [line.split("\t") for line in result.stdout.splitlines()]
+
+    def _is_mariadb(self):
+        version = self.mysql_manager.get_server_version()
+        return bool(version and version[1])
+
+    # --- Instantánea ---
+
+    def list_tables(self, database):
+        """[(tabla, tipo, bytes)] ordenadas de mayor a menor."""
+        rows = self.query(
+            "SELECT TABLE_NAME, TABLE_TYPE, COALESCE(DATA_LENGTH, 0) + COALESCE(INDEX_LENGTH, 0) "
+            f"FROM information_schema.TABLES WHERE TABLE_SCHEMA = {quote_string(database)}"
+        )
+        tables = [(name, kind, int(size)) for name, kind, size in rows]
+        return sorted(tables, key=lambda t: t[2], reverse=True)
+
+    def database_charset(self, database):
+        """(charset, collation) por defecto de `database`, o None si no existe."""
+        rows = self.query(
+            "SELECT DEFAULT_CHARACTER_SET_NAME, DEFAULT_COLLATION_NAME "
+            f"FROM information_schema.SCHEMATA WHERE SCHEMA_NAME = {quote_string(database)}"
+        )
+        return tuple(rows[0]) if rows else None
+
+    def _stream_to_file(self, cmd, path, compression):
+        """Vuelca la salida de `cmd` comprimida en `path`. Devuelve su checksum y tamaños."""
+        digest = hashlib.blake2b(digest_size=32)
+        size = 0
+        # stderr va a un archivo temporal: una tubería que nadie lee se llenaría
+        # con los avisos y bloquearía al proceso mientras leemos stdout.
+        with open(path, 'wb') as raw, tempfile.TemporaryFile() as errors:
+            process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=errors, env=self._env())
+            with compression.writer(raw) as out:
+                while True:
+                    chunk = process.stdout.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    out.write(chunk)
+                    size += len(chunk)
+            if process.wait() != 0:
+                stderr = _read_stderr(errors)
+                raise RuntimeError(stderr or f"{Path(cmd[0]).name} terminó con código {process.returncode}")
+        return {
+            'file': path.name,
+            'checksum': digest.hexdigest(),
+            'bytes': size,
+            'compressed_bytes': path.stat().st_size,
+        }
+
+    def _dump_table(self, database, table, kind, directory, compression):
+        common = ["--skip-triggers", "--skip-comments", "--hex-blob"]
+        if not self._is_mariadb():
+            common.append("--set-gtid-purged=OFF")
+        entry = {'type': kind}
+        entry['schema'] = self._stream_to_file(
+            self._dump_command(database, "--no-data", *common) + [table],
+            directory / f"{table}.schema.sql{compression.suffix}",
+            compression,
+        )
+        if kind != 'VIEW':
+            entry['data'] = self._stream_to_file(
+                self._dump_command(
+                    database, "--no-create-info", "--single-transaction", "--quick",
+                    "--skip-lock-tables", "--extended-insert", *common,
+                ) + [table],
+                directory / f"{table}.data.sql{compression.suffix}",
+                compression,
+            )
+        return entry
+
+    def snapshot(self, database, name=None, workers=None, compression=None):
+        """
+        Toma una instantánea de `database`. Las tablas grandes se reparten
+        primero para que ningún hilo se quede con la más pesada al final.
+        Devuelve {'ok', 'name', 'seconds', 'errors'}.
+        """
+        start = time.perf_counter()
+        name = name or time.strftime("%Y%m%d-%H%M%S")
+        compression = _Compression(compression or self.config.get(
+            'snapshot_compression', 'zstd' if zstandard else 'gzip'))
+        workers = workers or self.config.get('snapshot_workers', min(8, os.cpu_count() or 1))
+
+        directory = self.snapshots_path / database / name
+        if directory.exists():
+            raise FileExistsError(f"Ya existe la instantánea {database}/{name}")
+        directory.mkdir(parents=True)
+        print(f"📸 Creando instantánea {database}/{name} con {workers} hilo(s)...")
+
+        tables = self.list_tables(database)
+        results, errors = {}, {}
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                table: pool.submit(self._dump_table, database, table, kind, directory, compression)
+                for table, kind, _ in tables
+            }
+            futures[OBJECTS_NAME] = pool.submit(self._dump_objects, database, directory, compression)
+            for table, future in futures.items():
+                try:
+                    results[table] = future.result()
+                except Exception as e:
+                    errors[table] = str(e)
+
+        seconds = time.perf_counter() - start
+        if errors:
+            shutil.rmtree(directory, ignore_errors=True)
+            for table, error in errors.items():
+                print(f"❌ Error al volcar {table}: {error}")
+            return {'ok': False, 'name': name, 'seconds': seconds, 'errors': errors}
+
+        objects = results.pop(OBJECTS_NAME)
+        charset, collation = self.database_charset(database) or (None, None)
+        manifest = {
+            'database': database,
+            'name': name,
+            'created': time.strftime("%Y-%m-%dT%H:%M:%S"),
+            'server_version': self.mysql_manager.get_server_version(),
+            'charset': charset,
+            'collation': collation,
+            'compression': compression.name,
+            'checksum_algorithm': 'blake2b-256',
+            'seconds': round(seconds, 3),
+            'tables': results,
+            'objects': objects,
+        }
+        atomic_write(directory / MANIFEST_NAME, json.dumps(manifest, indent=2))
+        total = sum(t.get('data', {}).get('bytes', 0) for t in results.values())
+        print(f"✅ Instantánea {database}/{name}: {len(results)} tabla(s), {total / (1024 * 1024):.1f} MB en {seconds:.1f} s.")
+        return {'ok': True, 'name': name, 'seconds': seconds, 'errors': {}}
+
+    def _dump_objects(self, database, directory, compression):
+        """Triggers, rutinas y eventos: se restauran al final, tras cargar los datos."""
+        return self._stream_to_file(
+            self._dump_command(
+                database, "--no-data", "--no-create-info", "--skip-comments",
+                "--routines", "--events", "--triggers",
+            ),
+            directory / f"{OBJECTS_NAME}.sql{compression.suffix}",
+            compression,
+        )
+
+    # --- Restauración ---
+
+    def load_manifest(self, database, name):
+        path = self.snapshots_path / database / name / MANIFEST_NAME
+        if not path.exists():
+            raise FileNotFoundError(f"No existe la instantánea {database}/{name} o está incompleta.")
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def list_snapshots(self, database=None):
+        """Instantáneas completas: [{'database', 'name', 'created', 'tables'}]."""
+        snapshots = []
+        databases = [database] if database else (
+            [p.name for p in self.snapshots_path.iterdir() if p.is_dir()] if self.snapshots_path.exists() else []
+        )
+        for db in databases:
+            db_path = self.snapshots_path / db
+            if not db_path.exists():
+                continue
+            for path in sorted(db_path.iterdir()):
+                if (path / MANIFEST_NAME).exists():
+                    manifest = self.load_manifest(db, path.name)
+                    snapshots.append({
+                        'database': db,
+                        'name': path.name,
+                        'created': manifest['created'],
+                        'tables': len(manifest['tables']),
+                    })
+        return snapshots
+
+    def delete_snapshot(self, database, name):
+        shutil.rmtree(self.snapshots_path / database / name)
+
+    def _read_verified(self, directory, entry, compression):
+        """Descomprime un archivo de la instantánea comprobando su checksum. Devuelve bytes."""
+        return b"".join(self._iter_verified(directory, entry, compression))
+
+    def _iter_verified(self, directory, entry, compression):
+        digest = hashlib.blake2b(digest_size=32)
+        with open(directory / entry['file'], 'rb') as raw, compression.reader(raw) as stream:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                yield chunk
+        if digest.hexdigest() != entry['checksum']:
+            raise RuntimeError(f"El checksum de {entry['file']} no coincide: la instantánea está dañada.")
+
+    def _run_sql(self, database, chunks):
+        """Envía `chunks` (bytes) al cliente mysql por su entrada estándar."""
+        with tempfile.TemporaryFile() as errors:
+            process = subprocess.Popen(
+                self._client_command(database),
+                stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=errors, env=self._env(),
+            )
+            try:
+                for chunk in chunks:
+                    process.stdin.write(chunk)
+            except BrokenPipeError:
+                # El cliente se detuvo por un error de SQL; el motivo está en stderr.
+                pass
+            finally:
+                try:
+                    process.stdin.close()
+                except BrokenPipeError:
+                    pass
+            if process.wait() != 0:
+                raise RuntimeError(_read_stderr(errors))
+
+    def _create_table(self, database, schema, keep_indexes):
+        schema, indexes = split_secondary_indexes(schema, keep=keep_indexes)
+        prefix = "SET SESSION foreign_key_checks = 0;\n"
+        self._run_sql(database, [(prefix + schema).encode('utf-8')])
+        return indexes
+
+    def _load_table(self, database, directory, entry, compression):
+        prefix = b"SET SESSION foreign_key_checks = 0;\nSET SESSION unique_checks = 0;\n"
+        self._run_sql(database, [prefix, *self._iter_verified(directory, entry['data'], compression)])
+
+    def _add_indexes(self, database, table, indexes):
+        # Un solo ALTER para que InnoDB ordene los datos una vez por tabla.
+        adds = ",\n  ".join(f"ADD {definition}" for definition in indexes)
+        self._run_sql(database, [f"ALTER TABLE {quote_name(table)}\n  {adds};\n".encode('utf-8')])
+
+    def _verify(self, directory, entry, compression):
+        """Descomprime un archivo de la instantánea sólo para comprobar su checksum."""
+        for _ in self._iter_verified(directory, entry, compression):
+            pass
+
+    def restore(self, database, name, target=None, workers=None):
+        """
+        Restaura la instantánea `database/name` en `target` (por defecto la
+        misma base de datos, que se recrea vacía). Fases:
+
+        0. Comprueba el checksum de todos los archivos; si alguno falla no se
+           toca ninguna base de datos.
+        1. Crea las tablas en paralelo sin sus índices secundarios, en una
+           base de datos temporal.
+        2. Carga los datos en paralelo, sin comprobaciones de claves.
+        3. Crea los índices diferidos con un ALTER por tabla, en paralelo.
+        4. Con un solo RENAME TABLE (atómico, sólo metadatos) aparta las
+           tablas antiguas de `target` y le pasa las nuevas; las antiguas se
+           borran después. Si algo falla antes, `target` sigue intacta.
+        5. Crea vistas, triggers, rutinas y eventos.
+
+        Devuelve {'ok', 'seconds', 'errors'}.
+        """
+        start = time.perf_counter()
+        manifest = self.load_manifest(database, name)
+        compression = _Compression(manifest['compression'])
+        directory = self.snapshots_path / database / name
+        target = target or database
+        workers = workers or self.config.get('snapshot_workers', min(8, os.cpu_count() or 1))
+        tables = {t: e for t, e in manifest['tables'].items() if e['type'] != 'VIEW'}
+        views = {t: e for t, e in manifest['tables'].items() if e['type'] == 'VIEW'}
+
+        errors = {}
+
+        def run_phase(action, items):
+            results = {}
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = {key: pool.submit(action, key, value) for key, value in items.items()}
+                for key, future in futures.items():
+                    try:
+                        results[key] = future.result()
+                    except Exception as e:
+                        errors[key] = str(e)
+            return results
+
+        def failed():
+            seconds = time.perf_counter() - start
+            for table, error in errors.items():
+                print(f"❌ Error al restaurar {table}: {error}")
+            return {'ok': False, 'seconds': seconds, 'errors': errors}
+
+        print(f"🔍 Comprobando la instantánea {database}/{name}...")
+        files = {OBJECTS_NAME: manifest['objects']}
+        for table, entry in manifest['tables'].items():
+            files[f"{table}.schema"] = entry['schema']
+            if 'data' in entry:
+                files[f"{table}.data"] = entry['data']
+        run_phase(lambda key, entry: self._verify(directory, entry, compression), files)
+        if errors:
+            return failed()
+
+        print(f"♻️ Restaurando {database}/{name} en {target} con {workers} hilo(s)...")
+        # Nombre único: dos restauraciones de la misma base no comparten la temporal.
+        token = secrets.token_hex(4)
+        staging = f"_restore_{token}_{target}"[:64]
+        quoted, quoted_staging = quote_name(target), quote_name(staging)
+        # Las instantáneas antiguas no guardan el juego de caracteres: se
+        # conserva el de `target` o, si no existe, el del servidor.
+        charset = ""
+        if manifest.get('charset'):
+            charset = f" CHARACTER SET {manifest['charset']} COLLATE {manifest['collation']}"
+        self.query(f"CREATE DATABASE {quoted_staging}{charset}")
+
+        # Las tablas a las que apunta una clave foránea conservan sus índices:
+        # el CREATE de la tabla hija los necesita.
+        schemas = {
+            t: self._read_verified(directory, e['schema'], compression).decode('utf-8')
+            for t, e in tables.items()
+        }
+        referenced = set()
+        for schema in schemas.values():
+            referenced |= referenced_tables(schema)
+        deferred = run_phase(
+            lambda t, schema: self._create_table(staging, schema, t in referenced), schemas)
+        if not errors:
+            # Las tablas más grandes primero, igual que al volcar.
+            by_size = dict(sorted(tables.items(), key=lambda item: item[1]['data']['bytes'], reverse=True))
+            run_phase(lambda t, e: self._load_table(staging, directory, e, compression), by_size)
+        if not errors:
+            run_phase(lambda t, indexes: self._add_indexes(staging, t, indexes),
+                      {t: indexes for t, indexes in deferred.items() if indexes})
+        if errors:
+            try:
+                self.query(f"DROP DATABASE IF EXISTS {quoted_staging}")
+            except RuntimeError as e:
+                print(f"⚠️ No se pudo borrar la base de datos temporal {staging}: {e}")
+            return failed()
+
+        try:
+            previous = self._swap_tables(target, staging, list(tables), charset, token)
+        except RuntimeError as e:
+            errors['swap'] = str(e)
+            try:
+                self.query(f"DROP DATABASE IF EXISTS {quoted_staging}")
+            except RuntimeError as e:
+                print(f"⚠️ No se pudo borrar la base de datos temporal {staging}: {e}")
+            return failed()
+        try:
+            self._drop_previous(target, previous)
+            self.query(f"DROP DATABASE {quoted_staging}")
+        except RuntimeError as e:
+            errors['cleanup'] = str(e)
+            return failed()
+
+        for view, entry in views.items():
+            try:
+                self._run_sql(target, [self._read_verified(directory, entry['schema'], compression)])
+            except Exception as e:
+                errors[view] = str(e)
+        if not errors:
+            try:
+                self._run_sql(target, self._iter_verified(directory, manifest['objects'], compression))
+            except Exception as e:
+                errors[OBJECTS_NAME] = str(e)
+        if errors:
+            return failed()
+
+        seconds = time.perf_counter() - start
+        print(f"✅ {target} restaurada en {seconds:.1f} s.")
+        return {'ok': True, 'seconds': seconds, 'errors': {}}
+
+    def _swap_tables(self, target, staging, tables, charset, token):
+        """
+        Pasa las tablas de `staging` a `target` con un solo RENAME TABLE: las
+        tablas antiguas se renombran dentro de `target` (así conservan sus
+        triggers) y las nuevas ocupan su nombre. Si el RENAME falla no se ha
+        movido nada. Devuelve los nombres con los que quedaron las antiguas.
+        """
+        quoted, quoted_staging = quote_name(target), quote_name(staging)
+        existing = self.database_charset(target)
+        if existing is None:
+            self.query(f"CREATE DATABASE {quoted}{charset}")
+        elif charset:
+            self.query(f"ALTER DATABASE {quoted}{charset}")
+        old = [t for t, kind, _ in self.list_tables(target) if kind != 'VIEW']
+        previous = {t: f"_old_{token}_{i}" for i, t in enumerate(old)}
+        renames = [f"{quoted}.{quote_name(t)} TO {quoted}.{quote_name(n)}" for t, n in previous.items()]
+        renames += [f"{quoted_staging}.{quote_name(t)} TO {quoted}.{quote_name(t)}" for t in tables]
+        if renames:
+            self.query(f"RENAME TABLE {', '.join(renames)}")
+        return list(previous.values())
+
+    def _drop_previous(self, target, previous):
+        """Borra de `target` lo que había antes del RENAME: tablas, vistas, rutinas y eventos."""
+        quoted, literal = quote_name(target), quote_string(target)
+        statements = ["SET FOREIGN_KEY_CHECKS = 0"]
+        statements += [f"DROP TABLE {quoted}.{quote_name(t)}" for t in previous]
+        statements += [
+            f"DROP VIEW {quoted}.{quote_name(t)}"
+            for t, kind, _ in self.list_tables(target) if kind == 'VIEW'
+        ]
+        for name, kind in self.query(
+                "SELECT ROUTINE_NAME, ROUTINE_TYPE FROM information_schema.ROUTINES "
+                f"WHERE ROUTINE_SCHEMA = {literal}"):
+            statements.append(f"DROP {kind} {quoted}.{quote_name(name)}")
+        for (name,) in self.query(
+                f"SELECT EVENT_NAME FROM information_schema.EVENTS WHERE EVENT_SCHEMA = {literal}"):
+            statements.append(f"DROP EVENT {quoted}.{quote_name(name)}")
+        if len(statements) > 1:
+            self.query("; ".join(statements))
@@ -0,0 +1,142 @@
+import datetime
+import ipaddress
+from pathlib import Path
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+from cryptography.x509.oid import ExtendedKeyUsageOID, NameOID
+
+from .config_renderer import atomic_write
+
+CA_VALIDITY_DAYS = 3650
+# Los navegadores rechazan certificados de servidor de más de 398 días.
+LEAF_VALIDITY_DAYS = 397
+
+
+def generate_key(key_type="rsa"):
+    if key_type == "ecdsa":
+        return ec.generate_private_key(ec.SECP256R1())
+    if key_type == "rsa":
+        return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    raise ValueError(f"Tipo de clave no soportado: {key_type}")
+
+
+def _utcnow():
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+def _not_after(cert):
+    # not_valid_after_utc existe desde cryptography 42.
+    value = getattr(cert, "not_valid_after_utc", None)
+    if value is None:
+        value = cert.not_valid_after.replace(tzinfo=datetime.timezone.utc)
+    return value
+
+
+class LocalCA:
+    """
+    Autoridad certificadora local, generada una sola vez en ssl/ca/.
+
+    Basta con confiar en ca.crt (en el sistema o en el navegador) para que
+    todos los certificados que emite para los hosts virtuales sean válidos.
+    """
+
+    def __init__(self, ca_dir):
+        self.ca_dir = Path(ca_dir)
+        self.cert_path = self.ca_dir / "ca.crt"
+        self.key_path = self.ca_dir / "ca.key"
+        self._cert = None
+        self._key = None
+
+    def ensure(self):
+        """Carga la CA o la crea si todavía no existe."""
+        if self._cert is not None:
+            return
+        if self.cert_path.exists() and self.key_path.exists():
+            self._cert = x509.load_pem_x509_certificate(self.cert_path.read_bytes())
+            self._key = serialization.load_pem_private_key(self.key_path.read_bytes(), password=None)
+            return
+
+        print("🔑 Creando la autoridad certificadora local de PyLaragon...")
+        key = generate_key("ecdsa")
+        name = x509.Name([
+            x509.NameAttribute(NameOID.ORGANIZATION_NAME, "PyLaragon"),
+            x509.NameAttribute(NameOID.COMMON_NAME, "PyLaragon Local CA"),
+        ])
+        now = _utcnow()
+        cert = (
+            x509.CertificateBuilder()
+            .subject_name(name)
+            .issuer_name(name)
+            .public_key(key.public_key())
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(now - datetime.timedelta(days=1))
+            .not_valid_after(now + datetime.timedelta(days=CA_VALIDITY_DAYS))
+            .add_extension(x509.BasicConstraints(ca=True, path_length=0), critical=True)
+            .add_extension(
+                x509.KeyUsage(
+                    digital_signature=True, content_commitment=False, key_encipherment=False,
+                    data_encipherment=False, key_agreement=False, key_cert_sign=True,
+                    crl_sign=True, encipher_only=False, decipher_only=False,
+                ),
+                critical=True,
+            )
+            .add_extension(x509.SubjectKeyIdentifier.from_public_key(key.public_key()), critical=False)
+            .sign(key, hashes.SHA256())
+        )
+        self.ca_dir.mkdir(parents=True, exist_ok=True)
+        atomic_write(self.key_path, _key_pem(key))
+        atomic_write(self.cert_path, cert.public_bytes(serialization.Encoding.PEM).decode("ascii"))
+        self._cert, self._key = cert, key
+        print(f"✅ CA local creada. Confía en {self.cert_path} para evitar avisos del navegador.")
+
+    def issue(self, hostnames, key_type="rsa", days=LEAF_VALIDITY_DAYS):
+        """
+        Emite un certificado de servidor con todos los `hostnames` como SAN
+        (el primero también como CN). Devuelve (cert_pem, key_pem, not_after).
+        """
+        self.ensure()
+        key = generate_key(key_type)
+        now = _utcnow()
+        not_after = min(now + datetime.timedelta(days=days), _not_after(self._cert))
+        cert = (
+            x509.CertificateBuilder()
+            .subject_name(x509.Name([
+                x509.NameAttribute(NameOID.ORGANIZATION_NAME, "PyLaragon"),
+                x509.NameAttribute(NameOID.COMMON_NAME, hostnames[0]),
+            ]))
+            .issuer_name(self._cert.subject)
+            .public_key(key.public_key())
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(now - datetime.timedelta(days=1))
+            .not_valid_after(not_after)
+            .add_extension(x509.SubjectAlternativeName([_san(h) for h in hostnames]), critical=False)
+            .add_extension(x509.BasicConstraints(ca=False, path_length=None), critical=True)
+            .add_extension(x509.ExtendedKeyUsage([ExtendedKeyUsageOID.SERVER_AUTH]), critical=False)
+            .add_extension(
+                x509.AuthorityKeyIdentifier.from_issuer_public_key(self._key.public_key()), critical=False
+            )
+            .sign(self._key, hashes.SHA256())
+        )
+        return cert.public_bytes(serialization.Encoding.PEM).decode("ascii"), _key_pem(key), not_after
+
+
+def cert_not_after(cert_pem):
+    """Fin de validez (UTC) de un certificado PEM."""
+    return _not_after(x509.load_pem_x509_certificate(cert_pem))
+
+
+def _san(hostname):
+    try:
+        return x509.IPAddress(ipaddress.ip_address(hostname))
+    except ValueError:
+        return x509.DNSName(hostname)
+
+
+def _key_pem(key):
+    return key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.TraditionalOpenSSL,
+        serialization.NoEncryption(),
+    ).decode("ascii")
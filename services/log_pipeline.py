@@ -0,0 +1,263 @@
+import os
+import queue
+import selectors
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+
+class RotatingLogFile:
+    """Archivo de log que rota por tamaño: servicio.log, servicio.log.1, ..."""
+
+    def __init__(self, path, max_bytes=5 * 1024 * 1024, backup_count=3):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+
+    def write(self, text):
+        data = text.encode("utf-8")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            size = self.path.stat().st_size
+        except FileNotFoundError:
+            size = 0
+        if size and size + len(data) > self.max_bytes:
+            self._rotate()
+        with open(self.path, "ab") as f:
+            f.write(data)
+
+    def _rotate(self):
+        for i in range(self.backup_count - 1, 0, -1):
+            src = self.path.with_name(f"{self.path.name}.{i}")
+            if src.exists():
+                os.replace(src, self.path.with_name(f"{self.path.name}.{i + 1}"))
+        if self.backup_count > 0:
+            os.replace(self.path, self.path.with_name(f"{self.path.name}.1"))
+        else:
+            self.path.unlink()
+
+
+class LogMultiplexer:
+    """
+    Lee la salida de todos los procesos hijos desde un único hilo.
+
+    En POSIX usa un selector sobre las tuberías en modo no bloqueante; en
+    Windows, donde select() no admite tuberías, cada tubería tiene un lector
+    mínimo que sólo entrega bloques crudos a una cola. En ambos casos las
+    líneas se guardan en un búfer circular por servicio y se escriben a disco
+    y a consola por lotes cada `flush_interval` segundos.
+    """
+
+    def __init__(self, log_dir, buffer_lines=2000, max_bytes=5 * 1024 * 1024,
+                 backup_count=3, flush_interval=0.5, echo=True, echo_limit=20):
+        self.log_dir = Path(log_dir)
+        self.buffer_lines = buffer_lines
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.flush_interval = flush_interval
+        self.echo = echo
+        self.echo_limit = echo_limit
+
+        self._lock = threading.Lock()
+        self._buffers = {}
+        self._files = {}
+        self._pending = {}
+        self._subscribers = []
+        self._seq = 0
+        self._thread = None
+
+        self._use_selector = os.name != 'nt'
+        self._inbox = queue.SimpleQueue()
+        if self._use_selector:
+            self._selector = selectors.DefaultSelector()
+            self._wake_r, self._wake_w = os.pipe()
+            os.set_blocking(self._wake_r, False)
+            self._selector.register(self._wake_r, selectors.EVENT_READ, None)
+
+    # --- API pública ---
+
+    def add_process(self, service_name, process):
+        """Registra stdout y stderr de un proceso lanzado con tuberías binarias."""
+        if process.stdout:
+            self.add_stream(service_name, "STDOUT", process.stdout)
+        if process.stderr:
+            self.add_stream(service_name, "STDERR", process.stderr)
+
+    def add_stream(self, service_name, stream_name, pipe):
+        self._ensure_running()
+        if self._use_selector:
+            self._inbox.put(("register", (service_name, stream_name, pipe)))
+            os.write(self._wake_w, b"\0")
+        else:
+            threading.Thread(
+                target=self._blocking_reader, args=(service_name, stream_name, pipe), daemon=True
+            ).start()
+
+    def tail(self, service_name, lines=100, since=None):
+        """
+        Devuelve las últimas `lines` entradas del servicio. Con `since` sólo
+        las posteriores a ese número de secuencia, para paginar sin releer.
+        Cada entrada es un dict con 'seq', 'time', 'stream' y 'line'.
+        """
+        with self._lock:
+            entries = list(self._buffers.get(service_name, ()))
+        if since is not None:
+            entries = [e for e in entries if e['seq'] > since]
+        return entries[-lines:] if lines else entries
+
+    def subscribe(self, callback):
+        """
+        Llama a `callback(service_name, entries)` con cada lote nuevo, desde el
+        hilo del multiplexor. Devuelve una función para cancelar la suscripción.
+        """
+        with self._lock:
+            self._subscribers.append(callback)
+
+        def unsubscribe():
+            with self._lock:
+                if callback in self._subscribers:
+                    self._subscribers.remove(callback)
+        return unsubscribe
+
+    def log_path(self, service_name):
+        return self.log_dir / f"{service_name}.log"
+
+    # --- Bucle interno ---
+
+    def _ensure_running(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="log-multiplexer", daemon=True)
+                self._thread.start()
+
+    def _blocking_reader(self, service_name, stream_name, pipe):
+        fd = pipe.fileno()
+        while True:
+            try:
+                data = os.read(fd, 65536)
+            except OSError:
+                data = b""
+            self._inbox.put(("data", (service_name, stream_name, data)))
+            if not data:
+                pipe.close()
+                return
+
+    def _run(self):
+        partial = {}
+        last_flush = time.monotonic()
+        while True:
+            if self._use_selector:
+                for key, _ in self._selector.select(timeout=self.flush_interval):
+                    if key.data is None:
+                        self._drain_wake_pipe()
+                        continue
+                    service_name, stream_name, pipe = key.data
+                    try:
+                        data = os.read(key.fd, 65536)
+                    except BlockingIOError:
+                        continue
+                    except OSError:
+                        data = b""
+                    if not data:
+                        self._selector.unregister(key.fd)
+                        pipe.close()
+                    self._feed(partial, service_name, stream_name, data)
+                self._process_inbox(partial, block=False)
+            else:
+                self._process_inbox(partial, block=True)
+
+            now = time.monotonic()
+            if now - last_flush >= self.flush_interval:
+                self._flush()
+                last_flush = now
+
+    def _drain_wake_pipe(self):
+        try:
+            while os.read(self._wake_r, 4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    def _process_inbox(self, partial, block):
+        timeout = self.flush_interval if block else None
+        while True:
+            try:
+                kind, payload = self._inbox.get(block=block, timeout=timeout)
+            except queue.Empty:
+                return
+            block = False
+            if kind == "register":
+                service_name, stream_name, pipe = payload
+                os.set_blocking(pipe.fileno(), False)
+                self._selector.register(pipe.fileno(), selectors.EVENT_READ, payload)
+            else:
+                self._feed(partial, *payload)
+
+    def _feed(self, partial, service_name, stream_name, data):
+        key = (service_name, stream_name)
+        if data:
+            chunk = partial.pop(key, b"") + data
+            *lines, rest = chunk.split(b"\n")
+            if rest:
+                partial[key] = rest
+        else:
+            # Fin de la tubería: se entrega lo que quedara sin salto de línea.
+            rest = partial.pop(key, b"")
+            lines = [rest] if rest else []
+        if not lines:
+            return
+
+        now = time.time()
+        with self._lock:
+            buffer = self._buffers.setdefault(service_name, deque(maxlen=self.buffer_lines))
+            pending = self._pending.setdefault(service_name, [])
+            for raw in lines:
+                self._seq += 1
+                entry = {
+                    'seq': self._seq,
+                    'time': now,
+                    'stream': stream_name,
+                    'line': raw.rstrip(b"\r").decode("utf-8", errors="replace"),
+                }
+                buffer.append(entry)
+                pending.append(entry)
+
+    def _flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            subscribers = list(self._subscribers)
+
+        for service_name, entries in pending.items():
+            if not entries:
+                continue
+            log_file = self._files.get(service_name)
+            if log_file is None:
+                log_file = RotatingLogFile(self.log_path(service_name), self.max_bytes, self.backup_count)
+                self._files[service_name] = log_file
+            text = "".join(
+                f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(e['time']))} [{e['stream']}] {e['line']}\n"
+                for e in entries
+            )
+            try:
+                log_file.write(text)
+            except OSError as e:
+                print(f"⚠️ No se pudo escribir el log de {service_name}: {e}")
+
+            if self.echo:
+                self._echo(service_name, entries)
+
+            for callback in subscribers:
+                try:
+                    callback(service_name, entries)
+                except Exception as e:
+                    print(f"⚠️ Error en suscriptor de logs: {e}")
+
+    def _echo(self, service_name, entries):
+        shown = entries[:self.echo_limit]
+        lines = [f"[{service_name.upper()} - {e['stream']}]: {e['line']}" for e in shown]
+        if len(entries) > len(shown):
+            lines.append(
+                f"[{service_name.upper()}]: ... {len(entries) - len(shown)} líneas más en {self.log_path(service_name)}"
+            )
+        print("\n".join(lines))
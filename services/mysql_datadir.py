@@ -0,0 +1,197 @@
+import errno
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from .config_renderer import atomic_write
+
+# ioctl de Linux que comparte los bloques de un archivo con otro (reflink) en
+# btrfs, XFS y bcachefs. La copia es instantánea y copy-on-write.
+FICLONE = 0x40049409
+
+MANIFEST_NAME = "template.json"
+
+
+def template_key(server_version, fallback):
+    """Nombre de la plantilla: 'mysql-8.0.36', 'mariadb-10.11.2' o `fallback`."""
+    if server_version is None:
+        return f"unknown-{fallback}"
+    (major, minor, patch), is_mariadb = server_version
+    return f"{'mariadb' if is_mariadb else 'mysql'}-{major}.{minor}.{patch}"
+
+
+class DatadirTemplate:
+    """
+    Plantilla del directorio de datos recién inicializado, una por versión del
+    binario de MySQL. Se crea una sola vez con `--initialize-insecure` y cada
+    datadir nuevo se obtiene copiándola, en milisegundos con reflink o con una
+    copia en paralelo si el sistema de archivos no lo admite.
+
+    No se usan enlaces duros: InnoDB modifica sus archivos en su sitio, así
+    que un enlace duro corrompería la plantilla en cuanto arrancara mysqld.
+    """
+
+    def __init__(self, mysql_path, templates_path=None):
+        self.mysql_path = Path(mysql_path)
+        self.templates_path = Path(templates_path or self.mysql_path / "templates")
+        self._lock = threading.Lock()
+        self._reflink = sys.platform.startswith('linux')
+
+    def template_path(self, key):
+        return self.templates_path / key
+
+    def exists(self, key):
+        return (self.template_path(key) / MANIFEST_NAME).exists()
+
+    def get_initialize_command(self, datadir, is_mariadb=False):
+        bin_dir = self.mysql_path / "bin"
+        if is_mariadb:
+            # MariaDB no tiene --initialize; usa su propio script de instalación.
+            for name in ("mariadb-install-db", "mysql_install_db"):
+                for candidate in (bin_dir / f"{name}.exe", bin_dir / name, self.mysql_path / "scripts" / name):
+                    if candidate.exists():
+                        return [
+                            str(candidate),
+                            "--no-defaults",
+                            f"--basedir={self.mysql_path.as_posix()}",
+                            f"--datadir={Path(datadir).as_posix()}",
+                            "--auth-root-authentication-method=normal",
+                        ]
+        executable = "mysqld.exe" if os.name == 'nt' else "mysqld"
+        return [
+            str(bin_dir / executable),
+            "--no-defaults",
+            "--initialize-insecure",
+            f"--basedir={self.mysql_path.as_posix()}",
+            f"--datadir={Path(datadir).as_posix()}",
+        ]
+
+    def ensure(self, key, is_mariadb=False):
+        """
+        Crea la plantilla `key` si no existe. Se inicializa en un directorio
+        temporal y se renombra al terminar, así una inicialización fallida o
+        interrumpida nunca deja una plantilla a medias.
+        """
+        with self._lock:
+            path = self.template_path(key)
+            if self.exists(key):
+                return path
+
+            print(f"🚀 Creando la plantilla de datos de MySQL ({key}); sólo ocurre una vez por versión...")
+            self.templates_path.mkdir(parents=True, exist_ok=True)
+            staging = Path(tempfile.mkdtemp(prefix=f".{key}-", dir=self.templates_path))
+            datadir = staging / "data"
+            start = time.perf_counter()
+            try:
+                subprocess.run(
+                    self.get_initialize_command(datadir, is_mariadb),
+                    check=True, capture_output=True, text=True,
+                )
+            except (subprocess.CalledProcessError, OSError) as e:
+                shutil.rmtree(staging, ignore_errors=True)
+                print(f"❌ Error al inicializar la base de datos:\n{getattr(e, 'stderr', None) or e}")
+                raise
+
+            files = [p.relative_to(datadir).as_posix() for p in datadir.rglob("*") if p.is_file()]
+            manifest = {
+                'key': key,
+                'created': time.strftime("%Y-%m-%dT%H:%M:%S"),
+                'seconds': round(time.perf_counter() - start, 2),
+                'files': len(files),
+                'bytes': sum((datadir / f).stat().st_size for f in files),
+            }
+            atomic_write(datadir / MANIFEST_NAME, json.dumps(manifest, indent=2))
+            if path.exists():
+                shutil.rmtree(path)
+            os.replace(datadir, path)
+            shutil.rmtree(staging, ignore_errors=True)
+            print(f"✅ Plantilla creada en {manifest['seconds']} s.")
+            # La nueva plantilla sustituye a las de binarios anteriores.
+            removed = self.remove_stale(key)
+            if removed:
+                print(f"🧹 Plantillas antiguas eliminadas: {', '.join(removed)}")
+            return path
+
+    def materialize(self, key, dest):
+        """
+        Copia la plantilla `key` a `dest`, que no debe existir. La copia se
+        hace en un directorio hermano y se renombra al final para que mysqld
+        nunca vea un datadir incompleto. Devuelve los segundos empleados.
+        """
+        source = self.template_path(key)
+        dest = Path(dest)
+        if dest.exists():
+            raise FileExistsError(f"El directorio de datos ya existe: {dest}")
+
+        start = time.perf_counter()
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(prefix=f".{dest.name}-", dir=dest.parent))
+        try:
+            files = []
+            for root, dirs, names in os.walk(source):
+                rel = Path(root).relative_to(source)
+                for d in dirs:
+                    (staging / rel / d).mkdir()
+                files += [rel / n for n in names if n != MANIFEST_NAME or rel != Path(".")]
+
+            with ThreadPoolExecutor(max_workers=min(16, (os.cpu_count() or 1) * 2)) as pool:
+                # list() propaga la primera excepción de cualquier copia.
+                list(pool.map(lambda f: self._copy_file(source / f, staging / f), files))
+            os.replace(staging, dest)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        return time.perf_counter() - start
+
+    def _copy_file(self, src, dst):
+        if self._reflink:
+            try:
+                import fcntl
+                with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+                    fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+                shutil.copymode(src, dst)
+                return
+            except OSError as e:
+                if e.errno not in (errno.EOPNOTSUPP, errno.ENOTTY, errno.EXDEV, errno.EINVAL, errno.ENOSYS):
+                    raise
+                # El sistema de archivos no admite reflink: no se vuelve a intentar.
+                self._reflink = False
+        shutil.copy2(src, dst)
+
+    def reset(self, key, datadir):
+        """
+        Sustituye `datadir` por una copia limpia de la plantilla. mysqld debe
+        estar detenido. El directorio anterior se aparta con un renombrado y se
+        borra después, así el datadir nuevo está disponible cuanto antes.
+        """
+        datadir = Path(datadir)
+        trash = None
+        if datadir.exists():
+            trash = datadir.with_name(f".{datadir.name}-old-{os.getpid()}-{int(time.time() * 1000)}")
+            os.replace(datadir, trash)
+        try:
+            seconds = self.materialize(key, datadir)
+        except BaseException:
+            if trash is not None and not datadir.exists():
+                os.replace(trash, datadir)
+            raise
+        if trash is not None:
+            shutil.rmtree(trash, ignore_errors=True)
+        return seconds
+
+    def remove_stale(self, keep_key):
+        """Borra las plantillas de otras versiones del binario."""
+        removed = []
+        if not self.templates_path.exists():
+            return removed
+        for path in self.templates_path.iterdir():
+            if path.is_dir() and path.name != keep_key and not path.name.startswith("."):
+                shutil.rmtree(path, ignore_errors=True)
+                removed.append(path.name)
+        return removed
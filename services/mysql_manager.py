@@ -1,64 +1,134 @@
 import os
+import re
 import subprocess
 from pathlib import Path
+from .config_renderer import ConfigRenderer
+from .mysql_datadir import DatadirTemplate, template_key
+from .mysql_tuning import DEFAULT_PROFILE, detect_host, render_settings, size_profile, validate
 
 class MySQLManager:
     def __init__(self, bin_path, config):
         self.mysql_path = bin_path / "mysql"
         self.config = config
+        self.ini_path = self.mysql_path / "my.ini"
+        self.data_path = self.mysql_path / "data"
+        self.templates = DatadirTemplate(self.mysql_path)
+        self.renderer = ConfigRenderer()
+        self.tuning_warnings = []
+        self._version_cache = None
 
     def get_start_command(self):
-        executable = "mysqld"
-        if os.name == 'nt':
-            executable += ".exe"
-
-        # Inicializa la base de datos si es necesario
+        # Si falta el directorio de datos se copia de la plantilla
         self.initialize_database()
 
         return [
-            str(self.mysql_path / "bin" / executable),
-            f"--defaults-file={self.mysql_path / 'my.ini'}"
+            str(self.get_executable()),
+            f"--defaults-file={self.ini_path}"
         ]
 
+    def get_executable(self):
+        executable = "mysqld.exe" if os.name == 'nt' else "mysqld"
+        return self.mysql_path / "bin" / executable
+
+    def get_server_version(self):
+        """
+        Versión de mysqld como ((mayor, menor, parche), es_mariadb), o None si
+        no se puede ejecutar. Se cachea mientras el binario no cambie.
+        """
+        executable = self.get_executable()
+        try:
+            mtime = executable.stat().st_mtime_ns
+        except OSError:
+            return None
+        if self._version_cache and self._version_cache[0] == mtime:
+            return self._version_cache[1]
+        try:
+            output = subprocess.run([str(executable), "--version"], capture_output=True, text=True, timeout=15).stdout
+        except (OSError, subprocess.TimeoutExpired):
+            return None
+        match = re.search(r"Ver\s+(\d+)\.(\d+)\.(\d+)(\S*)", output)
+        version = None
+        if match:
+            numbers = tuple(int(match.group(i)) for i in (1, 2, 3))
+            version = (numbers, "mariadb" in output.lower())
+        self._version_cache = (mtime, version)
+        return version
+
+    def get_tuning(self):
+        """Opciones del perfil `mysql_profile` dimensionadas para esta máquina."""
+        name = self.config.get('mysql_profile', DEFAULT_PROFILE)
+        cpus, total_mb, _ = detect_host()
+        return name, size_profile(name, cpus, total_mb, self.get_server_version())
+
     def generate_my_ini(self):
         """Genera el archivo de configuración de MySQL."""
         # Rutas compatibles con la configuración de MySQL
         basedir = self.mysql_path.as_posix()
         datadir = (self.mysql_path / "data").as_posix()
+        profile_name, settings = self.get_tuning()
         
         config = f"""
 [mysqld]
 port = {self.config['mysql_port']}
 basedir = "{basedir}"
 datadir = "{datadir}"
-"""
+
+# Perfil de rendimiento: {profile_name}
+{render_settings(settings)}"""
         return config
 
+    def get_template_key(self):
+        """Clave de la plantilla de datos para el binario instalado."""
+        try:
+            mtime = self.get_executable().stat().st_mtime_ns
+        except OSError:
+            mtime = 0
+        return template_key(self.get_server_version(), mtime)
+
+    def ensure_template(self):
+        """Crea la plantilla de datos de esta versión si todavía no existe."""
+        version = self.get_server_version()
+        key = self.get_template_key()
+        self.templates.ensure(key, is_mariadb=bool(version and version[1]))
+        return key
+
     def initialize_database(self):
-        """Inicializa el directorio de datos de MySQL si no existe."""
-        data_dir = self.mysql_path / "data"
-        if not data_dir.exists():
-            print("🚀 Inicializando la base de datos de MySQL por primera vez...")
-            executable = "mysqld"
-            if os.name == 'nt':
-                executable += ".exe"
-            
-            cmd = [
-                str(self.mysql_path / "bin" / executable),
-                "--initialize-insecure",
-                f"--basedir={self.mysql_path.as_posix()}",
-                f"--datadir={data_dir.as_posix()}"
-            ]
-            try:
-                subprocess.run(cmd, check=True, capture_output=True, text=True)
-                print("✅ Base de datos inicializada correctamente.")
-            except subprocess.CalledProcessError as e:
-                print(f"❌ Error al inicializar la base de datos:\n{e.stderr}")
-                raise
+        """
+        Crea el directorio de datos si no existe copiando la plantilla de la
+        versión instalada. Sólo la primera vez por versión se ejecuta la
+        inicialización completa de mysqld.
+        """
+        if self.data_path.exists():
+            return False
+        key = self.ensure_template()
+        seconds = self.templates.materialize(key, self.data_path)
+        print(f"✅ Base de datos inicializada desde la plantilla en {seconds * 1000:.0f} ms.")
+        return True
+
+    def reset_database(self):
+        """
+        Devuelve el directorio de datos al estado recién instalado. Borra
+        todas las bases de datos; mysqld debe estar detenido.
+        """
+        key = self.ensure_template()
+        seconds = self.templates.reset(key, self.data_path)
+        print(f"🔄 Base de datos restablecida en {seconds * 1000:.0f} ms.")
+        return seconds
+
+    def get_config_inputs(self):
+        return {'config': self.config, 'basedir': self.mysql_path, 'tuning': self.get_tuning()}
+
+    def validate_tuning(self):
+        """Avisos si el perfil elegido puede superar la RAM disponible."""
+        _, settings = self.get_tuning()
+        _, _, available_mb = detect_host()
+        self.tuning_warnings = validate(settings, available_mb)
+        return self.tuning_warnings
 
     def configure(self):
-        """Escribe el archivo de configuración de MySQL."""
-        ini_content = self.generate_my_ini()
-        ini_path = self.mysql_path / "my.ini"
-        with open(ini_path, "w", encoding='utf-8') as f:
-            f.write(ini_content)
\ No newline at end of file
+        """Escribe my.ini si su contenido cambió. Devuelve True si hubo cambios."""
+        result = self.renderer.render(self.ini_path, self.get_config_inputs(), self.generate_my_ini)
+        if result.changed:
+            for warning in self.validate_tuning():
+                print(f"⚠️ MySQL: {warning}")
+        return result.changed
\ No newline at end of file
@@ -0,0 +1,146 @@
+from functools import lru_cache
+
+import psutil
+
+# memory_share: fracción de la RAM total para el buffer pool (acotada por
+# buffer_pool_min/max_mb). El resto de valores se escriben tal cual.
+PROFILES = {
+    'dev-small': {
+        'memory_share': 0.10,
+        'buffer_pool_min_mb': 128,
+        'buffer_pool_max_mb': 1024,
+        'redo_mb': 256,
+        'flush_log_at_trx_commit': 2,
+        'max_connections': 100,
+        'tmp_table_mb': 32,
+        'thread_cache_size': 16,
+        'extra': {},
+    },
+    'bulk-import': {
+        'memory_share': 0.40,
+        'buffer_pool_min_mb': 256,
+        'buffer_pool_max_mb': 8192,
+        'redo_mb': 2048,
+        'flush_log_at_trx_commit': 0,
+        'max_connections': 50,
+        'tmp_table_mb': 128,
+        'thread_cache_size': 8,
+        # Sin binlog ni doublewrite una importación escribe la mitad a disco.
+        'extra': {
+            'skip-log-bin': None,
+            'innodb_doublewrite': 0,
+            'max_allowed_packet': '256M',
+            'bulk_insert_buffer_size': '256M',
+            'innodb_io_capacity': 2000,
+        },
+    },
+    'read-heavy': {
+        'memory_share': 0.50,
+        'buffer_pool_min_mb': 256,
+        'buffer_pool_max_mb': 16384,
+        'redo_mb': 512,
+        'flush_log_at_trx_commit': 1,
+        'max_connections': 300,
+        'tmp_table_mb': 64,
+        'thread_cache_size': 64,
+        'extra': {},
+    },
+}
+
+DEFAULT_PROFILE = 'dev-small'
+
+# Memoria aproximada por conexión activa (buffers de sort, join, lectura y pila).
+PER_CONNECTION_MB = 3
+
+
+@lru_cache(maxsize=None)
+def detect_host():
+    """CPU lógicas, RAM total y RAM disponible (MB). Se mide una vez por sesión."""
+    memory = psutil.virtual_memory()
+    return (
+        psutil.cpu_count(logical=True) or 1,
+        memory.total // (1024 * 1024),
+        memory.available // (1024 * 1024),
+    )
+
+
+def size_profile(name, cpus, total_mb, server_version=None):
+    """
+    Calcula las opciones de [mysqld] del perfil. `server_version` es
+    ((mayor, menor, parche), es_mariadb) o None si no se pudo detectar.
+    """
+    if name not in PROFILES:
+        raise ValueError(f"Perfil de MySQL desconocido: {name}. Disponibles: {', '.join(PROFILES)}")
+    profile = PROFILES[name]
+
+    buffer_pool_mb = int(total_mb * profile['memory_share'])
+    buffer_pool_mb = max(profile['buffer_pool_min_mb'], min(buffer_pool_mb, profile['buffer_pool_max_mb']))
+    buffer_pool_mb = buffer_pool_mb // 128 * 128 or 128
+    # Instancias de 1 GB como mínimo, como recomienda InnoDB.
+    instances = max(1, min(cpus, buffer_pool_mb // 1024, 64))
+
+    settings = {
+        'innodb_buffer_pool_size': f"{buffer_pool_mb}M",
+        'innodb_buffer_pool_instances': instances,
+    }
+
+    # MySQL 8.0.30+ dimensiona el redo con una sola variable; MariaDB y las
+    # versiones anteriores usan el tamaño de cada archivo de log.
+    version, is_mariadb = server_version or ((0, 0, 0), False)
+    if not is_mariadb and version >= (8, 0, 30):
+        settings['innodb_redo_log_capacity'] = f"{profile['redo_mb']}M"
+    else:
+        settings['innodb_log_file_size'] = f"{profile['redo_mb'] // 2}M"
+
+    settings.update({
+        'innodb_flush_log_at_trx_commit': profile['flush_log_at_trx_commit'],
+        'max_connections': profile['max_connections'],
+        'tmp_table_size': f"{profile['tmp_table_mb']}M",
+        'max_heap_table_size': f"{profile['tmp_table_mb']}M",
+        'thread_cache_size': profile['thread_cache_size'],
+        'innodb_read_io_threads': max(4, min(cpus, 64)),
+        'innodb_write_io_threads': max(4, min(cpus, 64)),
+    })
+    settings.update(profile['extra'])
+    return settings
+
+
+def validate(settings, available_mb):
+    """
+    Estima la memoria que mysqld puede llegar a usar con estas opciones y
+    devuelve una lista de avisos si supera la RAM disponible.
+    """
+    warnings = []
+    buffer_pool_mb = _to_mb(settings['innodb_buffer_pool_size'])
+    connections_mb = settings['max_connections'] * PER_CONNECTION_MB
+    tmp_mb = _to_mb(settings['tmp_table_size'])
+    if buffer_pool_mb > available_mb:
+        warnings.append(
+            f"innodb_buffer_pool_size ({buffer_pool_mb} MB) supera la RAM disponible ({available_mb} MB)."
+        )
+    worst_case_mb = buffer_pool_mb + connections_mb + tmp_mb * 4
+    if worst_case_mb > available_mb:
+        warnings.append(
+            f"En el peor caso mysqld podría usar ~{worst_case_mb} MB "
+            f"(buffer pool + {settings['max_connections']} conexiones + tablas temporales) "
+            f"y sólo hay {available_mb} MB disponibles."
+        )
+    return warnings
+
+
+def render_settings(settings):
+    lines = []
+    for key, value in settings.items():
+        lines.append(key if value is None else f"{key} = {value}")
+    return "\n".join(lines) + "\n"
+
+
+def _to_mb(value):
+    value = str(value).strip().upper()
+    if value.endswith("G"):
+        return int(float(value[:-1]) * 1024)
+    if value.endswith("M"):
+        return int(float(value[:-1]))
+    if value.endswith("K"):
+        return int(float(value[:-1]) / 1024)
+    return int(value) // (1024 * 1024)
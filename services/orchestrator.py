@@ -0,0 +1,67 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def topological_order(dependencies):
+    """
+    Ordena los servicios de forma que cada uno aparezca después de sus
+    dependencias. Lanza ValueError si hay un ciclo.
+    """
+    order = []
+    state = {}  # 1 = visitando, 2 = terminado
+
+    def visit(name, path):
+        if state.get(name) == 2:
+            return
+        if state.get(name) == 1:
+            cycle = " -> ".join(path + [name])
+            raise ValueError(f"Dependencia circular entre servicios: {cycle}")
+        state[name] = 1
+        for dep in dependencies.get(name, ()):
+            visit(dep, path + [name])
+        state[name] = 2
+        order.append(name)
+
+    for name in dependencies:
+        visit(name, [])
+    return order
+
+
+def run_in_dependency_order(dependencies, action, reverse=False):
+    """
+    Ejecuta `action(name)` para cada servicio en paralelo, esperando sólo a
+    los servicios de los que depende (o, con `reverse=True`, a los que
+    dependen de él, como se necesita al detener).
+
+    `action` debe devolver True/False. Devuelve por servicio un dict con
+    'ok', 'seconds' y, si no se inició por fallo de una dependencia,
+    'skipped'. Al detener no se omite nada: un fallo no debe dejar el resto
+    de la pila en marcha.
+    """
+    if reverse:
+        waits_on = {name: [] for name in dependencies}
+        for name, deps in dependencies.items():
+            for dep in deps:
+                waits_on[dep].append(name)
+    else:
+        waits_on = {name: list(deps) for name, deps in dependencies.items()}
+
+    def run(name, upstream):
+        for future in upstream:
+            if not future.result()['ok'] and not reverse:
+                return {'ok': False, 'seconds': 0.0, 'skipped': True}
+        start = time.monotonic()
+        try:
+            ok = bool(action(name))
+        except Exception as e:
+            print(f"❌ Error en {name}: {e}")
+            ok = False
+        return {'ok': ok, 'seconds': time.monotonic() - start}
+
+    futures = {}
+    # Con un hilo por servicio ninguna espera puede bloquear el pool.
+    with ThreadPoolExecutor(max_workers=max(len(waits_on), 1)) as pool:
+        for name in topological_order(waits_on):
+            upstream = [futures[dep] for dep in waits_on[name]]
+            futures[name] = pool.submit(run, name, upstream)
+        return {name: future.result() for name, future in futures.items()}
@@ -0,0 +1,141 @@
+import os
+import signal
+import subprocess
+from pathlib import Path
+from .config_renderer import ConfigRenderer
+
+DEFAULT_POOL = {
+    'pm': 'dynamic',
+    'max_children': 10,
+    'start_servers': 2,
+    'min_spare_servers': 1,
+    'max_spare_servers': 3,
+    'max_requests': 500,
+    'process_idle_timeout': '10s',
+}
+
+
+class PHPFPMManager:
+    """
+    Gestiona un maestro PHP-FPM para una versión de PHP.
+
+    Cada versión escucha en su propio puerto, así varias versiones pueden
+    atender a la vez y cada host virtual elige la suya. En Windows, donde
+    no existe php-fpm, se usa php-cgi en modo FastCGI (`-b`) con el número
+    de hijos de la configuración del pool.
+    """
+
+    def __init__(self, php_manager, config, port):
+        self.php_manager = php_manager
+        self.config = config
+        self.port = port
+        self.conf_path = self.php_manager.php_path / "php-fpm.conf"
+        self.renderer = ConfigRenderer()
+
+    @property
+    def version(self):
+        return self.php_manager.version
+
+    def get_pool_settings(self):
+        pool = dict(DEFAULT_POOL)
+        pool.update(self.config.get('php_fpm_pool', {}))
+        if pool['pm'] not in ('static', 'dynamic', 'ondemand'):
+            raise ValueError(f"pm debe ser static, dynamic u ondemand, no '{pool['pm']}'")
+        return pool
+
+    def find_executable(self):
+        php_path = self.php_manager.php_path
+        runtime = self.php_manager.get_runtime()
+        if runtime and runtime.get('fpm'):
+            return Path(runtime['fpm'])
+        if os.name == 'nt':
+            candidates = [php_path / "php-cgi.exe"]
+        else:
+            candidates = [php_path / "sbin" / "php-fpm", php_path / "bin" / "php-fpm", php_path / "php-fpm"]
+        for candidate in candidates:
+            if candidate.exists():
+                return candidate
+        raise FileNotFoundError(
+            f"❌ No se encontró php-fpm para PHP {self.version}.\n\n"
+            f" Rutas buscadas: {', '.join(str(c) for c in candidates)}"
+        )
+
+    def get_start_command(self):
+        executable = str(self.find_executable())
+        ini_path = str(self.php_manager.php_path / "php.ini")
+        if os.name == 'nt':
+            return [executable, "-b", f"127.0.0.1:{self.port}", "-c", ini_path]
+        return [executable, "--nodaemonize", "--fpm-config", str(self.conf_path), "-c", ini_path]
+
+    def get_start_env(self):
+        """Entorno para php-cgi en Windows, que no lee php-fpm.conf."""
+        if os.name != 'nt':
+            return None
+        pool = self.get_pool_settings()
+        env = os.environ.copy()
+        env['PHP_FCGI_CHILDREN'] = str(pool['max_children'])
+        env['PHP_FCGI_MAX_REQUESTS'] = str(pool['max_requests'])
+        return env
+
+    def supports_graceful_reload(self):
+        return os.name != 'nt'
+
+    def test_config(self, conf_path=None):
+        """Devuelve (ok, salida) de `php-fpm -t`."""
+        cmd = [str(self.find_executable()), "-t", "--fpm-config", str(conf_path or self.conf_path)]
+        try:
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
+        except (OSError, subprocess.TimeoutExpired) as e:
+            return False, str(e)
+        return result.returncode == 0, (result.stderr or result.stdout).strip()
+
+    def graceful_reload(self, pid):
+        """SIGUSR2: el maestro relee la configuración y recicla los workers sin cerrar el puerto."""
+        os.kill(pid, signal.SIGUSR2)
+
+    def get_handler(self):
+        """Destino de SetHandler para que Apache pase los .php a este pool."""
+        return f"proxy:fcgi://127.0.0.1:{self.port}"
+
+    def generate_fpm_conf(self):
+        pool = self.get_pool_settings()
+        lines = [
+            "[global]",
+            "daemonize = no",
+            "error_log = /dev/stderr",
+            "",
+            "[www]",
+            f"listen = 127.0.0.1:{self.port}",
+            "listen.allowed_clients = 127.0.0.1",
+            f"pm = {pool['pm']}",
+            f"pm.max_children = {pool['max_children']}",
+            f"pm.max_requests = {pool['max_requests']}",
+        ]
+        if pool['pm'] == 'dynamic':
+            lines += [
+                f"pm.start_servers = {pool['start_servers']}",
+                f"pm.min_spare_servers = {pool['min_spare_servers']}",
+                f"pm.max_spare_servers = {pool['max_spare_servers']}",
+            ]
+        elif pool['pm'] == 'ondemand':
+            lines.append(f"pm.process_idle_timeout = {pool['process_idle_timeout']}")
+        lines += [
+            "clear_env = no",
+            "catch_workers_output = yes",
+        ]
+        return "\n".join(lines) + "\n"
+
+    def configure(self, validate=False):
+        """
+        Escribe php.ini y php-fpm.conf si cambiaron. Devuelve True si hubo
+        cambios. Con `validate` el php-fpm.conf nuevo pasa `php-fpm -t` antes
+        de sustituir al que está en uso.
+        """
+        changed = self.php_manager.configure()
+        if os.name == 'nt':
+            return changed
+        inputs = {'pool': self.get_pool_settings(), 'port': self.port, 'php_path': self.php_manager.php_path}
+        result = self.renderer.render(
+            self.conf_path, inputs, self.generate_fpm_conf, self.test_config if validate else None,
+        )
+        return result.changed or changed
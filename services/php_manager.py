@@ -1,9 +1,25 @@
 import os
 from pathlib import Path
+from .config_renderer import atomic_write
+from .php_tuning import DEFAULT_PROFILE, loads_opcache_outside_section, merge_section, render_section
+
+# Extensiones que se activan en un php.ini nuevo, si la instalación las trae.
+DEFAULT_EXTENSIONS = ('mysqli', 'pdo_mysql', 'openssl', 'curl', 'gd', 'mbstring', 'xml')
+# Nombres del archivo según la versión (PHP 7 en Windows usaba php_gd2.dll).
+EXTENSION_ALIASES = {'gd': ('gd', 'gd2')}
 
 class PHPManager:
-    def __init__(self, bin_path, version):
+    def __init__(self, bin_path, version, profile=DEFAULT_PROFILE, registry=None,
+                 session_handler='files', cache_services=None):
         self.bin_path = bin_path
+        self.profile = profile
+        self.registry = registry
+        # 'files' o el nombre de un servicio de caché ('redis', 'memcached').
+        self.session_handler = session_handler
+        # Devuelve {nombre: gestor} de los servicios de caché activos.
+        self.cache_services = cache_services
+        # php_path -> (mtime_ns del directorio, módulo encontrado)
+        self._module_cache = {}
         self.set_version(version)
 
     def set_version(self, version):
@@ -11,14 +27,40 @@ class PHPManager:
         self.version = version
         self.php_path = self.bin_path / "php" / self.version
 
+    def get_runtime(self):
+        """Datos sondeados de esta versión en el índice de runtimes (None sin índice)."""
+        if self.registry is None:
+            return None
+        return self.registry.php(self.version)
+
     def get_php_module_path(self):
         """
         Obtiene la ruta al módulo de PHP para Apache, buscando el archivo correcto
         según el sistema operativo.
         """
+        if self.registry is not None:
+            runtime = self.get_runtime()
+            module = runtime and runtime.get('apache_module')
+            if not module:
+                print(f"⚠️ ¡Atención! No se encontró un módulo de Apache compatible en: {self.php_path}")
+                return None
+            return Path(module)
+        try:
+            dir_mtime = self.php_path.stat().st_mtime_ns
+        except OSError:
+            return None
         if not self.php_path.is_dir():
             return None
 
+        # Sólo se vuelve a buscar si el directorio cambió (se añadió o quitó algún archivo).
+        cached = self._module_cache.get(self.php_path)
+        if cached and cached[0] == dir_mtime:
+            return cached[1]
+        module_path = self._find_php_module()
+        self._module_cache[self.php_path] = (dir_mtime, module_path)
+        return module_path
+
+    def _find_php_module(self):
         # --- LÓGICA CORREGIDA ---
         # En Windows, buscar el archivo .dll (ej. php8apache2_4.dll)
         if os.name == 'nt':
@@ -37,9 +79,85 @@ class PHPManager:
         print(f"⚠️ ¡Atención! No se encontró un módulo de Apache compatible en: {self.php_path}")
         return None
 
+    def extension_lines(self, runtime):
+        """
+        Líneas `extension=` para DEFAULT_EXTENSIONS. Sólo se activan las que
+        existen como archivo en el directorio de extensiones; las compiladas
+        en el binario no hacen falta (PHP avisaría de que ya están cargadas)
+        y las que faltan quedan comentadas.
+        """
+        if runtime is None:
+            return [f"extension={name}" for name in DEFAULT_EXTENSIONS]
+        shared = set(runtime['shared_extensions'])
+        builtin = set(runtime['builtin_extensions'])
+        lines = []
+        for name in DEFAULT_EXTENSIONS:
+            available = [alias for alias in EXTENSION_ALIASES.get(name, (name,)) if alias in shared]
+            if name in builtin:
+                lines.append(f"; {name}: compilada en PHP")
+            elif available:
+                lines.append(f"extension={available[0]}")
+            else:
+                lines.append(f";extension={name} (no instalada)")
+        return lines
+
+    def load_opcache(self, runtime):
+        """True/False si hay que cargar OPcache como zend_extension; None si no se sabe."""
+        if runtime is None:
+            return None
+        if 'zend opcache' in runtime['builtin_zend_extensions']:
+            return False
+        if 'opcache' in runtime['shared_extensions']:
+            return True
+        # Sin poder ejecutar php no se sabe si viene integrado: decide la versión.
+        return False if runtime['executable'] else None
+
+    def get_cache_services(self):
+        return self.cache_services() if self.cache_services else {}
+
+    def session_lines(self, runtime):
+        """
+        Directivas que llevan las sesiones al servicio de caché elegido en
+        `php_session_handler`. Si el servicio no está activo o esta versión
+        de PHP no tiene su extensión, las sesiones siguen en archivos.
+        """
+        if self.session_handler in (None, 'files'):
+            return []
+        service = self.get_cache_services().get(self.session_handler)
+        if service is None:
+            print(f"⚠️ php_session_handler='{self.session_handler}' no es un servicio activo; las sesiones siguen en archivos.")
+            return []
+        extension = service.php_extension
+        lines = ["[Session]"]
+        if runtime is not None:
+            if extension in runtime['shared_extensions'] and extension not in runtime['builtin_extensions']:
+                lines.append(f"extension={extension}")
+            elif extension not in runtime['builtin_extensions']:
+                print(f"⚠️ PHP {self.version} no tiene la extensión {extension}; las sesiones siguen en archivos.")
+                return []
+        lines += [f"session.save_handler={extension}", f'session.save_path="{service.session_save_path()}"']
+        return lines
+
+    def get_app_env(self, cache_backend=None):
+        """
+        Variables de entorno con los DSN de los servicios de caché activos
+        (REDIS_URL, MEMCACHED_SERVERS...) y CACHE_DSN apuntando a
+        `cache_backend` o, si no se indica, al primero de ellos.
+        """
+        services = self.get_cache_services()
+        env = {}
+        for service in services.values():
+            env.update(service.app_env())
+        backend = services.get(cache_backend) or next(iter(services.values()), None)
+        if backend is not None:
+            env['CACHE_DSN'] = backend.dsn()
+        return env
+
     def generate_php_ini(self):
         """Genera la configuración de PHP."""
-        ext_dir = (self.php_path / "ext").as_posix()
+        runtime = self.get_runtime()
+        ext_dir = Path(runtime['extension_dir'] if runtime else self.php_path / "ext").as_posix()
+        extensions = "\n".join(self.extension_lines(runtime))
         config = f"""
 extension_dir = "{ext_dir}"
 upload_max_filesize = 128M
@@ -47,23 +165,35 @@ post_max_size = 128M
 memory_limit = 256M
 max_execution_time = 300
 
-; Habilita las extensiones que necesites (asegúrate de que los archivos .dll o .so existan)
-extension=mysqli
-extension=pdo_mysql
-extension=openssl
-extension=curl
-extension=gd
-extension=mbstring
-extension=xml
+; Extensiones disponibles en esta instalación (las que faltan quedan comentadas)
+{extensions}
 """
         return config
 
     def configure(self):
-        """Escribe el archivo php.ini si no existe."""
+        """
+        Escribe php.ini si no existe y mantiene al día su sección gestionada de
+        rendimiento (OPcache, JIT, caché de rutas) sin tocar el resto del
+        archivo. Devuelve True si php.ini cambió.
+        """
+        if not self.php_path.is_dir():
+            return False
         ini_path = self.php_path / "php.ini"
-        if not ini_path.exists():
+        runtime = self.get_runtime()
+        if ini_path.exists():
+            with open(ini_path, "r", encoding='utf-8') as f:
+                current = f.read()
+        else:
             print(f"🔧 Generando archivo de configuración php.ini para la versión {self.version}...")
-            ini_content = self.generate_php_ini()
-            ini_path.parent.mkdir(parents=True, exist_ok=True)
-            with open(ini_path, "w", encoding='utf-8') as f:
-                f.write(ini_content)
\ No newline at end of file
+            current = self.generate_php_ini()
+
+        # Si el usuario ya carga OPcache en su parte de php.ini no se repite.
+        load_opcache = False if loads_opcache_outside_section(current) else self.load_opcache(runtime)
+        section = render_section(self.profile, self.version, load_opcache, self.session_lines(runtime))
+
+        updated = merge_section(current, section)
+        if ini_path.exists() and updated == current:
+            return False
+        atomic_write(ini_path, updated)
+        print(f"✅ php.ini de PHP {self.version} actualizado (perfil '{self.profile}').")
+        return True
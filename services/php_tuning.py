@@ -0,0 +1,113 @@
+import re
+
+# Perfiles de OPcache, JIT y caché de rutas. El JIT sólo se aplica en PHP 8+.
+PROFILES = {
+    'development': {
+        'opcache.memory_consumption': 128,
+        'opcache.interned_strings_buffer': 16,
+        'opcache.max_accelerated_files': 10000,
+        'opcache.validate_timestamps': 1,
+        'opcache.revalidate_freq': 0,
+        'opcache.jit': 'disable',  # el JIT es incompatible con Xdebug
+        'opcache.jit_buffer_size': '0',
+        'realpath_cache_size': '4096K',
+        'realpath_cache_ttl': 120,
+    },
+    'balanced': {
+        'opcache.memory_consumption': 256,
+        'opcache.interned_strings_buffer': 16,
+        'opcache.max_accelerated_files': 20000,
+        'opcache.validate_timestamps': 1,
+        'opcache.revalidate_freq': 2,
+        'opcache.jit': 'tracing',
+        'opcache.jit_buffer_size': '64M',
+        'realpath_cache_size': '4096K',
+        'realpath_cache_ttl': 600,
+    },
+    'production': {
+        'opcache.memory_consumption': 512,
+        'opcache.interned_strings_buffer': 32,
+        'opcache.max_accelerated_files': 100000,
+        'opcache.validate_timestamps': 0,
+        'opcache.revalidate_freq': 0,
+        'opcache.jit': 'tracing',
+        'opcache.jit_buffer_size': '128M',
+        'realpath_cache_size': '8192K',
+        'realpath_cache_ttl': 3600,
+    },
+}
+
+DEFAULT_PROFILE = 'development'
+
+BEGIN_MARKER = "; >>> PyLaragon: rendimiento (sección gestionada, se regenera automáticamente)"
+END_MARKER = "; <<< PyLaragon: rendimiento"
+
+_SECTION_RE = re.compile(re.escape(BEGIN_MARKER) + r".*?" + re.escape(END_MARKER) + r"\n?", re.DOTALL)
+
+
+def parse_version(version):
+    """'8.1.10' -> (8, 1). Las carpetas con nombres no numéricos dan (0, 0)."""
+    numbers = re.findall(r"\d+", version)
+    if not numbers:
+        return (0, 0)
+    return (int(numbers[0]), int(numbers[1]) if len(numbers) > 1 else 0)
+
+
+def render_section(name, version, load_opcache=None, extra_lines=()):
+    """
+    Bloque gestionado de php.ini para el perfil y la versión de PHP.
+    `load_opcache` dice si hay que cargar OPcache como zend_extension; si no
+    se sabe (None) se decide por la versión. `extra_lines` (p. ej. el gestor
+    de sesiones) van al final del bloque.
+    """
+    if name not in PROFILES:
+        raise ValueError(f"Perfil de PHP desconocido: {name}. Disponibles: {', '.join(PROFILES)}")
+    major_minor = parse_version(version)
+    lines = [BEGIN_MARKER, f"; Perfil: {name}. Cambia `php_profile` en services.json en lugar de editar aquí."]
+
+    # Desde PHP 8.5 OPcache viene siempre integrado y no se carga como extensión.
+    if load_opcache is None:
+        load_opcache = major_minor < (8, 5)
+    if load_opcache:
+        lines.append("zend_extension=opcache")
+    lines += ["[opcache]", "opcache.enable=1", "opcache.enable_cli=0"]
+
+    for key, value in PROFILES[name].items():
+        if key.startswith("opcache.jit") and major_minor < (8, 0):
+            continue
+        if key.startswith("realpath_cache"):
+            continue
+        lines.append(f"{key}={value}")
+
+    # Las directivas de realpath pertenecen a [PHP]; se reabre la sección.
+    lines.append("[PHP]")
+    for key in ('realpath_cache_size', 'realpath_cache_ttl'):
+        lines.append(f"{key}={PROFILES[name][key]}")
+    lines.extend(extra_lines)
+    lines.append(END_MARKER)
+    return "\n".join(lines) + "\n"
+
+
+_OPCACHE_LINE_RE = re.compile(r"^[ \t]*zend_extension[ \t]*=[^;\n]*opcache", re.IGNORECASE | re.MULTILINE)
+
+
+def loads_opcache_outside_section(ini_text):
+    """
+    True si la parte de php.ini que no gestiona PyLaragon ya carga OPcache
+    (`zend_extension=...opcache...`): cargarlo otra vez hace que PHP avise
+    de que ya está cargado.
+    """
+    return bool(_OPCACHE_LINE_RE.search(_SECTION_RE.sub("", ini_text)))
+
+
+def merge_section(ini_text, section):
+    """
+    Sustituye la sección gestionada dentro de php.ini, o la añade al final.
+    El resto del archivo (los cambios del usuario) queda intacto; como PHP
+    usa el último valor de cada directiva, la sección gestionada prevalece.
+    """
+    if _SECTION_RE.search(ini_text):
+        return _SECTION_RE.sub(lambda _: section, ini_text, count=1)
+    if ini_text and not ini_text.endswith("\n"):
+        ini_text += "\n"
+    return ini_text + "\n" + section
@@ -0,0 +1,116 @@
+import os
+import socket
+
+import psutil
+
+# Primer puerto alternativo para los puertos privilegiados habituales; el
+# resto se buscan a partir del siguiente al configurado.
+FALLBACK_START = {80: 8080, 443: 8443}
+SEARCH_SPAN = 1000
+
+
+class PortInUseError(RuntimeError):
+    """Un servicio no puede arrancar porque su puerto está ocupado."""
+
+    def __init__(self, conflicts):
+        self.conflicts = conflicts
+        lines = ["❌ Puertos ocupados:"]
+        for conflict in conflicts:
+            lines.append(f"   {describe_conflict(conflict)}")
+        lines.append("   Libera el puerto, cámbialo en services.json o activa `auto_ports`.")
+        super().__init__("\n".join(lines))
+
+
+def describe_conflict(conflict):
+    owners = conflict['owners']
+    if owners:
+        who = ", ".join(
+            f"{o['name'] or 'proceso desconocido'} (PID {o['pid']})" if o['pid'] else "un proceso de otro usuario"
+            for o in owners
+        )
+    else:
+        who = conflict.get('reason') or "otro proceso"
+    return f"{conflict['port']} ({conflict['key']}) está en uso por {who}"
+
+
+def scan_listeners(ports):
+    """
+    Procesos que escuchan en `ports`, con una sola llamada a
+    psutil.net_connections. Devuelve {puerto: [{'pid', 'name', 'address'}]}.
+    Si el sistema no deja listar sockets ajenos (macOS sin root) devuelve
+    None y hay que comprobar puerto a puerto con port_is_free().
+    """
+    wanted = set(ports)
+    try:
+        connections = psutil.net_connections(kind='inet')
+    except psutil.AccessDenied:
+        return None
+    listeners = {}
+    names = {}
+    for conn in connections:
+        if conn.status != psutil.CONN_LISTEN or not conn.laddr or conn.laddr.port not in wanted:
+            continue
+        if conn.pid and conn.pid not in names:
+            try:
+                names[conn.pid] = psutil.Process(conn.pid).name()
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                names[conn.pid] = None
+        owner = {'pid': conn.pid, 'name': names.get(conn.pid), 'address': conn.laddr.ip}
+        entries = listeners.setdefault(conn.laddr.port, [])
+        if not any(e['pid'] == owner['pid'] for e in entries):
+            entries.append(owner)
+    return listeners
+
+
+def port_is_free(port, host=''):
+    """
+    Intenta abrir el puerto. Detecta también lo que no ve net_connections:
+    puertos privilegiados sin permisos o reservados por el sistema.
+    Devuelve (libre, motivo).
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    try:
+        if os.name == 'nt':
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_EXCLUSIVEADDRUSE, 1)
+        else:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((host, port))
+        return True, None
+    except PermissionError:
+        return False, "hacen falta permisos de administrador para usarlo"
+    except OSError as e:
+        return False, e.strerror or str(e)
+    finally:
+        sock.close()
+
+
+def check_ports(wanted, own_pids=()):
+    """
+    Comprueba `wanted` ({clave: puerto}) de una vez. Los puertos que ya usan
+    procesos propios (`own_pids`) no cuentan como conflicto. Devuelve la
+    lista de conflictos: {'key', 'port', 'owners', 'reason'}.
+    """
+    own_pids = set(own_pids)
+    listeners = scan_listeners(wanted.values())
+    conflicts = []
+    for key, port in wanted.items():
+        owners = listeners.get(port, []) if listeners is not None else []
+        if owners and all(o['pid'] in own_pids for o in owners):
+            continue
+        reason = None
+        if not owners:
+            free, reason = port_is_free(port)
+            if free:
+                continue
+        conflicts.append({'key': key, 'port': port, 'owners': owners, 'reason': reason})
+    return conflicts
+
+
+def find_free_port(port, exclude=()):
+    """Primer puerto libre a partir del alternativo de `port`, o None."""
+    exclude = set(exclude)
+    start = FALLBACK_START.get(port, port + 1)
+    for candidate in range(start, min(start + SEARCH_SPAN, 65536)):
+        if candidate not in exclude and port_is_free(candidate)[0]:
+            return candidate
+    return None
@@ -0,0 +1,110 @@
+import socket
+import time
+
+
+def tcp_probe(host, port, timeout=1.0):
+    """Comprueba que el puerto acepta conexiones TCP."""
+    try:
+        with socket.create_connection((host, port), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+
+def http_probe(host, port, path="/", timeout=2.0):
+    """
+    Envía un GET mínimo y comprueba que llega una línea de estado HTTP.
+    Cualquier código de estado cuenta: lo que importa es que Apache responda.
+    """
+    request = (
+        f"GET {path} HTTP/1.0\r\n"
+        f"Host: {host}\r\n"
+        "User-Agent: PyLaragon-Readiness\r\n"
+        "Connection: close\r\n\r\n"
+    ).encode("ascii")
+    try:
+        with socket.create_connection((host, port), timeout=timeout) as sock:
+            sock.settimeout(timeout)
+            sock.sendall(request)
+            status_line = sock.recv(64)
+    except OSError:
+        return False
+    return status_line.startswith(b"HTTP/")
+
+
+def mysql_probe(host, port, timeout=2.0):
+    """
+    Lee el paquete de saludo inicial del protocolo MySQL.
+    El servidor está listo cuando envía un handshake v10; un paquete de error
+    (0xFF) indica que todavía no acepta clientes.
+    """
+    try:
+        with socket.create_connection((host, port), timeout=timeout) as sock:
+            sock.settimeout(timeout)
+            header = _recv_exactly(sock, 4)
+            if header is None:
+                return False
+            payload_length = int.from_bytes(header[:3], "little")
+            if payload_length == 0:
+                return False
+            first_byte = _recv_exactly(sock, 1)
+    except OSError:
+        return False
+    return first_byte is not None and first_byte[0] == 10
+
+
+def redis_probe(host, port, timeout=1.0):
+    """Envía PING y espera +PONG: Redis responde -LOADING mientras carga el volcado."""
+    try:
+        with socket.create_connection((host, port), timeout=timeout) as sock:
+            sock.settimeout(timeout)
+            sock.sendall(b"PING\r\n")
+            reply = sock.recv(64)
+    except OSError:
+        return False
+    return reply.startswith(b"+PONG")
+
+
+def memcached_probe(host, port, timeout=1.0):
+    """Pide `version` por el protocolo de texto de Memcached."""
+    try:
+        with socket.create_connection((host, port), timeout=timeout) as sock:
+            sock.settimeout(timeout)
+            sock.sendall(b"version\r\n")
+            reply = sock.recv(64)
+    except OSError:
+        return False
+    return reply.startswith(b"VERSION")
+
+
+def _recv_exactly(sock, size):
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+
+def wait_until_ready(probe, timeout=30.0, initial_delay=0.05, max_delay=1.0, is_alive=None):
+    """
+    Ejecuta `probe` con backoff exponencial hasta que devuelve True o se agota
+    `timeout`. Si `is_alive` devuelve False se aborta de inmediato (el proceso
+    murió durante el arranque).
+
+    Devuelve los segundos que tardó en estar listo, o None si no lo logró.
+    """
+    start = time.monotonic()
+    deadline = start + timeout
+    delay = initial_delay
+    while True:
+        if is_alive is not None and not is_alive():
+            return None
+        if probe():
+            return time.monotonic() - start
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 2, max_delay)
@@ -0,0 +1,107 @@
+import os
+import signal
+import time
+from collections import deque
+
+POLICIES = ('never', 'on-failure', 'always')
+DEFAULT_POLICY = 'on-failure'
+
+
+def describe_exit(returncode):
+    """
+    (código, señal) de un proceso terminado. En POSIX un código negativo es
+    la señal que lo mató; se devuelve su nombre (p. ej. 'SIGKILL').
+    """
+    if returncode is None:
+        return None, None
+    if returncode < 0 and os.name != 'nt':
+        try:
+            return None, signal.Signals(-returncode).name
+        except ValueError:
+            return None, f"SIG{-returncode}"
+    return returncode, None
+
+
+class RestartTracker:
+    """
+    Decide si un servicio que terminó solo se vuelve a iniciar y cuándo.
+
+    Los reinicios esperan `backoff` segundos, el doble cada vez, hasta
+    `max_backoff`. Si el servicio aguanta `reset_after` segundos en marcha
+    la espera vuelve al mínimo. Con `max_crashes` caídas dentro de `window`
+    segundos se considera un bucle de caídas y se deja de reiniciar hasta
+    que alguien lo inicie a mano.
+    """
+
+    def __init__(self, policy=DEFAULT_POLICY, backoff=1.0, max_backoff=60.0,
+                 reset_after=60.0, max_crashes=5, window=120.0, history=50):
+        if policy not in POLICIES:
+            raise ValueError(f"Política de reinicio desconocida: {policy}. Disponibles: {', '.join(POLICIES)}")
+        self.policy = policy
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.reset_after = reset_after
+        self.max_crashes = max_crashes
+        self.window = window
+        self.history = deque(maxlen=history)
+        self.attempt = 0
+        self.gave_up = False
+        self._armed_at = 0.0
+
+    def should_restart(self, returncode):
+        if self.policy == 'never':
+            return False
+        if self.policy == 'on-failure':
+            return returncode != 0
+        return True
+
+    def record_exit(self, returncode, uptime, log_tail=None):
+        """
+        Registra una salida no solicitada y devuelve la entrada del historial,
+        con 'action' ('restart', 'gave-up' o 'none') y, si se reinicia,
+        'delay' en segundos. Una salida limpia que la política no reinicia
+        no es una caída: no entra en el historial ni en la ventana.
+        """
+        now = time.time()
+        code, signal_name = describe_exit(returncode)
+        if uptime is not None and uptime >= self.reset_after:
+            self.attempt = 0
+        entry = {
+            'time': now,
+            'returncode': code,
+            'signal': signal_name,
+            'uptime': uptime,
+            'action': 'none',
+            'delay': None,
+            'log_tail': log_tail or [],
+        }
+        if not self.should_restart(returncode):
+            if code != 0:
+                self.history.append(entry)
+            return entry
+        self.history.append(entry)
+        recent = [e for e in self.history if e['time'] >= max(self._armed_at, now - self.window)]
+        if len(recent) >= self.max_crashes:
+            self.gave_up = True
+            entry['action'] = 'gave-up'
+            return entry
+        entry['action'] = 'restart'
+        entry['delay'] = min(self.backoff * (2 ** self.attempt), self.max_backoff)
+        self.attempt += 1
+        return entry
+
+    def reset(self):
+        """Arranque manual: se olvida el bucle de caídas y la espera acumulada."""
+        self.attempt = 0
+        self.gave_up = False
+        self._armed_at = time.time()
+
+    def state(self):
+        last = self.history[-1] if self.history else None
+        return {
+            'policy': self.policy,
+            'crashes': len(self.history),
+            'gave_up': self.gave_up,
+            'attempt': self.attempt,
+            'last_crash': {k: v for k, v in last.items() if k != 'log_tail'} if last else None,
+        }
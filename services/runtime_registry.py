@@ -0,0 +1,257 @@
+import json
+import os
+import re
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from .config_renderer import atomic_write
+
+MANIFEST_VERSION = 1
+PROBE_TIMEOUT = 10
+# Lo que imprime `php -n -r`: con -n no se lee php.ini, así que las
+# extensiones cargadas son exactamente las compiladas dentro del binario.
+PHP_PROBE_CODE = (
+    'echo PHP_VERSION, "\\n", PHP_ZTS, "\\n", PHP_EXTENSION_DIR, "\\n", '
+    'strtolower(implode(",", get_loaded_extensions())), "\\n", '
+    'strtolower(implode(",", get_loaded_extensions(true)));'
+)
+
+
+def _exe(name):
+    return f"{name}.exe" if os.name == 'nt' else name
+
+
+def _first_existing(candidates):
+    for candidate in candidates:
+        if candidate.is_file():
+            return candidate
+    return None
+
+
+def _stamps(paths):
+    """{ruta: mtime_ns} de las rutas que existen; el resto se anota como None."""
+    stamps = {}
+    for path in paths:
+        try:
+            stamps[str(path)] = Path(path).stat().st_mtime_ns
+        except OSError:
+            stamps[str(path)] = None
+    return stamps
+
+
+def _stamps_current(stamps):
+    return all(value == _stamps([path])[path] for path, value in stamps.items())
+
+
+def _run(command):
+    try:
+        result = subprocess.run(command, capture_output=True, text=True, timeout=PROBE_TIMEOUT)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return result.stdout if result.returncode == 0 else None
+
+
+def _shared_extensions(ext_dir):
+    """Extensiones cargables de `ext_dir`: php_gd.dll en Windows, gd.so en el resto."""
+    if not ext_dir or not Path(ext_dir).is_dir():
+        return []
+    names = set()
+    for path in Path(ext_dir).iterdir():
+        if os.name == 'nt':
+            if path.name.startswith("php_") and path.suffix == ".dll":
+                names.add(path.stem[4:].lower())
+        elif path.suffix == ".so":
+            names.add(path.stem.lower())
+    return sorted(names)
+
+
+def php_files(php_path):
+    """Binario CLI, php-fpm (o php-cgi en Windows) y módulo de Apache de una instalación."""
+    if os.name == 'nt':
+        cli = _first_existing([php_path / "php.exe"])
+        fpm = _first_existing([php_path / "php-cgi.exe"])
+        module = next(iter(sorted(php_path.glob("php*apache*.dll"))), None)
+    else:
+        cli = _first_existing([php_path / "bin" / "php", php_path / "php"])
+        fpm = _first_existing([php_path / "sbin" / "php-fpm", php_path / "bin" / "php-fpm", php_path / "php-fpm"])
+        module = next(iter(sorted(php_path.glob("libphp*.so"))), None)
+    return cli, fpm, module
+
+
+def php_watch_paths(php_path):
+    """
+    Directorios (y binarios) cuyo mtime invalida el sondeo de una versión.
+    No incluye la carpeta de la versión: PyLaragon escribe ahí php.ini y
+    php-fpm.conf (temporal + rename) y cada cambio de configuración
+    provocaría un nuevo sondeo.
+    """
+    cli, fpm, module = php_files(php_path)
+    paths = [php_path / "ext", php_path / "bin", php_path / "sbin"]
+    paths += [p for p in (cli, fpm, module) if p is not None]
+    return paths
+
+
+def probe_php(php_path):
+    """
+    Sondea una instalación de PHP: versión, ZTS/NTS, directorio y lista de
+    extensiones (compiladas y cargables), módulo de Apache y php-fpm. Si el
+    binario no se puede ejecutar (otra plataforma, dependencias rotas) se
+    deduce lo posible de los archivos y la versión es la de la carpeta.
+    """
+    php_path = Path(php_path)
+    cli, fpm, module = php_files(php_path)
+    entry = {
+        'path': str(php_path),
+        'version': php_path.name,
+        'cli': str(cli) if cli else None,
+        'fpm': str(fpm) if fpm else None,
+        'apache_module': str(module) if module else None,
+        'zts': None,
+        'extension_dir': None,
+        'builtin_extensions': [],
+        'builtin_zend_extensions': [],
+        'executable': False,
+    }
+    output = _run([str(cli), "-n", "-r", PHP_PROBE_CODE]) if cli else None
+    lines = output.splitlines() if output else []
+    if len(lines) >= 4:
+        entry['executable'] = True
+        entry['version'] = lines[0].strip()
+        entry['zts'] = lines[1].strip() == "1"
+        entry['extension_dir'] = lines[2].strip() or None
+        entry['builtin_extensions'] = sorted(filter(None, lines[3].split(",")))
+        if len(lines) > 4:
+            entry['builtin_zend_extensions'] = sorted(filter(None, lines[4].split(",")))
+    elif os.name == 'nt':
+        # php8ts.dll / php7ts.dll sólo existen en las compilaciones thread-safe.
+        entry['zts'] = any(php_path.glob("php*ts.dll"))
+
+    # Las compilaciones portables traen ext/ junto al binario; es lo que usa php.ini.
+    if (php_path / "ext").is_dir() or not entry['extension_dir']:
+        entry['extension_dir'] = str(php_path / "ext")
+    entry['shared_extensions'] = _shared_extensions(entry['extension_dir'])
+    entry['stamps'] = _stamps(php_watch_paths(php_path))
+    return entry
+
+
+def probe_apache(apache_path):
+    """Versión de httpd y módulos disponibles en modules/."""
+    executable = apache_path / "bin" / _exe("httpd")
+    modules_dir = apache_path / "modules"
+    output = _run([str(executable), "-v"]) if executable.is_file() else None
+    match = re.search(r"Apache/(\S+)", output or "")
+    modules = sorted(p.stem for p in modules_dir.glob("mod_*.so")) if modules_dir.is_dir() else []
+    return {
+        'path': str(apache_path),
+        'executable': str(executable) if executable.is_file() else None,
+        'version': match.group(1) if match else None,
+        'modules': modules,
+        'stamps': _stamps([apache_path / "bin", executable, modules_dir]),
+    }
+
+
+def probe_mysql(mysql_path):
+    """Versión de mysqld (y si es MariaDB)."""
+    executable = mysql_path / "bin" / _exe("mysqld")
+    output = _run([str(executable), "--version"]) if executable.is_file() else None
+    match = re.search(r"Ver\s+(\d+\.\d+\.\d+\S*)", output or "")
+    return {
+        'path': str(mysql_path),
+        'executable': str(executable) if executable.is_file() else None,
+        'version': match.group(1) if match else None,
+        'mariadb': bool(output) and "mariadb" in output.lower(),
+        'stamps': _stamps([mysql_path / "bin", executable]),
+    }
+
+
+class RuntimeRegistry:
+    """
+    Índice de los runtimes instalados en bin/ (versiones de PHP, Apache y
+    MySQL) con lo que se sabe de cada uno tras sondearlo.
+
+    Se guarda en un manifiesto junto con el mtime de los directorios y
+    binarios de cada runtime; una consulta sólo hace stat() de esas rutas y
+    vuelve a sondear (en paralelo) los que cambiaron. Así el arranque y el
+    cambio de versión leen del índice en lugar de recorrer bin/ y lanzar
+    `php -v` cada vez.
+    """
+
+    def __init__(self, bin_path, manifest_path, workers=4):
+        self.bin_path = Path(bin_path)
+        self.manifest_path = Path(manifest_path)
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._manifest = None
+
+    def _load(self):
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            if manifest.get('version') == MANIFEST_VERSION:
+                return manifest
+        except (OSError, json.JSONDecodeError, AttributeError):
+            pass
+        return {'version': MANIFEST_VERSION, 'php_root': None, 'php': {}, 'apache': None, 'mysql': None}
+
+    def refresh(self, force=False):
+        """Pone el índice al día y lo devuelve. `force` vuelve a sondearlo todo."""
+        with self._lock:
+            if self._manifest is None:
+                self._manifest = self._load()
+            manifest = self._manifest
+            changed = force
+            php_dir = self.bin_path / "php"
+
+            root_stamp = _stamps([php_dir])
+            if force or manifest['php_root'] != root_stamp:
+                versions = sorted(d.name for d in php_dir.iterdir() if d.is_dir()) if php_dir.is_dir() else []
+                for gone in set(manifest['php']) - set(versions):
+                    del manifest['php'][gone]
+                    changed = True
+                for version in versions:
+                    manifest['php'].setdefault(version, None)
+                manifest['php_root'] = root_stamp
+                changed = True
+
+            jobs = {}
+            for version, entry in manifest['php'].items():
+                if force or entry is None or not _stamps_current(entry['stamps']):
+                    jobs[('php', version)] = (probe_php, php_dir / version)
+            for kind, probe in (('apache', probe_apache), ('mysql', probe_mysql)):
+                entry = manifest[kind]
+                if force or entry is None or not _stamps_current(entry['stamps']):
+                    jobs[(kind, None)] = (probe, self.bin_path / kind)
+
+            if jobs:
+                print(f"🔍 Sondeando {len(jobs)} runtime(s) en bin/...")
+                with ThreadPoolExecutor(max_workers=max(1, min(self.workers, len(jobs)))) as pool:
+                    futures = {key: pool.submit(probe, path) for key, (probe, path) in jobs.items()}
+                for (kind, version), future in futures.items():
+                    if kind == 'php':
+                        manifest['php'][version] = future.result()
+                    else:
+                        manifest[kind] = future.result()
+                changed = True
+
+            if changed:
+                try:
+                    atomic_write(self.manifest_path, json.dumps(manifest, indent=1, sort_keys=True))
+                except OSError as e:
+                    print(f"⚠️ No se pudo guardar el índice de runtimes: {e}")
+            return manifest
+
+    def php_versions(self):
+        """Carpetas de bin/php/, ordenadas como siempre (el orden fija los puertos FPM)."""
+        return sorted(self.refresh()['php'])
+
+    def php(self, version):
+        """Datos sondeados de una versión de PHP, o None si no está instalada."""
+        return self.refresh()['php'].get(version)
+
+    def apache(self):
+        return self.refresh()['apache']
+
+    def mysql(self):
+        return self.refresh()['mysql']
@@ -9,6 +9,22 @@ from .apache_manager import ApacheManager
 from .mysql_manager import MySQLManager
 from .php_manager import PHPManager
 from .ssl_manager import SSLManager
+from .vhost_manager import VHostManager
+from .php_fpm_manager import PHPFPMManager
+from .readiness import http_probe, mysql_probe, tcp_probe, wait_until_ready
+from .orchestrator import run_in_dependency_order
+from .log_pipeline import LogMultiplexer
+from .telemetry import ResourceSampler
+from .db_snapshot import SnapshotManager
+from .restart_policy import DEFAULT_POLICY, RestartTracker, describe_exit
+from .port_preflight import PortInUseError, check_ports, describe_conflict, find_free_port
+from .benchmark import BenchmarkStore, config_fingerprint, run_benchmark
+from .asset_pipeline import AssetPipeline
+from .config_watcher import ConfigWatcher, LatencyLog, affected_services, classify_changes
+from .apache_status import RequestRateMeter, fetch_server_status
+from .runtime_registry import RuntimeRegistry
+from .cache_services import create_services
+from .config_renderer import InvalidConfigError
 
 class ServiceManager:
     def __init__(self, base_path=None):
@@ -18,14 +34,76 @@ class ServiceManager:
         
         self.processes = {'apache': None, 'mysql': None}
         self.service_status_callback = None
+        self.ready_events = {}
+        self.ready_results = {}
+        self.ready_times = {}
+        self.started_at = {}
+        # Procesos que se están deteniendo a petición: su salida no es una caída.
+        self._stopping = set()
+        self.restart_trackers = {}
+        self._restart_timers = {}
+        self.crash_callback = None
+        # Puertos alternativos elegidos en esta sesión: {clave: (original, nuevo)}.
+        # Se aplican a la configuración en memoria pero nunca se guardan.
+        self.port_overrides = {}
+        self.watcher = None
+        self.watch_log = LatencyLog()
+        self.request_meter = RequestRateMeter()
+        self._watch_lock = threading.Lock()
+        # Módulo PHP cargado por el httpd en ejecución (cambiarlo exige reinicio completo).
+        self.apache_loaded_module = None
+        # Índice de bin/: load_config ya lo necesita para la versión de PHP por defecto.
+        self.runtimes = RuntimeRegistry(self.bin_path, self.base_path / "run" / "runtimes.json")
 
         self.config = self.load_config()
+        self.log_pipeline = LogMultiplexer(self.base_path / "logs")
+        self.telemetry = ResourceSampler(
+            self._running_pids,
+            interval=self.config.get('telemetry_interval', 2.0),
+            include_uss=self.config.get('telemetry_uss', False),
+        )
 
         # Gestores de servicios
-        self.ssl_manager = SSLManager(self.base_path)
-        self.php_manager = PHPManager(self.bin_path, self.config.get('php_version', '8.1'))
-        self.apache_manager = ApacheManager(self.bin_path, self.php_manager, self.config, self.ssl_manager)
+        # Servicios opcionales (Redis, Memcached...) con el mismo ciclo de vida que el resto.
+        self.cache_services = create_services(self.bin_path, self.config)
+        self.ssl_manager = SSLManager(
+            self.base_path,
+            key_type=self.config.get('ssl_key_type', 'rsa'),
+            renew_days=self.config.get('ssl_renew_days', 30),
+        )
+        self.php_manager = PHPManager(
+            self.bin_path,
+            self.config.get('php_version', '8.1'),
+            self.config.get('php_profile', 'development'),
+            self.runtimes,
+            self.config.get('php_session_handler', 'files'),
+            self.get_cache_services,
+        )
+        self.fpm_managers = {}
+        self.vhost_manager = VHostManager(
+            self.base_path / "config" / "vhosts.json",
+            self.base_path / "www",
+            self.bin_path / "apache" / "conf" / "vhosts",
+            self.config,
+            self.ssl_manager,
+            self.get_fpm_handler,
+        )
+        self.apache_manager = ApacheManager(
+            self.bin_path, self.php_manager, self.config, self.ssl_manager,
+            self.vhost_manager, self.get_fpm_handler,
+        )
         self.mysql_manager = MySQLManager(self.bin_path, self.config)
+        self.snapshot_manager = SnapshotManager(self.mysql_manager, self.config, self.base_path / "snapshots")
+        self.benchmark_store = BenchmarkStore(self.base_path / "benchmarks")
+        self.asset_pipeline = AssetPipeline(
+            self.apache_manager.www_path,
+            self.base_path / "run" / "assets.json",
+            workers=self.config.get('asset_workers'),
+            use_brotli=self.config.get('asset_brotli', True),
+        )
+        self._brotli_warned = False
+        self._sync_fpm_services()
+        self._sync_cache_services()
 
 
     def load_config(self):
@@ -37,11 +115,12 @@ class ServiceManager:
         except (json.JSONDecodeError, FileNotFoundError) as e:
             print(f"⚠️ Error cargando configuración: {e}. Creando una por defecto.")
         
+        installed = self.find_php_versions()
         default_config = {
             'apache_http_port': 80,
             'apache_https_port': 443,
             'mysql_port': 3306,
-            'php_version': self.find_php_versions()[0] if self.find_php_versions() else '8.1'
+            'php_version': installed[0] if installed else '8.1'
         }
         self.save_config(default_config)
         return default_config
@@ -49,115 +128,987 @@ class ServiceManager:
     def save_config(self, config_data=None):
         if config_data is None:
             config_data = self.config
+        if self.port_overrides and config_data is self.config:
+            config_data = dict(config_data)
+            for key, (original, _) in self.port_overrides.items():
+                if original is None:
+                    # El puerto era el predeterminado del servicio: no estaba en el archivo.
+                    config_data.pop(key, None)
+                elif key in config_data:
+                    config_data[key] = original
         
         self.config_path.parent.mkdir(exist_ok=True)
         with open(self.config_path, 'w', encoding='utf-8') as f:
             json.dump(config_data, f, indent=4, ensure_ascii=False)
         print("✅ Configuración guardada.")
 
+    def reload_config(self):
+        """
+        Relee services.json y actualiza `self.config` en el sitio: los gestores
+        comparten ese dict y ven los valores nuevos sin recrearlos. Devuelve
+        las claves que cambiaron, o None si el archivo no es JSON válido (por
+        ejemplo a medio guardar), en cuyo caso no se toca nada.
+        """
+        try:
+            with open(self.config_path, 'r', encoding='utf-8') as f:
+                new_config = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"⚠️ No se pudo releer services.json ({e}); se mantiene la configuración actual.")
+            return None
+
+        current = dict(self.config)
+        for key, (original, _) in self.port_overrides.items():
+            if key in current:
+                current[key] = original
+        changed = {key for key in current.keys() | new_config.keys() if current.get(key) != new_config.get(key)}
+        self.config.update(new_config)
+        for key in changed - new_config.keys():
+            # Las claves básicas se conservan aunque se borren del archivo.
+            if key not in ('apache_http_port', 'apache_https_port', 'mysql_port', 'php_version'):
+                self.config.pop(key, None)
+        self.apply_port_overrides()
+        self._refresh_from_config(changed)
+        return changed
+
+    def _refresh_from_config(self, changed):
+        """Propaga a los objetos creados en __init__ los valores que copiaron de la configuración."""
+        if 'php_profile' in changed:
+            profile = self.config.get('php_profile', 'development')
+            self.php_manager.profile = profile
+            for manager in self.fpm_managers.values():
+                manager.php_manager.profile = profile
+        if 'php_session_handler' in changed:
+            handler = self.config.get('php_session_handler', 'files')
+            self.php_manager.session_handler = handler
+            for manager in self.fpm_managers.values():
+                manager.php_manager.session_handler = handler
+        if 'php_fpm_port' in changed:
+            installed = self.find_php_versions()
+            for version, manager in self.fpm_managers.items():
+                service_name = 'php_fpm' if version == self.php_manager.version else f'php_fpm@{version}'
+                if service_name not in self.port_overrides:
+                    offset = installed.index(version) if version in installed else len(installed)
+                    manager.port = self.config.get('php_fpm_port', 9000) + offset
+        if any(key.startswith(('restart_', 'crash_loop_')) for key in changed):
+            previous, self.restart_trackers = self.restart_trackers, {}
+            for name, tracker in previous.items():
+                self.get_restart_tracker(name).history.extend(tracker.history)
+        self.ssl_manager.key_type = self.config.get('ssl_key_type', 'rsa')
+        self.ssl_manager.renew_days = self.config.get('ssl_renew_days', 30)
+        self.telemetry.interval = self.config.get('telemetry_interval', 2.0)
+        self.asset_pipeline.workers = self.config.get('asset_workers') or os.cpu_count() or 1
+        self.asset_pipeline.use_brotli = self.config.get('asset_brotli', True)
+        self._sync_fpm_services()
+        if 'cache_services' in changed:
+            self._sync_cache_services()
+
+    def apply_config(self, changed, services=None, force=False):
+        """
+        Lleva los servicios en marcha a la configuración actual tras
+        reload_config(). Sin `services` sólo se tocan los que dependen de las
+        claves cambiadas; cada uno se recarga con reload_service, que decide
+        entre no hacer nada, recarga elegante o reinicio (`force` recarga
+        aunque la configuración no haya cambiado).
+        """
+        results = []
+        version = self.config.get('php_version')
+        if version and version != self.php_manager.version:
+            result = self.switch_php_version(version)
+            if result:
+                results.append(result)
+        if services is None:
+            services = affected_services(changed, list(self.processes))
+        apache_running = self.get_service_status('apache')
+        for name in services:
+            # Al pasar a FPM el pool tiene que arrancar antes de recargar Apache.
+            needed_pool = name.startswith('php_fpm') and apache_running and self.uses_fpm()
+            if self.get_service_status(name) or needed_pool:
+                results.append(self.reload_service(name, force=force))
+        if 'php_mode' in changed and not self.uses_fpm():
+            for name in [n for n in self.processes if n.startswith('php_fpm')]:
+                if self.get_service_status(name):
+                    self.stop_service(name)
+            self._sync_fpm_services()
+        return results
+
+    # --- Vigilancia de archivos ---
+
+    def start_watching(self, lock=None):
+        """
+        Vigila services.json, vhosts.json y www/ y aplica cada lote de cambios
+        con la acción más barata. `lock` serializa esos cambios con el resto
+        de operaciones (el supervisor pasa el suyo).
+        """
+        if self.watcher is not None:
+            return
+        if lock is not None:
+            self._watch_lock = lock
+        self.watcher = ConfigWatcher(
+            [(self.config_path.parent, False), (self.vhost_manager.www_path, True)],
+            self._on_file_changes,
+            debounce=self.config.get('watch_debounce', 0.25),
+            backend=self.config.get('watch_backend'),
+        )
+        self.watcher.start()
+        print(f"👀 Vigilando config/ y www/ ({self.watcher.backend.name}).")
+
+    def stop_watching(self):
+        if self.watcher is not None:
+            self.watcher.stop()
+            self.watcher = None
+
+    def _on_file_changes(self, paths, first_seen):
+        picked_up = time.monotonic()
+        plan = classify_changes(paths, self.config_path, self.vhost_manager.vhosts_config_path, self.vhost_manager.www_path)
+        actions = []
+        with self._watch_lock:
+            if plan['config']:
+                changed = self.reload_config()
+                if changed is None:
+                    actions.append({'action': 'invalid', 'file': self.config_path.name})
+                elif changed:
+                    actions.append({'action': 'config', 'keys': sorted(changed), 'results': self.apply_config(changed)})
+            if plan['vhosts']:
+                if self._vhosts_file_is_valid():
+                    summary = self.sync_vhosts()
+                    if summary['added'] or summary['updated'] or summary['removed']:
+                        actions.append({'action': 'vhosts', **summary})
+                else:
+                    actions.append({'action': 'invalid', 'file': self.vhost_manager.vhosts_config_path.name})
+        # La compresión (brotli 11) puede tardar: fuera del candado, para que un
+        # `git checkout` en www/ no bloquee los start/stop/reload del supervisor.
+        # AssetPipeline serializa sus propias pasadas.
+        if plan['assets'] and self.config.get('precompressed_assets', True):
+            summary = self._build_assets_in_background()
+            if summary and (summary['compressed'] or summary['removed']):
+                actions.append({'action': 'assets', 'compressed': len(summary['compressed']), 'removed': len(summary['removed'])})
+        done = time.monotonic()
+
+        entry = {
+            'time': time.time(),
+            'changes': len(paths),
+            'paths': sorted(str(p) for p in paths)[:20],
+            'actions': actions or [{'action': 'noop'}],
+            'wait_seconds': picked_up - first_seen,
+            'apply_seconds': done - picked_up,
+            'total_seconds': done - first_seen,
+        }
+        self.watch_log.add(entry)
+        if actions:
+            names = ", ".join(a['action'] for a in actions)
+            print(f"👀 {len(paths)} cambios aplicados ({names}) en {entry['total_seconds'] * 1000:.0f} ms.")
+
+    def _vhosts_file_is_valid(self):
+        # Un vhosts.json a medio guardar no debe borrar los sitios que declara.
+        path = self.vhost_manager.vhosts_config_path
+        try:
+            if path.exists() and path.stat().st_size > 0:
+                with open(path, 'r', encoding='utf-8') as f:
+                    json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return False
+        return True
+
+    def get_watch_stats(self):
+        """Estado del vigilante y latencia desde el cambio en disco hasta que surte efecto."""
+        return {
+            'watching': self.watcher is not None,
+            'backend': self.watcher.backend.name if self.watcher and self.watcher.backend else None,
+            'latency': self.watch_log.summary(),
+            'recent': list(self.watch_log.entries)[-10:],
+        }
+
     def find_php_versions(self):
-        php_dir = self.bin_path / "php"
-        if not php_dir.is_dir(): return []
-        return sorted([d.name for d in php_dir.iterdir() if d.is_dir()])
+        return self.runtimes.php_versions()
+
+    def get_runtimes(self, refresh=False):
+        """Índice de runtimes de bin/ (ver RuntimeRegistry); `refresh` fuerza un nuevo sondeo."""
+        return self.runtimes.refresh(force=refresh)
 
     def switch_php_version(self, version):
         print(f"🔄 Cambiando a PHP versión {version}...")
+        previous_version = self.php_manager.version
         self.php_manager.set_version(version)
         self.apache_manager.update_php_manager(self.php_manager)
         self.config['php_version'] = version
         self.save_config()
-        
-        if self.get_service_status('apache'):
-            self.restart_service('apache')
+
+        if self.uses_fpm() and version != previous_version:
+            result = self._switch_fpm_version(previous_version)
+        else:
+            result = None
+            if self.get_service_status('apache'):
+                result = self.reload_service('apache')
         print(f"✅ Versión de PHP cambiada a {version}.")
+        return result
+
+    # --- PHP-FPM ---
+
+    def uses_fpm(self):
+        return self.config.get('php_mode', 'mod_php') == 'fpm'
+
+    def get_fpm_manager(self, version):
+        """
+        Gestor FPM de una versión. Cada versión instalada tiene un puerto fijo
+        (`php_fpm_port` + su posición entre las versiones instaladas) para que
+        varias puedan convivir.
+        """
+        manager = self.fpm_managers.get(version)
+        if manager is None:
+            installed = self.find_php_versions()
+            offset = installed.index(version) if version in installed else len(installed)
+            manager = PHPFPMManager(
+                PHPManager(
+                    self.bin_path, version, self.config.get('php_profile', 'development'), self.runtimes,
+                    self.config.get('php_session_handler', 'files'), self.get_cache_services,
+                ),
+                self.config,
+                self.config.get('php_fpm_port', 9000) + offset,
+            )
+            self.fpm_managers[version] = manager
+        return manager
+
+    def get_fpm_handler(self, version):
+        return self.get_fpm_manager(version).get_handler()
+
+    def _fpm_version(self, service_name):
+        """'php_fpm' sirve la versión por defecto; 'php_fpm@7.4.33' una fijada por un sitio."""
+        if service_name == 'php_fpm':
+            return self.php_manager.version
+        return service_name.split('@', 1)[1]
+
+    def _sync_fpm_services(self):
+        """Añade o retira los servicios FPM según `php_mode` y las versiones fijadas en vhosts.json."""
+        needed = set()
+        if self.uses_fpm():
+            needed.add('php_fpm')
+            for version in self.vhost_manager.pinned_php_versions():
+                if version != self.php_manager.version:
+                    needed.add(f'php_fpm@{version}')
+        for name in list(self.processes):
+            if name.startswith('php_fpm') and name not in needed and not self.get_service_status(name):
+                del self.processes[name]
+        for name in sorted(needed):
+            self.processes.setdefault(name, None)
+
+    # --- Servicios de caché ---
+
+    def get_cache_services(self):
+        """{nombre: gestor} de los servicios de caché activos (ver services/cache_services.py)."""
+        return self.cache_services
+
+    def _sync_cache_services(self):
+        """Añade o retira los servicios de caché según `cache_services` y lo instalado en bin/."""
+        wanted = create_services(self.bin_path, self.config)
+        for name in list(self.cache_services):
+            if name not in wanted and not self.get_service_status(name):
+                del self.cache_services[name]
+                self.processes.pop(name, None)
+        for name, service in wanted.items():
+            # Los gestores existentes se conservan: recuerdan con qué puerto arrancaron.
+            self.cache_services.setdefault(name, service)
+            self.processes.setdefault(name, None)
+
+    def _switch_fpm_version(self, previous_version):
+        """
+        Cambio de versión sin cortes: arranca el pool de la nueva versión en su
+        puerto, recarga Apache para apuntar a él y sólo entonces detiene el viejo.
+
+        Cada versión tiene su puerto, así que los pools se reaprovechan: si un
+        sitio fija la nueva versión su `php_fpm@<nueva>` pasa a ser `php_fpm`,
+        y si alguno fija la anterior el pool viejo sigue como
+        `php_fpm@<anterior>` en lugar de detenerse.
+        """
+        old_process = self.processes.get('php_fpm')
+        if old_process is not None and old_process.poll() is not None:
+            old_process = None
+        pinned_name = f'php_fpm@{self.php_manager.version}'
+        pinned_process = self.processes.pop(pinned_name, None)
+        if pinned_process is not None and pinned_process.poll() is not None:
+            pinned_process = None
+
+        self.processes['php_fpm'] = None
+        if old_process is not None and previous_version in self.vhost_manager.pinned_php_versions():
+            self.processes[f'php_fpm@{previous_version}'] = old_process
+            self._move_process_slot('php_fpm', f'php_fpm@{previous_version}')
+            old_process = None
+        if pinned_process is not None:
+            self.processes['php_fpm'] = pinned_process
+            self._move_process_slot(pinned_name, 'php_fpm')
+        self._sync_fpm_services()
+        if pinned_process is None and not self.start_service('php_fpm', wait_ready=True):
+            return {'service': 'php_fpm', 'action': 'restart', 'ok': False, 'error': "el nuevo pool FPM no arrancó"}
+        result = None
+        if self.get_service_status('apache'):
+            result = self.reload_service('apache')
+        if old_process is not None and old_process.poll() is None:
+            self._terminate(old_process, 'php_fpm')
+        return result
+
+    def _move_process_slot(self, source, target):
+        """Pasa el estado de arranque de un proceso que cambia de nombre de servicio."""
+        for registry in (self.started_at, self.ready_times, self.ready_results):
+            if source in registry:
+                registry[target] = registry.pop(source)
 
     # --- FUNCIÓN MEJORADA PARA CAPTURAR ERRORES ---
-    def _run_service(self, service_name, cmd):
+    def _run_service(self, service_name, cmd, env=None):
         try:
             process = subprocess.Popen(
                 cmd, 
                 stdout=subprocess.PIPE, 
                 stderr=subprocess.PIPE, 
-                text=True, 
+                env=env,
                 creationflags=subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
             )
             self.processes[service_name] = process
+            self.started_at[service_name] = time.monotonic()
             
-            # Hilos para monitorear la salida y el error
-            threading.Thread(target=self._monitor_stream, args=(process.stdout, service_name, "STDOUT"), daemon=True).start()
-            threading.Thread(target=self._monitor_stream, args=(process.stderr, service_name, "STDERR"), daemon=True).start()
+            # La salida y los errores los recoge el multiplexor de logs compartido
+            self.log_pipeline.add_process(service_name, process)
+            if self.telemetry.interval > 0:
+                self.telemetry.start()
             threading.Thread(target=self._monitor_process, args=(process, service_name), daemon=True).start()
             
-            print(f"✅ {service_name.capitalize()} iniciado (PID: {process.pid}).")
-            if self.service_status_callback:
-                self.service_status_callback(service_name, True)
+            print(f"⏳ {service_name.capitalize()} lanzado (PID: {process.pid}). Esperando a que acepte conexiones...")
         except Exception as e:
             print(f"❌ Error CRÍTICO al iniciar {service_name}: {e}")
+            self._set_ready(service_name, False)
+            return
+
+        elapsed = wait_until_ready(
+            self.get_readiness_probe(service_name),
+            timeout=self.config.get('readiness_timeout', 30),
+            is_alive=lambda: process.poll() is None,
+        )
+        if elapsed is None:
+            print(f"❌ {service_name.capitalize()} no respondió a tiempo en su puerto.")
+            self._set_ready(service_name, False)
+            return
+
+        self.ready_times[service_name] = elapsed
+        print(f"✅ {service_name.capitalize()} listo (PID: {process.pid}) en {elapsed:.2f}s.")
+        self._set_ready(service_name, True)
+
+    def _set_ready(self, service_name, is_ready):
+        """Publica el resultado del arranque a la GUI y a quien espere con wait_ready."""
+        self.ready_results[service_name] = is_ready
+        event = self.ready_events.get(service_name)
+        if event:
+            event.set()
+        if self.service_status_callback:
+            self.service_status_callback(service_name, is_ready)
+
+    def get_readiness_probe(self, service_name):
+        """Devuelve la sonda que confirma que el servicio atiende en su puerto."""
+        if service_name == 'apache':
+            return lambda: http_probe('127.0.0.1', self.config['apache_http_port'])
+        if service_name == 'mysql':
+            return lambda: mysql_probe('127.0.0.1', self.config['mysql_port'])
+        if service_name.startswith('php_fpm'):
+            port = self.get_fpm_manager(self._fpm_version(service_name)).port
+            return lambda: tcp_probe('127.0.0.1', port)
+        if service_name in self.cache_services:
+            return self.cache_services[service_name].probe
+        raise ValueError(f"Servicio desconocido: {service_name}")
+
+    def get_time_to_ready(self, service_name):
+        """Segundos que tardó el último arranque del servicio en aceptar conexiones."""
+        return self.ready_times.get(service_name)
+
+    def _running_pids(self):
+        return {
+            name: process.pid
+            for name, process in self.processes.items()
+            if process and process.poll() is None
+        }
+
+    def get_metrics(self):
+        """Última muestra de recursos por servicio (CPU, RSS, hilos, sockets...)."""
+        return self.telemetry.latest()
+
+    def get_request_rate(self):
+        """Peticiones por segundo de Apache desde la consulta anterior (mod_status), o None."""
+        if not self.get_service_status('apache'):
+            self.request_meter.reset()
+            return None
+        status = fetch_server_status(self.config['apache_http_port'], timeout=0.5)
+        return self.request_meter.update(status) if status else None
+
+    def get_dashboard(self):
+        """
+        Una fila por servicio para el panel de la GUI: estado, PID, segundos
+        en marcha, CPU, RSS y, para Apache, peticiones por segundo.
+        """
+        metrics = self.get_metrics()
+        now = time.monotonic()
+        rows = {}
+        for name, process in list(self.processes.items()):
+            running = bool(self.get_service_status(name))
+            sample = metrics.get(name, {}) if running else {}
+            started = self.started_at.get(name)
+            rows[name] = {
+                'running': running,
+                'pid': process.pid if running else None,
+                'uptime': now - started if running and started else None,
+                'cpu_percent': sample.get('cpu_percent'),
+                'rss': sample.get('rss'),
+                'requests_per_sec': None,
+            }
+        if 'apache' in rows:
+            rows['apache']['requests_per_sec'] = self.get_request_rate()
+        return rows
+
+    def export_metrics(self, fmt='json'):
+        """Exporta las métricas en 'json' o 'prometheus'."""
+        if fmt == 'prometheus':
+            return self.telemetry.to_prometheus()
+        return self.telemetry.to_json()
+
+    def get_logs(self, service_name, lines=100, since=None):
+        """Últimas líneas de log del servicio (ver LogMultiplexer.tail)."""
+        return self.log_pipeline.tail(service_name, lines=lines, since=since)
+
+    def subscribe_logs(self, callback):
+        """Recibe `callback(service_name, entries)` por cada lote de logs nuevo."""
+        return self.log_pipeline.subscribe(callback)
+
+    def _monitor_process(self, process, service_name):
+        returncode = process.wait()
+        requested = process in self._stopping
+        self._stopping.discard(process)
+        # El proceso pudo cambiar de nombre (php_fpm <-> php_fpm@<versión>) en un cambio de versión.
+        service_name = next((name for name, p in self.processes.items() if p is process), service_name)
+        current = self.processes.get(service_name)
+        if current is process:
+            self.processes[service_name] = None
+        elif current is not None:
+            # Tras un reinicio rápido el hueco ya pertenece al nuevo proceso.
+            return
+
+        if requested:
+            print(f"🛑 {service_name.capitalize()} se ha detenido.")
             if self.service_status_callback:
                 self.service_status_callback(service_name, False)
+            return
+        self._handle_crash(service_name, returncode)
 
-    def _monitor_stream(self, stream, service_name, stream_name):
-        """Lee la salida y los errores de un proceso para depuración."""
-        if stream:
-            for line in iter(stream.readline, ''):
-                # Imprime los errores en la consola para depuración
-                print(f"[{service_name.upper()} - {stream_name}]: {line.strip()}")
+    # --- Caídas y reinicio automático ---
+
+    def get_restart_tracker(self, service_name):
+        """
+        Política de reinicio del servicio: `restart_policies` por servicio o
+        `restart_policy` para todos ('never', 'on-failure' o 'always').
+        """
+        tracker = self.restart_trackers.get(service_name)
+        if tracker is None:
+            base_name = service_name.split('@', 1)[0]
+            policies = self.config.get('restart_policies', {})
+            tracker = RestartTracker(
+                policies.get(service_name, policies.get(base_name, self.config.get('restart_policy', DEFAULT_POLICY))),
+                backoff=self.config.get('restart_backoff', 1.0),
+                max_backoff=self.config.get('restart_backoff_max', 60.0),
+                max_crashes=self.config.get('crash_loop_max', 5),
+                window=self.config.get('crash_loop_window', 120.0),
+            )
+            self.restart_trackers[service_name] = tracker
+        return tracker
+
+    def _handle_crash(self, service_name, returncode):
+        code, signal_name = describe_exit(returncode)
+        started = self.started_at.pop(service_name, None)
+        uptime = time.monotonic() - started if started is not None else None
+        print(f"💥 {service_name.capitalize()} terminó inesperadamente "
+              f"({'señal ' + signal_name if signal_name else f'código {code}'}).")
+
+        # Se da tiempo al multiplexor para recoger las últimas líneas del proceso.
+        time.sleep(self.log_pipeline.flush_interval)
+        log_tail = [e['line'] for e in self.log_pipeline.tail(service_name, lines=20)]
+        entry = self.get_restart_tracker(service_name).record_exit(returncode, uptime, log_tail)
 
-    def _monitor_process(self, process, service_name):
-        process.wait()
-        print(f"🛑 {service_name.capitalize()} se ha detenido.")
-        self.processes[service_name] = None
         if self.service_status_callback:
             self.service_status_callback(service_name, False)
+        if self.crash_callback:
+            self.crash_callback(service_name, entry)
+
+        if entry['action'] == 'restart':
+            print(f"🔄 Reiniciando {service_name.capitalize()} en {entry['delay']:.1f}s...")
+            timer = threading.Timer(entry['delay'], self._auto_restart, args=(service_name,))
+            timer.daemon = True
+            self._restart_timers[service_name] = timer
+            timer.start()
+        elif entry['action'] == 'gave-up':
+            print(f"❌ {service_name.capitalize()} se cae una y otra vez: no se reiniciará más "
+                  f"hasta que se inicie a mano.")
+
+    def _auto_restart(self, service_name):
+        self._restart_timers.pop(service_name, None)
+        if self.get_service_status(service_name):
+            return
+        try:
+            self._start_service(service_name, wait_ready=True)
+        except Exception as e:
+            print(f"❌ No se pudo reiniciar {service_name}: {e}")
+
+    def _cancel_restart(self, service_name):
+        timer = self._restart_timers.pop(service_name, None)
+        if timer:
+            timer.cancel()
+
+    def get_restart_state(self, service_name):
+        """Política, número de caídas, última caída y si se dejó de reiniciar."""
+        state = self.get_restart_tracker(service_name).state()
+        state['restart_pending'] = service_name in self._restart_timers
+        return state
+
+    def get_crash_history(self, service_name):
+        """Caídas recientes con código o señal de salida, tiempo en marcha y últimas líneas de log."""
+        return list(self.get_restart_tracker(service_name).history)
+
+    def start_service(self, service_name, wait_ready=False, timeout=None, preflight=True):
+        """
+        Inicia un servicio en segundo plano. Con `wait_ready=True` bloquea hasta
+        que el puerto acepta conexiones y devuelve True/False según el resultado.
+        Un arranque manual cancela el reinicio pendiente y rearma el servicio
+        si se había dejado de reiniciar por caerse en bucle.
+        """
+        self._cancel_restart(service_name)
+        self.get_restart_tracker(service_name).reset()
+        if preflight:
+            try:
+                self.preflight_ports([service_name])
+            except PortInUseError as e:
+                print(e)
+                return False
+        return self._start_service(service_name, wait_ready, timeout)
+
+    # --- Puertos ---
+
+    def get_service_ports(self, service_name):
+        """Puertos que abre el servicio, por clave de configuración."""
+        if service_name == 'apache':
+            return {key: self.config[key] for key in ('apache_http_port', 'apache_https_port')}
+        if service_name == 'mysql':
+            return {'mysql_port': self.config['mysql_port']}
+        if service_name.startswith('php_fpm'):
+            return {service_name: self.get_fpm_manager(self._fpm_version(service_name)).port}
+        if service_name in self.cache_services:
+            return self.cache_services[service_name].get_ports()
+        raise ValueError(f"Servicio desconocido: {service_name}")
+
+    def _own_pids(self):
+        pids = set()
+        for pid in self._running_pids().values():
+            pids.add(pid)
+            try:
+                pids.update(child.pid for child in psutil.Process(pid).children(recursive=True))
+            except psutil.NoSuchProcess:
+                pass
+        return pids
+
+    def preflight_ports(self, services):
+        """
+        Comprueba los puertos de los servicios que no están en marcha con un
+        único escaneo. Si alguno está ocupado lanza PortInUseError con el
+        proceso que lo tiene o, con `auto_ports`, elige uno libre y lo aplica
+        a la configuración en memoria (httpd.conf, my.ini y hosts virtuales se
+        regeneran con él). Devuelve {clave: (original, nuevo)} de esta llamada.
+        """
+        wanted = {}
+        for name in services:
+            if not self.get_service_status(name):
+                wanted.update(self.get_service_ports(name))
+        if not wanted:
+            return {}
+        conflicts = check_ports(wanted, own_pids=self._own_pids())
+        if not conflicts:
+            return {}
+        if not self.config.get('auto_ports', False):
+            raise PortInUseError(conflicts)
+
+        changes = {}
+        taken = set(wanted.values())
+        for conflict in conflicts:
+            port = find_free_port(conflict['port'], exclude=taken)
+            if port is None:
+                raise PortInUseError([conflict])
+            taken.add(port)
+            self._override_port(conflict['key'], port)
+            changes[conflict['key']] = (conflict['port'], port)
+            print(f"⚠️ {describe_conflict(conflict)}; se usará el {port}.")
+        return changes
+
+    def _override_port(self, key, port):
+        if key.startswith('php_fpm'):
+            manager = self.get_fpm_manager(self._fpm_version(key))
+            original = self.port_overrides.get(key, (manager.port,))[0]
+            manager.port = port
+        else:
+            original = self.port_overrides.get(key, (self.config.get(key),))[0]
+            self.config[key] = port
+        self.port_overrides[key] = (original, port)
+
+    def apply_port_overrides(self):
+        """
+        Tras releer services.json vuelve a aplicar los puertos alternativos,
+        salvo los que el usuario cambió a mano en el archivo.
+        """
+        for key, (original, port) in list(self.port_overrides.items()):
+            if key.startswith('php_fpm'):
+                self.get_fpm_manager(self._fpm_version(key)).port = port
+            elif self.config.get(key) == original:
+                self.config[key] = port
+            else:
+                del self.port_overrides[key]
+
+    def get_effective_ports(self):
+        """Puertos en uso por servicio, con los alternativos ya aplicados."""
+        return {name: self.get_service_ports(name) for name in self.processes}
 
     # --- FUNCIÓN MEJORADA CON LA LÓGICA DE SSL ---
-    def start_service(self, service_name):
+    def _start_service(self, service_name, wait_ready=False, timeout=None):
         if self.get_service_status(service_name):
             print(f"⚠️ {service_name.capitalize()} ya está en ejecución.")
-            return
+            return True if wait_ready else None
 
         print(f"🚀 Iniciando {service_name.capitalize()}...")
+        env = None
         if service_name == 'apache':
             # ¡Solución! Asegurarse de que los certificados SSL existan ANTES de iniciar.
             if not self.ssl_manager.certs_exist():
                 print("🔧 No se encontraron certificados SSL. Generando uno para 'localhost'...")
                 self.ssl_manager.generate_self_signed_cert('localhost')
+            elif self.ssl_manager.default_needs_renewal():
+                self.ssl_manager.generate_self_signed_cert('localhost')
             
             self.apache_manager.configure()
+            self.apache_loaded_module = self.apache_manager.php_module_path
             cmd = self.apache_manager.get_start_command()
+            if self.config.get('precompressed_assets', True):
+                # Apache mira en cada petición si existe la variante, así que
+                # no hace falta esperar a que termine para arrancar.
+                threading.Thread(target=self._build_assets_in_background, daemon=True).start()
         elif service_name == 'mysql':
             self.mysql_manager.configure()
             cmd = self.mysql_manager.get_start_command()
+        elif service_name.startswith('php_fpm'):
+            fpm_manager = self.get_fpm_manager(self._fpm_version(service_name))
+            fpm_manager.configure()
+            cmd = fpm_manager.get_start_command()
+            env = fpm_manager.get_start_env()
+        elif service_name in self.cache_services:
+            service = self.cache_services[service_name]
+            service.configure()
+            cmd = service.get_start_command()
+            env = service.get_start_env()
         else:
             raise ValueError(f"Servicio desconocido: {service_name}")
-            
-        threading.Thread(target=self._run_service, args=(service_name, cmd), daemon=True).start()
+
+        event = threading.Event()
+        self.ready_events[service_name] = event
+        self.ready_results[service_name] = False
+        threading.Thread(target=self._run_service, args=(service_name, cmd, env), daemon=True).start()
+
+        if wait_ready:
+            if timeout is None:
+                timeout = self.config.get('readiness_timeout', 30) + 5
+            return event.wait(timeout) and self.ready_results[service_name]
 
     def stop_service(self, service_name):
+        """Detiene el servicio y espera a que el proceso termine. Devuelve True si quedó detenido."""
         print(f"🛑 Deteniendo {service_name.capitalize()}...")
+        self._cancel_restart(service_name)
         process = self.processes.get(service_name)
         if process and process.poll() is None:
-            try:
-                parent = psutil.Process(process.pid)
-                for child in parent.children(recursive=True): child.terminate()
-                parent.terminate()
-                process.wait(timeout=5)
-            except (psutil.NoSuchProcess, psutil.TimeoutExpired) as e:
-                print(f"⚠️ No se pudo detener {service_name} de forma elegante: {e}. Forzando terminación.")
-                process.kill()
+            self._terminate(process, service_name)
             self.processes[service_name] = None
         else:
             print(f"⚠️ {service_name.capitalize()} no estaba en ejecución.")
+        return True
+
+    def _terminate(self, process, service_name):
+        self._stopping.add(process)
+        try:
+            parent = psutil.Process(process.pid)
+            for child in parent.children(recursive=True): child.terminate()
+            parent.terminate()
+            process.wait(timeout=5)
+        except (psutil.NoSuchProcess, psutil.TimeoutExpired, subprocess.TimeoutExpired) as e:
+            print(f"⚠️ No se pudo detener {service_name} de forma elegante: {e}. Forzando terminación.")
+            process.kill()
+            process.wait()
 
-    def restart_service(self, service_name):
+    def restart_service(self, service_name, wait_ready=False):
+        # stop_service ya espera a que el proceso salga: no hace falta dormir.
         if self.get_service_status(service_name):
             self.stop_service(service_name)
-            time.sleep(3)
-        self.start_service(service_name)
+        return self.start_service(service_name, wait_ready=wait_ready)
+
+    def reload_service(self, service_name, force=False):
+        """
+        Aplica la configuración actual con el menor corte posible.
+
+        Primero regenera la configuración del servicio: si el contenido no
+        cambió (y no se pasa `force`, para cambios ya escritos) no se hace
+        nada. Apache y PHP-FPM validan la configuración nueva (`-t`) en un
+        temporal antes de sustituir la que está en uso y reciben una
+        señal de recarga elegante; sólo hay reinicio completo si cambia el
+        módulo PHP cargado en Apache (o la plataforma no admite la señal). Si
+        la validación falla el servidor sigue con la configuración anterior.
+
+        Devuelve un dict con 'action' ('noop', 'start', 'reload' o 'restart'),
+        'ok', 'seconds' y 'error'.
+        """
+        start = time.monotonic()
+        result = {'service': service_name, 'action': 'reload', 'ok': False, 'seconds': 0.0, 'error': None}
+
+        def finish(ok, error=None):
+            result['ok'] = bool(ok)
+            result['error'] = error
+            result['seconds'] = time.monotonic() - start
+            if error:
+                print(f"❌ No se pudo recargar {service_name}: {error}")
+            else:
+                print(f"✅ {service_name.capitalize()}: {result['action']} en {result['seconds']:.2f}s.")
+            return result
+
+        if not self.get_service_status(service_name):
+            result['action'] = 'start'
+            ok = self.start_service(service_name, wait_ready=True)
+            return finish(ok, None if ok else "el servicio no llegó a estar listo")
+
+        try:
+            changed = self.configure_service(service_name, validate=True) or force
+        except InvalidConfigError as e:
+            return finish(False, f"La configuración no es válida, se mantiene la anterior:\n{e}")
+        except FileNotFoundError as e:
+            return finish(False, str(e))
+
+        module_changed = (
+            service_name == 'apache'
+            and self.apache_manager.php_module_path != self.apache_loaded_module
+        )
+        if not changed and not module_changed:
+            result['action'] = 'noop'
+            return finish(True)
+
+        manager = self._reloadable_manager(service_name)
+        if module_changed or manager is None or not manager.supports_graceful_reload():
+            result['action'] = 'restart'
+            ok = self.restart_service(service_name, wait_ready=True)
+            return finish(ok, None if ok else "el servicio no llegó a estar listo")
+
+        ok, output = manager.test_config()
+        if not ok:
+            return finish(False, f"La configuración no es válida, se mantiene la anterior:\n{output}")
+
+        print(f"🔄 Recargando {service_name.capitalize()} de forma elegante...")
+        try:
+            manager.graceful_reload(self.processes[service_name].pid)
+        except (OSError, AttributeError) as e:
+            return finish(False, str(e))
+
+        elapsed = wait_until_ready(
+            self.get_readiness_probe(service_name),
+            timeout=self.config.get('readiness_timeout', 30),
+            is_alive=lambda: self.get_service_status(service_name),
+        )
+        return finish(elapsed is not None, None if elapsed is not None else "el servicio no respondió tras la recarga")
+
+    def _reloadable_manager(self, service_name):
+        """Gestor capaz de recargar sin reiniciar (test_config + graceful_reload), o None."""
+        if service_name == 'apache':
+            return self.apache_manager
+        if service_name.startswith('php_fpm'):
+            return self.get_fpm_manager(self._fpm_version(service_name))
+        return self.cache_services.get(service_name)
+
+    def configure_service(self, service_name, validate=False):
+        """
+        Regenera la configuración del servicio. Devuelve True si el archivo
+        cambió. Con `validate`, Apache y PHP-FPM comprueban el archivo nuevo
+        antes de sustituir al que usa el proceso en marcha.
+        """
+        if service_name == 'apache':
+            return self.apache_manager.configure(validate=validate)
+        if service_name == 'mysql':
+            return self.mysql_manager.configure()
+        if service_name.startswith('php_fpm'):
+            return self.get_fpm_manager(self._fpm_version(service_name)).configure(validate=validate)
+        if service_name in self.cache_services:
+            return self.cache_services[service_name].configure()
+        raise ValueError(f"Servicio desconocido: {service_name}")
+
+    def reset_mysql_database(self, wait_ready=True):
+        """
+        Deja MySQL recién instalado copiando la plantilla de datos. Si estaba
+        en marcha se detiene antes y se vuelve a iniciar al terminar.
+        Devuelve {'ok', 'seconds', 'error'}.
+        """
+        was_running = self.get_service_status('mysql')
+        if was_running:
+            self.stop_service('mysql')
+        start = time.perf_counter()
+        try:
+            self.mysql_manager.reset_database()
+        except Exception as e:
+            print(f"❌ No se pudo restablecer la base de datos: {e}")
+            return {'ok': False, 'seconds': time.perf_counter() - start, 'error': str(e)}
+        ok = True
+        if was_running:
+            ok = bool(self.start_service('mysql', wait_ready=wait_ready)) or not wait_ready
+        return {'ok': ok, 'seconds': time.perf_counter() - start, 'error': None}
+
+    def snapshot_database(self, database, name=None):
+        """Instantánea de `database`; MySQL tiene que estar en marcha."""
+        if not self.get_service_status('mysql'):
+            return {'ok': False, 'name': name, 'seconds': 0.0, 'errors': {'mysql': "MySQL no está en ejecución"}}
+        return self.snapshot_manager.snapshot(database, name)
+
+    def list_snapshots(self, database=None):
+        """Instantáneas completas guardadas en snapshots/ (ver SnapshotManager.list_snapshots)."""
+        return self.snapshot_manager.list_snapshots(database)
+
+    def restore_database(self, database, name, target=None):
+        """Restaura la instantánea `database/name`; MySQL tiene que estar en marcha."""
+        if not self.get_service_status('mysql'):
+            return {'ok': False, 'seconds': 0.0, 'errors': {'mysql': "MySQL no está en ejecución"}}
+        return self.snapshot_manager.restore(database, name, target)
+
+    def get_benchmark_tags(self):
+        """
+        Lo que identifica la pila medida: versión y modo de PHP, perfiles y la
+        huella de los archivos de configuración generados.
+        """
+        files = [self.apache_manager.conf_path, self.php_manager.php_path / "php.ini"]
+        files.extend((self.bin_path / "apache" / "conf" / "vhosts").glob("*.conf"))
+        if self.uses_fpm():
+            files.append(self.get_fpm_manager(self.php_manager.version).conf_path)
+        config_hash, digests = config_fingerprint(files)
+        return {
+            'php_version': self.php_manager.version,
+            'php_mode': self.config.get('php_mode', 'mod_php'),
+            'php_profile': self.config.get('php_profile', 'development'),
+            'apache_profile': self.apache_manager.get_tuning()[0],
+            'config_hash': config_hash,
+            'config_files': digests,
+        }
+
+    def run_benchmark(self, paths=None, concurrency=10, duration=10.0, requests=None, rate=None,
+                      warmup=1.0, https=False, host='localhost', label=None):
+        """
+        Mide Apache/PHP con carga local contra `paths` de www/ y guarda el
+        resultado etiquetado en benchmarks/. Apache tiene que estar en marcha.
+        """
+        if not self.get_service_status('apache'):
+            return {'ok': False, 'name': None, 'error': "Apache no está en ejecución"}
+        port = self.config['apache_https_port' if https else 'apache_http_port']
+        print(f"🚀 Midiendo {'https' if https else 'http'}://{host}:{port} con {concurrency} conexiones...")
+        result = run_benchmark(
+            '127.0.0.1', port, paths or ['/'], concurrency=concurrency, duration=duration,
+            requests=requests, rate=rate, warmup=warmup, https=https, host_header=host,
+        )
+        result['tags'] = self.get_benchmark_tags()
+        name = self.benchmark_store.save(result, label)
+        print(f"✅ {result['summary']['throughput']:.0f} peticiones/s, "
+              f"p99 {result['latency_ms'].get('p99', 0):.1f} ms. Guardado como {name}.")
+        return {'ok': True, 'name': name, 'error': None, 'result': result}
+
+    def list_benchmarks(self):
+        return self.benchmark_store.list()
+
+    def compare_benchmarks(self, a, b):
+        return self.benchmark_store.compare(a, b)
+
+    def build_assets(self, force=False):
+        """Precomprime los recursos de www/ que cambiaron desde la última pasada."""
+        if not self.asset_pipeline.brotli_available() and self.config.get('asset_brotli', True) and not self._brotli_warned:
+            self._brotli_warned = True
+            print("⚠️ brotli no está instalado; sólo se generarán variantes .gz (pip install brotli).")
+        summary = self.asset_pipeline.build(force)
+        if summary['compressed'] or summary['removed']:
+            print(f"✅ Recursos precomprimidos: {len(summary['compressed'])} nuevos, "
+                  f"{len(summary['removed'])} eliminados, {summary['saved_bytes'] // 1024} KB ahorrados "
+                  f"({summary['seconds']:.2f} s).")
+        for path, error in summary['errors'].items():
+            print(f"❌ No se pudo comprimir {path}: {error}")
+        return summary
+
+    def _build_assets_in_background(self):
+        """build_assets para un hilo propio: un fallo inesperado se muestra en vez de perderse."""
+        try:
+            return self.build_assets()
+        except Exception as e:
+            print(f"❌ Error precomprimiendo recursos: {e}")
+
+    def clean_assets(self):
+        """Borra las variantes .br/.gz generadas."""
+        return self.asset_pipeline.clean()
+
+    def generate_ssl_cert(self, domain="localhost"):
+        """Genera el certificado por defecto de Apache. Devuelve True si existe al terminar."""
+        return self.ssl_manager.generate_self_signed_cert(domain)
+
+    def get_vhosts(self):
+        """Sitios actuales (descubiertos en www/ más los de vhosts.json)."""
+        return self.vhost_manager.get_sites()
+
+    def sync_vhosts(self):
+        """
+        Regenera sólo los includes de sitios que cambiaron y, si Apache está en
+        marcha y hubo cambios, lo recarga de forma elegante.
+        """
+        summary = self.vhost_manager.sync()
+        self._sync_fpm_services()
+        if (summary['added'] or summary['updated'] or summary['removed']) and self.get_service_status('apache'):
+            summary['reload'] = self.reload_service('apache', force=True)
+        return summary
+
+    def get_dependencies(self, services=None):
+        """
+        Devuelve el grafo de dependencias declarado en `service_dependencies`
+        (p. ej. {"apache": ["mysql"]} para apps que necesitan MySQL listo),
+        restringido a los servicios indicados.
+        """
+        services = list(services) if services else list(self.processes)
+        declared = self.config.get('service_dependencies', {})
+        return {
+            name: [dep for dep in declared.get(name, []) if dep in services]
+            for name in services
+        }
+
+    def start_all(self, services=None):
+        """
+        Inicia los servicios en paralelo respetando sus dependencias: cada uno
+        espera a que las suyas acepten conexiones. Devuelve los tiempos por servicio.
+        """
+        dependencies = self.get_dependencies(services)
+        try:
+            self.preflight_ports(list(dependencies))
+        except PortInUseError as e:
+            print(e)
+            return {name: {'ok': False, 'seconds': 0.0, 'error': str(e)} for name in dependencies}
+        return run_in_dependency_order(
+            dependencies,
+            lambda name: self.start_service(name, wait_ready=True, preflight=False),
+        )
+
+    def stop_all(self, services=None):
+        """Detiene los servicios en paralelo, cada uno después de los que dependen de él."""
+        return run_in_dependency_order(
+            self.get_dependencies(services), self.stop_service, reverse=True
+        )
+
+    def restart_all(self, services=None):
+        return {'stop': self.stop_all(services), 'start': self.start_all(services)}
 
     def get_service_status(self, service_name):
         process = self.processes.get(service_name)
         return process and process.poll() is None
         
     def set_status_callback(self, callback):
-        self.service_status_callback = callback
\ No newline at end of file
+        self.service_status_callback = callback
+
+    def set_crash_callback(self, callback):
+        """Recibe `callback(service_name, entry)` cuando un servicio se cae (ver get_crash_history)."""
+        self.crash_callback = callback
\ No newline at end of file
@@ -1,17 +1,59 @@
+import datetime
+import hashlib
+import json
 import os
+import ssl
 import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from .config_renderer import atomic_write
+
+
+def cert_fingerprint(cert_path):
+    """
+    Huella SHA-256 del certificado (la de `openssl x509 -fingerprint -sha256`),
+    o None si no existe. Va en la configuración generada para que una
+    renovación cambie el archivo y Apache se recargue.
+    """
+    try:
+        data = Path(cert_path).read_text(encoding="ascii")
+    except (OSError, UnicodeDecodeError):
+        return None
+    try:
+        der = ssl.PEM_cert_to_DER_cert(data)
+    except ValueError:
+        der = data.encode("ascii")
+    return hashlib.sha256(der).hexdigest()
+
 
 class SSLManager:
-    def __init__(self, base_path):
+    def __init__(self, base_path, key_type="rsa", renew_days=30):
         self.base_path = Path(base_path)
         self.ssl_path = self.base_path / "ssl"
         self.cert_path = self.ssl_path / "server.crt"
         self.key_path = self.ssl_path / "server.key"
+        self.hosts_path = self.ssl_path / "hosts"
+        self.index_path = self.hosts_path / "index.json"
+        self.key_type = key_type
+        self.renew_days = renew_days
+        self._ca = None
+        self._index = None
+        self._lock = threading.Lock()
 
     def certs_exist(self):
         return self.cert_path.exists() and self.key_path.exists()
 
+    def get_ca(self):
+        """Devuelve la CA local, o None si `cryptography` no está instalado."""
+        if self._ca is None:
+            try:
+                from .local_ca import LocalCA
+            except ImportError:
+                return None
+            self._ca = LocalCA(self.ssl_path / "ca")
+        return self._ca
+
     def find_openssl_config(self):
         """Busca el archivo de configuración de OpenSSL en ubicaciones comunes en Windows."""
         # La ubicación más común es con Git para Windows
@@ -21,17 +63,62 @@ class SSLManager:
             if config_path.exists():
                 print(f"✅ Encontrado openssl.cnf en: {config_path}")
                 return config_path
-        
+
         # Si no, devuelve None
         return None
 
+    def default_needs_renewal(self):
+        """
+        True si falta server.crt o caduca en menos de `renew_days` días. Sin
+        la CA local (`cryptography`) no se puede leer la fecha y sólo se
+        comprueba que exista.
+        """
+        if not self.certs_exist():
+            return True
+        if self.get_ca() is None:
+            return False
+        from .local_ca import cert_not_after
+        try:
+            not_after = cert_not_after(self.cert_path.read_bytes())
+        except (OSError, ValueError):
+            return True
+        renew_at = not_after - datetime.timedelta(days=self.renew_days)
+        return datetime.datetime.now(datetime.timezone.utc) >= renew_at
+
     def generate_self_signed_cert(self, domain="localhost"):
-        if self.certs_exist():
+        """
+        Genera (o renueva, si está por caducar) el certificado por defecto de
+        Apache. Se emite en proceso con la CA local; sólo si `cryptography`
+        no está disponible se recurre al binario openssl con un certificado
+        autofirmado.
+        """
+        if not self.default_needs_renewal():
             print(f"✅ Los certificados SSL ya existen en {self.ssl_path}")
             return True
-            
+        if self.certs_exist():
+            print("🔄 El certificado SSL por defecto caduca pronto; se renueva.")
+
         self.ssl_path.mkdir(exist_ok=True)
-        
+
+        ca = self.get_ca()
+        if ca is None:
+            return self._generate_with_openssl(domain)
+
+        names = [domain]
+        if domain == "localhost":
+            names += ["127.0.0.1", "::1"]
+        try:
+            print("🔑 Generando clave y certificado SSL...")
+            cert_pem, key_pem, _ = ca.issue(names, key_type=self.key_type)
+        except Exception as e:
+            print(f"❌ Error al generar el certificado SSL: {e}")
+            return False
+        atomic_write(self.key_path, key_pem)
+        atomic_write(self.cert_path, cert_pem)
+        print("✅ Certificado y clave SSL generados correctamente.")
+        return True
+
+    def _generate_with_openssl(self, domain):
         openssl_command = [
             "openssl", "req", "-x509", "-newkey", "rsa:2048",
             "-keyout", str(self.key_path),
@@ -40,20 +127,20 @@ class SSLManager:
             "-nodes",
             "-subj", f"/C=CO/ST=Bogota/L=Bogota/O=PyLaragon/OU=Development/CN={domain}"
         ]
-        
+
         try:
             print("🔑 Generando clave y certificado SSL...")
-            
+
             # --- SOLUCIÓN PARA EL ERROR DE OPENSSL ---
             # Crear un entorno para el subproceso y añadir la ruta de config si la encontramos
             env = os.environ.copy()
             config_file = self.find_openssl_config()
             if config_file:
                 env["OPENSSL_CONF"] = str(config_file)
-            
+
             # Ejecutar el comando con el entorno modificado
             result = subprocess.run(openssl_command, check=True, capture_output=True, text=True, env=env)
-            
+
             print("✅ Certificado y clave SSL generados correctamente.")
             return True
         except (subprocess.CalledProcessError, FileNotFoundError) as e:
@@ -62,4 +149,83 @@ class SSLManager:
                  print("   Asegúrate de que OpenSSL esté instalado y en el PATH del sistema.")
             else:
                  print(f"   Error de OpenSSL: {e.stderr}")
-            return False
\ No newline at end of file
+            return False
+
+    # --- Certificados por host virtual ---
+
+    def host_cert_paths(self, hostname):
+        return self.hosts_path / f"{hostname}.crt", self.hosts_path / f"{hostname}.key"
+
+    def _load_index(self):
+        if self._index is None:
+            try:
+                with open(self.index_path, 'r', encoding='utf-8') as f:
+                    self._index = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                self._index = {}
+        return self._index
+
+    def needs_renewal(self, hostname, names):
+        """True si no hay certificado, cambió la lista de nombres o caduca pronto."""
+        entry = self._load_index().get(hostname)
+        cert_path, key_path = self.host_cert_paths(hostname)
+        if not entry or not cert_path.exists() or not key_path.exists():
+            return True
+        if entry['names'] != names or entry['key_type'] != self.key_type:
+            return True
+        not_after = datetime.datetime.fromisoformat(entry['not_after'])
+        renew_at = not_after - datetime.timedelta(days=self.renew_days)
+        return datetime.datetime.now(datetime.timezone.utc) >= renew_at
+
+    def _issue_host_cert(self, hostname, names):
+        cert_pem, key_pem, not_after = self.get_ca().issue(names, key_type=self.key_type)
+        cert_path, key_path = self.host_cert_paths(hostname)
+        atomic_write(key_path, key_pem)
+        atomic_write(cert_path, cert_pem)
+        with self._lock:
+            self._load_index()[hostname] = {
+                'names': names,
+                'key_type': self.key_type,
+                'not_after': not_after.isoformat(),
+            }
+        return cert_path, key_path
+
+    def ensure_certs(self, hosts):
+        """
+        Garantiza un certificado vigente para cada host. `hosts` es
+        {hostname: [alias, ...]}. Los que faltan o están por caducar se emiten
+        en paralelo en un pool de hilos. Devuelve {hostname: (cert, key)}, o
+        None si no hay CA disponible.
+        """
+        ca = self.get_ca()
+        if ca is None:
+            return None
+        ca.ensure()
+        # El certificado por defecto (server.crt) también caduca.
+        if self.certs_exist() and self.default_needs_renewal():
+            self.generate_self_signed_cert()
+
+        pending = {}
+        for hostname, aliases in hosts.items():
+            names = [hostname] + [a for a in aliases if a != hostname]
+            if self.needs_renewal(hostname, names):
+                pending[hostname] = names
+
+        if pending:
+            print(f"🔑 Emitiendo {len(pending)} certificado(s) SSL para hosts virtuales...")
+            self.hosts_path.mkdir(parents=True, exist_ok=True)
+            with ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) + 4)) as pool:
+                futures = {h: pool.submit(self._issue_host_cert, h, names) for h, names in pending.items()}
+                for hostname, future in futures.items():
+                    try:
+                        future.result()
+                    except Exception as e:
+                        print(f"❌ No se pudo emitir el certificado de {hostname}: {e}")
+            with self._lock:
+                atomic_write(self.index_path, json.dumps(self._load_index(), indent=2))
+
+        return {
+            hostname: self.host_cert_paths(hostname)
+            for hostname in hosts
+            if all(p.exists() for p in self.host_cert_paths(hostname))
+        }
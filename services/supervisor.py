@@ -0,0 +1,421 @@
+import argparse
+import json
+import os
+import queue
+import secrets
+import select
+import signal
+import socket
+import socketserver
+import threading
+import time
+from pathlib import Path
+
+import psutil
+
+from .config_renderer import atomic_write
+from .service_manager import ServiceManager
+from .supervisor_client import is_running, run_path
+
+# Códigos de error de JSON-RPC 2.0
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+SERVER_ERROR = -32000
+
+# Eventos pendientes por suscriptor; si un cliente no lee, se descartan los
+# más nuevos en lugar de frenar al supervisor.
+SUBSCRIBER_QUEUE = 1000
+
+USE_UNIX_SOCKET = hasattr(socket, 'AF_UNIX') and os.name != 'nt'
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Una conexión: peticiones JSON-RPC, una por línea, respondidas en orden."""
+
+    def handle(self):
+        supervisor = self.server.supervisor
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+            except json.JSONDecodeError:
+                self._reply(None, error=(PARSE_ERROR, "JSON no válido"))
+                continue
+            if not isinstance(request, dict) or 'method' not in request:
+                self._reply(None, error=(INVALID_REQUEST, "Petición no válida"))
+                continue
+            request_id = request.get('id')
+            if supervisor.token and request.get('token') != supervisor.token:
+                self._reply(request_id, error=(INVALID_REQUEST, "Token incorrecto"))
+                return
+            if request['method'] == 'subscribe':
+                self._reply(request_id, result={'subscribed': True})
+                self._stream_events(supervisor, (request.get('params') or {}).get('topics'))
+                return
+            try:
+                result = supervisor.dispatch(request['method'], request.get('params') or {})
+            except LookupError as e:
+                self._reply(request_id, error=(METHOD_NOT_FOUND, str(e)))
+            except TypeError as e:
+                self._reply(request_id, error=(INVALID_PARAMS, str(e)))
+            except Exception as e:
+                self._reply(request_id, error=(SERVER_ERROR, str(e)))
+            else:
+                self._reply(request_id, result=result)
+
+    def _reply(self, request_id, result=None, error=None):
+        message = {'jsonrpc': '2.0', 'id': request_id}
+        if error:
+            message['error'] = {'code': error[0], 'message': error[1]}
+        else:
+            message['result'] = result
+        self._write(message)
+
+    def _write(self, message):
+        self.wfile.write(json.dumps(message, default=str).encode('utf-8') + b"\n")
+        self.wfile.flush()
+
+    def _stream_events(self, supervisor, topics):
+        events = supervisor.add_subscriber(topics)
+        try:
+            while not supervisor.shutting_down.is_set():
+                try:
+                    event = events.get(timeout=1.0)
+                except queue.Empty:
+                    # Sin eventos: se comprueba si el cliente cerró la conexión.
+                    readable, _, _ = select.select([self.connection], [], [], 0)
+                    if readable and not self.connection.recv(1, socket.MSG_PEEK):
+                        return
+                    continue
+                self._write({'jsonrpc': '2.0', 'method': 'event', 'params': event})
+        except OSError:
+            pass
+        finally:
+            supervisor.remove_subscriber(events)
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class _TCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class Supervisor:
+    """
+    Proceso de larga duración que es dueño de los servicios.
+
+    La GUI y la CLI son clientes: hablan con él por un socket Unix en
+    run/pylaragon.sock (en Windows, TCP en 127.0.0.1 con un token guardado en
+    run/supervisor.json) con JSON-RPC 2.0, una petición por línea. Cada
+    conexión se atiende en su propio hilo, así varias herramientas pueden
+    consultar el estado a la vez; las operaciones que cambian procesos se
+    serializan.
+
+    Los PID de los servicios se guardan en run/state.json. Si el supervisor
+    anterior murió sin detenerlos, al arrancar se terminan esos huérfanos en
+    lugar de lanzar una segunda copia que choque por los puertos.
+    """
+
+    def __init__(self, base_path=None):
+        self.base_path = Path(base_path) if base_path else Path.cwd()
+        self.run_path = run_path(self.base_path)
+        self.state_path = self.run_path / "state.json"
+        self.info_path = self.run_path / "supervisor.json"
+        self.socket_path = self.run_path / "pylaragon.sock"
+        self.token = None
+        self.server = None
+        self.started = time.time()
+        self.shutting_down = threading.Event()
+        self._lock = threading.RLock()
+        self._subscribers = []
+        self._subscribers_lock = threading.Lock()
+        self._started_at = {}
+
+        self.manager = ServiceManager(self.base_path)
+        self.manager.set_status_callback(self._on_status)
+        self.manager.set_crash_callback(self._on_crash)
+        self.manager.subscribe_logs(self._on_logs)
+
+        self.methods = {
+            'ping': self.ping,
+            'status': self.status,
+            'config': lambda: self.manager.config,
+            'php_versions': self.manager.find_php_versions,
+            'runtimes': self.manager.get_runtimes,
+            'start': self.start,
+            'stop': self.stop,
+            'restart': self.restart,
+            'reload': self.reload,
+            'switch_php': self.switch_php,
+            'ssl_generate': self.manager.generate_ssl_cert,
+            'vhosts': self.manager.get_vhosts,
+            'sync_vhosts': self._locked(self.manager.sync_vhosts),
+            'logs': self.logs,
+            'crashes': self.manager.get_crash_history,
+            'metrics': self.manager.get_metrics,
+            'export_metrics': self.manager.export_metrics,
+            'watch_stats': self.manager.get_watch_stats,
+            'dashboard': self.manager.get_dashboard,
+            'build_assets': self.manager.build_assets,
+            'clean_assets': self.manager.clean_assets,
+            'benchmark_tags': self.manager.get_benchmark_tags,
+            'benchmark': self.manager.run_benchmark,
+            'benchmarks': self.manager.list_benchmarks,
+            'benchmark_compare': self.manager.compare_benchmarks,
+            'db_snapshots': self.manager.list_snapshots,
+            'db_snapshot': self.manager.snapshot_database,
+            # Restaurar y restablecer paran o recrean bases de datos (y MySQL):
+            # no pueden cruzarse con un start/stop/reload.
+            'db_restore': self._locked(self.manager.restore_database),
+            'db_reset': self._locked(self.manager.reset_mysql_database),
+            'shutdown': self.shutdown,
+        }
+
+    # --- Estado persistente ---
+
+    def _locked(self, function):
+        def wrapper(*args, **kwargs):
+            with self._lock:
+                return function(*args, **kwargs)
+        return wrapper
+
+    def _write_state(self):
+        services = {}
+        for name, process in list(self.manager.processes.items()):
+            if process and process.poll() is None:
+                try:
+                    create_time = psutil.Process(process.pid).create_time()
+                except psutil.NoSuchProcess:
+                    continue
+                services[name] = {'pid': process.pid, 'create_time': create_time}
+        state = {'pid': os.getpid(), 'started': self.started, 'services': services}
+        atomic_write(self.state_path, json.dumps(state, indent=2))
+
+    def reap_orphans(self):
+        """Termina los servicios que dejó vivos un supervisor anterior que murió."""
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return []
+        reaped = []
+        for name, entry in state.get('services', {}).items():
+            try:
+                process = psutil.Process(entry['pid'])
+                # Un PID reutilizado por otro programa tiene otra hora de creación.
+                if abs(process.create_time() - entry['create_time']) > 1:
+                    continue
+                print(f"⚠️ {name} (PID {entry['pid']}) quedó huérfano de un supervisor anterior. Deteniéndolo...")
+                children = process.children(recursive=True)
+                for p in children + [process]:
+                    p.terminate()
+                _, alive = psutil.wait_procs(children + [process], timeout=5)
+                for p in alive:
+                    p.kill()
+                reaped.append(name)
+            except psutil.NoSuchProcess:
+                continue
+        return reaped
+
+    # --- Eventos ---
+
+    def add_subscriber(self, topics=None):
+        events = queue.Queue(maxsize=SUBSCRIBER_QUEUE)
+        with self._subscribers_lock:
+            self._subscribers.append((events, set(topics) if topics else None))
+        return events
+
+    def remove_subscriber(self, events):
+        with self._subscribers_lock:
+            self._subscribers = [s for s in self._subscribers if s[0] is not events]
+
+    def publish(self, event):
+        with self._subscribers_lock:
+            subscribers = list(self._subscribers)
+        for events, topics in subscribers:
+            if topics is None or event['type'] in topics:
+                try:
+                    events.put_nowait(event)
+                except queue.Full:
+                    pass
+
+    def _on_status(self, service_name, is_running):
+        if is_running:
+            self._started_at[service_name] = time.time()
+        else:
+            self._started_at.pop(service_name, None)
+        self._write_state()
+        self.publish({'type': 'status', 'service': service_name, 'running': bool(is_running)})
+
+    def _on_crash(self, service_name, entry):
+        self.publish({'type': 'crash', 'service': service_name, **entry})
+
+    def _on_logs(self, service_name, entries):
+        self.publish({'type': 'log', 'service': service_name, 'entries': entries})
+
+    # --- Métodos RPC ---
+
+    def dispatch(self, method, params):
+        function = self.methods.get(method)
+        if function is None:
+            raise LookupError(f"Método desconocido: {method}")
+        return function(**params)
+
+    def ping(self):
+        return {'pid': os.getpid(), 'uptime': time.time() - self.started}
+
+    def status(self):
+        services = {}
+        now = time.time()
+        for name, process in list(self.manager.processes.items()):
+            running = bool(self.manager.get_service_status(name))
+            started = self._started_at.get(name)
+            services[name] = {
+                'running': running,
+                'pid': process.pid if running else None,
+                'uptime': now - started if running and started else None,
+                'ready_seconds': self.manager.get_time_to_ready(name),
+                'restart': self.manager.get_restart_state(name),
+            }
+        return {
+            'pid': os.getpid(),
+            'uptime': now - self.started,
+            'php_version': self.manager.php_manager.version,
+            'ports': self.manager.get_effective_ports(),
+            'port_overrides': self.manager.port_overrides,
+            'watch': {k: v for k, v in self.manager.get_watch_stats().items() if k != 'recent'},
+            'services': services,
+        }
+
+    def start(self, services=None):
+        with self._lock:
+            return self.manager.start_all(services)
+
+    def stop(self, services=None):
+        with self._lock:
+            result = self.manager.stop_all(services)
+            self._write_state()
+            return result
+
+    def restart(self, services=None):
+        with self._lock:
+            return self.manager.restart_all(services)
+
+    def reload(self, services=None, force=False):
+        """
+        Relee services.json y aplica los cambios a los servicios en marcha
+        (cambio de versión de PHP incluido). Devuelve un resultado por servicio.
+        """
+        with self._lock:
+            changed = self.manager.reload_config()
+            if changed is None:
+                raise ValueError("services.json no es JSON válido")
+            return self.manager.apply_config(changed, services or list(self.manager.processes), force)
+
+    def switch_php(self, version):
+        if version not in self.manager.find_php_versions():
+            raise ValueError(f"PHP {version} no está instalado")
+        with self._lock:
+            return self.manager.switch_php_version(version)
+
+    def logs(self, service, lines=100, since=None):
+        return self.manager.get_logs(service, lines=lines, since=since)
+
+    def shutdown(self, stop_services=True):
+        """Detiene los servicios (por defecto) y cierra el supervisor."""
+        threading.Thread(target=self._shutdown, args=(stop_services,), daemon=True).start()
+        return {'stopping': True}
+
+    def _shutdown(self, stop_services=True):
+        if self.shutting_down.is_set():
+            return
+        self.shutting_down.set()
+        if stop_services:
+            with self._lock:
+                self.manager.stop_all()
+        if self.server:
+            self.server.shutdown()
+
+    # --- Servidor ---
+
+    def bind(self):
+        """Abre el socket de control y publica su dirección en run/supervisor.json."""
+        self.run_path.mkdir(parents=True, exist_ok=True)
+        if is_running(self.base_path):
+            raise RuntimeError("Ya hay un supervisor de PyLaragon en marcha.")
+
+        # sun_path admite ~104 bytes: con rutas más largas se usa TCP.
+        if USE_UNIX_SOCKET and len(os.fsencode(str(self.socket_path))) < 100:
+            if self.socket_path.exists():
+                self.socket_path.unlink()  # restos de un supervisor que murió
+            old_umask = os.umask(0o077)
+            try:
+                self.server = _UnixServer(str(self.socket_path), _RequestHandler)
+            finally:
+                os.umask(old_umask)
+            info = {'family': 'unix', 'path': str(self.socket_path)}
+        else:
+            self.token = secrets.token_hex(16)
+            self.server = _TCPServer(('127.0.0.1', 0), _RequestHandler)
+            info = {'family': 'tcp', 'host': '127.0.0.1', 'port': self.server.server_address[1], 'token': self.token}
+        self.server.supervisor = self
+        info['pid'] = os.getpid()
+        atomic_write(self.info_path, json.dumps(info, indent=2))
+        return info
+
+    def serve_forever(self, start_services=None):
+        """
+        Atiende peticiones hasta `shutdown` o SIGTERM/Ctrl+C. Si se indica
+        `start_services` ([] para todos) los arranca antes de atender.
+        """
+        # bind() falla si hay otro supervisor vivo; sólo si no lo hay los PID
+        # de state.json son huérfanos.
+        self.bind()
+        self.reap_orphans()
+        self._write_state()
+        print(f"🚀 Supervisor de PyLaragon en marcha (PID {os.getpid()}).")
+        if self.manager.config.get('watch_files', True):
+            self.manager.start_watching(lock=self._lock)
+
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=self._shutdown, daemon=True).start())
+
+        if start_services is not None:
+            threading.Thread(target=self.start, args=(start_services or None,), daemon=True).start()
+        try:
+            self.server.serve_forever(poll_interval=0.5)
+        except KeyboardInterrupt:
+            self.shutting_down.set()
+            with self._lock:
+                self.manager.stop_all()
+        finally:
+            self.manager.stop_watching()
+            self.server.server_close()
+            for path in (self.info_path, self.socket_path):
+                if path.exists():
+                    path.unlink()
+            # Con shutdown(stop_services=False) los servicios siguen vivos hasta
+            # que arranque otro supervisor: no puede recuperar sus tuberías de
+            # log ni vigilarlos, así que reap_orphans los detiene usando
+            # state.json (y los inicia de nuevo si se le pide).
+            self._write_state()
+            print("🛑 Supervisor detenido.")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Supervisor de servicios de PyLaragon")
+    parser.add_argument("--base", default=".", help="directorio de PyLaragon")
+    parser.add_argument("--start", nargs="*", metavar="SERVICIO",
+                        help="servicios a iniciar al arrancar (sin nombres, todos)")
+    args = parser.parse_args(argv)
+    Supervisor(Path(args.base).resolve()).serve_forever(start_services=args.start)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,332 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Este módulo sólo usa la biblioteca estándar: la GUI y la CLI lo importan
+# para hablar con el supervisor sin cargar psutil ni los gestores.
+
+
+# Argumento con el que el ejecutable de PyInstaller arranca como supervisor
+# (main.py lo atiende antes de abrir la GUI).
+SUPERVISOR_FLAG = "--supervisor"
+
+
+def run_path(base_path):
+    return Path(base_path) / "run"
+
+
+def read_address(base_path):
+    """
+    Dirección del supervisor según run/supervisor.json:
+    ('unix', ruta, None) o ('tcp', (host, puerto), token). None si no hay.
+    """
+    try:
+        with open(run_path(base_path) / "supervisor.json", 'r', encoding='utf-8') as f:
+            info = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    if info.get('family') == 'unix':
+        return 'unix', info['path'], None
+    return 'tcp', (info['host'], info['port']), info.get('token')
+
+
+class SupervisorError(Exception):
+    """El supervisor respondió con un error JSON-RPC."""
+
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+
+
+class SupervisorClient:
+    """
+    Cliente JSON-RPC 2.0 del supervisor: una petición por línea sobre un
+    socket Unix (o TCP local con token en Windows). Cada hilo puede usar su
+    propio cliente; uno compartido serializa las llamadas.
+    """
+
+    def __init__(self, base_path, timeout=None):
+        self.base_path = Path(base_path)
+        self.timeout = timeout
+        self._sock = None
+        self._reader = None
+        self._token = None
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def connect(self, timeout=1.0):
+        address = read_address(self.base_path)
+        if address is None:
+            raise ConnectionError("El supervisor no está en marcha.")
+        family, target, self._token = address
+        if family == 'unix':
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        try:
+            sock.connect(target)
+        except OSError:
+            sock.close()
+            raise ConnectionError("El supervisor no está en marcha.")
+        sock.settimeout(self.timeout)
+        self._sock = sock
+        self._reader = sock.makefile('rb')
+        return self
+
+    def close(self):
+        if self._sock is not None:
+            try:
+                self._reader.close()
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
+
+    def __enter__(self):
+        if self._sock is None:
+            self.connect()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _send(self, method, params):
+        self._next_id += 1
+        request = {'jsonrpc': '2.0', 'id': self._next_id, 'method': method, 'params': params}
+        if self._token:
+            request['token'] = self._token
+        self._sock.sendall(json.dumps(request).encode('utf-8') + b"\n")
+        return self._next_id
+
+    def _read_message(self):
+        line = self._reader.readline()
+        if not line:
+            raise ConnectionError("El supervisor cerró la conexión.")
+        return json.loads(line)
+
+    def call(self, method, **params):
+        """Llama a `method` y devuelve su resultado, o lanza SupervisorError."""
+        with self._lock:
+            if self._sock is None:
+                self.connect()
+            request_id = self._send(method, params)
+            while True:
+                message = self._read_message()
+                if message.get('id') == request_id:
+                    break
+        if 'error' in message:
+            raise SupervisorError(message['error']['code'], message['error']['message'])
+        return message['result']
+
+    def events(self, topics=None):
+        """
+        Suscribe esta conexión a los eventos y los devuelve según llegan
+        (generador bloqueante). La conexión queda dedicada a la suscripción.
+        """
+        self.call('subscribe', topics=topics)
+        self._sock.settimeout(None)
+        while True:
+            message = self._read_message()
+            if message.get('method') == 'event':
+                yield message['params']
+
+
+def is_running(base_path):
+    try:
+        with SupervisorClient(base_path).connect(timeout=0.5) as client:
+            client.call('ping')
+        return True
+    except (ConnectionError, OSError, SupervisorError):
+        return False
+
+
+def spawn_daemon(base_path, timeout=10.0):
+    """
+    Lanza el supervisor en segundo plano, desligado de la terminal, y espera
+    a que responda. Devuelve True si quedó disponible.
+    """
+    base_path = Path(base_path).resolve()
+    if is_running(base_path):
+        return True
+    logs_path = base_path / "logs"
+    logs_path.mkdir(exist_ok=True)
+    if getattr(sys, 'frozen', False):
+        # En el ejecutable de PyInstaller sys.executable es PyLaragon.exe, que
+        # ignora -m: sin el argumento abriría otra GUI que volvería a lanzar
+        # otro supervisor, y así sucesivamente.
+        cmd = [sys.executable, SUPERVISOR_FLAG, "--base", str(base_path)]
+    else:
+        cmd = [sys.executable, "-m", "services.supervisor", "--base", str(base_path)]
+    kwargs = {}
+    if os.name == 'nt':
+        kwargs['creationflags'] = (
+            subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP | subprocess.CREATE_NO_WINDOW
+        )
+    else:
+        kwargs['start_new_session'] = True
+    package_root = Path(__file__).resolve().parent.parent
+    env = os.environ.copy()
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [str(package_root), env.get('PYTHONPATH')]))
+    with open(logs_path / "supervisor.log", 'ab') as log:
+        subprocess.Popen(
+            cmd, cwd=str(base_path), env=env,
+            stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT, **kwargs,
+        )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if is_running(base_path):
+            return True
+        time.sleep(0.1)
+    return False
+
+
+class RemoteServiceManager:
+    """
+    Fachada con la misma interfaz que usa la GUI de ServiceManager, pero
+    cada operación se delega al supervisor. Varias ventanas y la CLI ven así
+    los mismos procesos, y cerrar la GUI no los deja huérfanos.
+    """
+
+    remote = True
+
+    def __init__(self, base_path):
+        self.base_path = Path(base_path)
+        self.service_status_callback = None
+        self._subscriber = None
+        self.config = self._call('config')
+
+    @classmethod
+    def connect(cls, base_path, autostart=True):
+        """Conecta con el supervisor, lanzándolo si hace falta. None si no hay forma."""
+        if not is_running(base_path) and not (autostart and spawn_daemon(base_path)):
+            return None
+        return cls(base_path)
+
+    def _call(self, method, **params):
+        # Cada llamada abre su conexión: la GUI llama desde varios hilos y una
+        # operación larga (arrancar MySQL) no debe bloquear una consulta de estado.
+        with SupervisorClient(self.base_path).connect() as client:
+            return client.call(method, **params)
+
+    @property
+    def processes(self):
+        return {name: info['pid'] for name, info in self._call('status')['services'].items()}
+
+    def get_service_status(self, service_name):
+        service = self._call('status')['services'].get(service_name)
+        return bool(service and service['running'])
+
+    def get_status(self):
+        return self._call('status')
+
+    def find_php_versions(self):
+        return self._call('php_versions')
+
+    def get_runtimes(self, refresh=False):
+        return self._call('runtimes', refresh=refresh)
+
+    def switch_php_version(self, version):
+        result = self._call('switch_php', version=version)
+        self.config['php_version'] = version
+        return result
+
+    def start_service(self, service_name, wait_ready=False, timeout=None):
+        result = self._call('start', services=[service_name])
+        return result.get(service_name, {}).get('ok', False) if wait_ready else None
+
+    def stop_service(self, service_name):
+        self._call('stop', services=[service_name])
+        return True
+
+    def restart_service(self, service_name, wait_ready=False):
+        result = self._call('restart', services=[service_name])
+        return result['start'].get(service_name, {}).get('ok', False) if wait_ready else None
+
+    def reload_service(self, service_name, force=False):
+        """Resultado de reload_service para `service_name`, o None si no estaba en marcha."""
+        # La lista puede traer antes el resultado de un cambio de versión de PHP
+        # pendiente (que también es de 'php_fpm'): vale el último del servicio.
+        results = self._call('reload', services=[service_name], force=force)
+        return next((r for r in reversed(results) if r.get('service') == service_name), None)
+
+    def start_all(self, services=None):
+        return self._call('start', services=services)
+
+    def stop_all(self, services=None):
+        return self._call('stop', services=services)
+
+    def restart_all(self, services=None):
+        return self._call('restart', services=services)
+
+    def generate_ssl_cert(self, domain="localhost"):
+        return self._call('ssl_generate', domain=domain)
+
+    def get_vhosts(self):
+        return self._call('vhosts')
+
+    def sync_vhosts(self):
+        return self._call('sync_vhosts')
+
+    def get_logs(self, service_name, lines=100, since=None):
+        return self._call('logs', service=service_name, lines=lines, since=since)
+
+    def get_metrics(self):
+        return self._call('metrics')
+
+    def export_metrics(self, fmt='json'):
+        return self._call('export_metrics', fmt=fmt)
+
+    def list_snapshots(self, database=None):
+        return self._call('db_snapshots', database=database)
+
+    def snapshot_database(self, database, name=None):
+        return self._call('db_snapshot', database=database, name=name)
+
+    def restore_database(self, database, name, target=None):
+        return self._call('db_restore', database=database, name=name, target=target)
+
+    def reset_mysql_database(self, wait_ready=True):
+        return self._call('db_reset', wait_ready=wait_ready)
+
+    def build_assets(self, force=False):
+        return self._call('build_assets', force=force)
+
+    def run_benchmark(self, paths=None, **options):
+        return self._call('benchmark', paths=paths, **options)
+
+    def list_benchmarks(self):
+        return self._call('benchmarks')
+
+    def compare_benchmarks(self, a, b):
+        return self._call('benchmark_compare', a=a, b=b)
+
+    def get_dashboard(self):
+        return self._call('dashboard')
+
+    def get_crash_history(self, service_name):
+        return self._call('crashes', service_name=service_name)
+
+    def set_status_callback(self, callback):
+        """Recibe `callback(servicio, en_marcha)` desde un hilo de suscripción."""
+        self.service_status_callback = callback
+        if self._subscriber is None:
+            self._subscriber = threading.Thread(target=self._listen, name="supervisor-events", daemon=True)
+            self._subscriber.start()
+
+    def _listen(self):
+        try:
+            with SupervisorClient(self.base_path).connect() as client:
+                for event in client.events(topics=['status']):
+                    if self.service_status_callback:
+                        self.service_status_callback(event['service'], event['running'])
+        except (ConnectionError, OSError) as e:
+            print(f"⚠️ Se perdió la conexión con el supervisor: {e}")
+        finally:
+            self._subscriber = None
+
@@ -0,0 +1,244 @@
+import json
+import math
+import os
+import threading
+import time
+from array import array
+
+import psutil
+
+METRICS = ('cpu_percent', 'rss', 'uss', 'threads', 'fds', 'listen', 'established')
+
+METRIC_HELP = {
+    'cpu_percent': "Uso de CPU del árbol de procesos (100 = un núcleo)",
+    'rss': "Memoria residente del árbol de procesos en bytes",
+    'uss': "Memoria exclusiva (USS) del árbol de procesos en bytes",
+    'threads': "Número de hilos del árbol de procesos",
+    'fds': "Descriptores de archivo (handles en Windows) abiertos",
+    'listen': "Sockets en escucha del árbol de procesos",
+    'established': "Conexiones establecidas en los puertos del servicio",
+}
+
+
+class RingBuffer:
+    """Búfer circular de tamaño fijo sobre un array('d'); los huecos son NaN."""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._data = array('d', [math.nan]) * capacity
+        self._next = 0
+        self._count = 0
+
+    def append(self, value):
+        self._data[self._next] = value
+        self._next = (self._next + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+
+    def values(self):
+        """Valores en orden cronológico."""
+        if self._count < self.capacity:
+            return self._data[:self._count].tolist()
+        return (self._data[self._next:] + self._data[:self._next]).tolist()
+
+    def last(self):
+        if not self._count:
+            return None
+        return self._data[self._next - 1]
+
+    def __len__(self):
+        return self._count
+
+
+class ResourceSampler:
+    """
+    Muestrea en segundo plano CPU, memoria, hilos, descriptores y sockets de
+    cada servicio gestionado (proceso principal más sus hijos).
+
+    Los objetos psutil.Process se reutilizan entre muestras: además de ahorrar
+    llamadas, cpu_percent() necesita el mismo objeto para calcular el delta.
+    Las conexiones se obtienen con un único net_connections() por muestra.
+    """
+
+    def __init__(self, get_pids, interval=2.0, capacity=300, include_uss=False):
+        self.get_pids = get_pids
+        self.interval = interval
+        self.capacity = capacity
+        self.include_uss = include_uss
+
+        self._handles = {}
+        self._series = {}
+        self._ports = {}
+        self._active = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="resource-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                self.sample_once()
+            except Exception as e:
+                print(f"⚠️ Error al muestrear recursos: {e}")
+            self._stop.wait(max(0.0, self.interval - (time.monotonic() - started)))
+
+    # --- Muestreo ---
+
+    def _handle(self, pid):
+        proc = self._handles.get(pid)
+        if proc is None:
+            proc = psutil.Process(pid)
+            proc.cpu_percent(None)  # la primera lectura sólo fija la referencia
+            self._handles[pid] = proc
+        return proc
+
+    def _process_tree(self, pid):
+        root = self._handle(pid)
+        tree = [root]
+        for child in root.children(recursive=True):
+            try:
+                tree.append(self._handle(child.pid))
+            except psutil.NoSuchProcess:
+                pass
+        return tree
+
+    def _connections(self, pids):
+        """Un solo escaneo del sistema; si no hay permisos, se consulta proceso a proceso."""
+        try:
+            return [c for c in psutil.net_connections(kind='inet') if c.pid in pids]
+        except psutil.AccessDenied:
+            conns = []
+            for pid in pids:
+                proc = self._handles.get(pid)
+                if proc is None:
+                    continue
+                try:
+                    getter = getattr(proc, 'net_connections', None) or proc.connections
+                    conns.extend(getter(kind='inet'))
+                except (psutil.NoSuchProcess, psutil.AccessDenied):
+                    pass
+            return conns
+
+    def sample_once(self):
+        now = time.time()
+        trees = {}
+        for service_name, pid in self.get_pids().items():
+            try:
+                trees[service_name] = self._process_tree(pid)
+            except psutil.NoSuchProcess:
+                continue
+
+        alive = {proc.pid for tree in trees.values() for proc in tree}
+        for pid in list(self._handles):
+            if pid not in alive:
+                del self._handles[pid]
+
+        conns = self._connections(alive)
+        samples = {}
+        for service_name, tree in trees.items():
+            values = dict.fromkeys(METRICS, 0.0)
+            for proc in tree:
+                try:
+                    with proc.oneshot():
+                        values['cpu_percent'] += proc.cpu_percent(None)
+                        values['rss'] += proc.memory_info().rss
+                        if self.include_uss:
+                            values['uss'] += proc.memory_full_info().uss
+                        values['threads'] += proc.num_threads()
+                        values['fds'] += proc.num_handles() if os.name == 'nt' else proc.num_fds()
+                except (psutil.NoSuchProcess, psutil.AccessDenied):
+                    continue
+            if not self.include_uss:
+                values['uss'] = math.nan
+
+            tree_pids = {proc.pid for proc in tree}
+            own = [c for c in conns if c.pid in tree_pids]
+            listen_ports = {c.laddr.port for c in own if c.status == psutil.CONN_LISTEN}
+            per_port = {port: {'listen': 0, 'established': 0} for port in listen_ports}
+            for c in own:
+                if c.status == psutil.CONN_LISTEN:
+                    per_port[c.laddr.port]['listen'] += 1
+                elif c.status == psutil.CONN_ESTABLISHED and c.laddr.port in per_port:
+                    per_port[c.laddr.port]['established'] += 1
+            values['listen'] = sum(p['listen'] for p in per_port.values())
+            values['established'] = sum(p['established'] for p in per_port.values())
+            samples[service_name] = (values, per_port)
+
+        with self._lock:
+            for service_name, (values, per_port) in samples.items():
+                series = self._series.get(service_name)
+                if series is None:
+                    series = {name: RingBuffer(self.capacity) for name in ('time',) + METRICS}
+                    self._series[service_name] = series
+                series['time'].append(now)
+                for name in METRICS:
+                    series[name].append(values[name])
+                self._ports[service_name] = per_port
+            # Los servicios sin proceso dejan de aparecer en latest(); su
+            # historial se conserva para las gráficas.
+            for service_name in set(self._ports) - set(samples):
+                del self._ports[service_name]
+            self._active = set(samples)
+        return samples
+
+    # --- Consulta y exportación ---
+
+    def latest(self):
+        """Última muestra por servicio: métricas, conexiones por puerto y hora."""
+        with self._lock:
+            result = {}
+            for service_name, series in self._series.items():
+                if service_name not in self._active or not len(series['time']):
+                    continue
+                result[service_name] = {
+                    'time': series['time'].last(),
+                    **{name: _clean(series[name].last()) for name in METRICS},
+                    'ports': {str(port): dict(counts) for port, counts in self._ports.get(service_name, {}).items()},
+                }
+            return result
+
+    def history(self, service_name, metric):
+        """Serie completa de una métrica como lista de (timestamp, valor)."""
+        with self._lock:
+            series = self._series.get(service_name)
+            if not series:
+                return []
+            return list(zip(series['time'].values(), map(_clean, series[metric].values())))
+
+    def to_json(self):
+        return json.dumps(self.latest(), indent=2)
+
+    def to_prometheus(self):
+        """Exporta la última muestra en formato de texto de Prometheus."""
+        latest = self.latest()
+        lines = []
+        for name in METRICS:
+            metric = f"pylaragon_{name}"
+            lines.append(f"# HELP {metric} {METRIC_HELP[name]}")
+            lines.append(f"# TYPE {metric} gauge")
+            for service_name, data in latest.items():
+                if data[name] is not None:
+                    lines.append(f'{metric}{{service="{service_name}"}} {data[name]!r}')
+        lines.append("# HELP pylaragon_port_sockets Sockets por puerto y estado")
+        lines.append("# TYPE pylaragon_port_sockets gauge")
+        for service_name, data in latest.items():
+            for port, counts in data['ports'].items():
+                for state, count in counts.items():
+                    lines.append(
+                        f'pylaragon_port_sockets{{service="{service_name}",port="{port}",state="{state}"}} {count}'
+                    )
+        return "\n".join(lines) + "\n"
+
+
+def _clean(value):
+    return None if value is None or math.isnan(value) else value
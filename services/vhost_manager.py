@@ -0,0 +1,265 @@
+import json
+import os
+import re
+from pathlib import Path
+from .config_renderer import ConfigRenderer, atomic_write
+from .ssl_manager import cert_fingerprint
+
+# Subcarpetas que, si existen, se usan como DocumentRoot del proyecto (Laravel, Symfony...).
+PUBLIC_DIRS = ("public", "web", "public_html")
+
+
+class VHostManager:
+    """
+    Hosts virtuales a partir de las carpetas de `www/` y de config/vhosts.json.
+
+    Cada sitio tiene su propio include en apache/conf/vhosts/<sitio>.conf, de
+    modo que cambiar un sitio sólo reescribe su archivo. El descubrimiento es
+    incremental: un índice guarda el mtime de `www/` y de cada proyecto, y
+    sólo se vuelven a examinar las carpetas cuyo mtime cambió.
+
+    Formato de vhosts.json (todas las claves son opcionales):
+
+        {
+            "tld": ".test",
+            "auto_discover": true,
+            "sites": {
+                "tienda": {"server_name": "tienda.test", "aliases": ["www.tienda.test"],
+                           "document_root": "www/tienda/public"},
+                "legado": {"php_version": "7.4.33"},
+                "viejo": {"enabled": false}
+            }
+        }
+    """
+
+    def __init__(self, vhosts_config_path, www_path, include_dir, config, ssl_manager=None, php_handler=None):
+        self.vhosts_config_path = Path(vhosts_config_path)
+        self.www_path = Path(www_path)
+        self.include_dir = Path(include_dir)
+        self.index_path = self.include_dir / ".index.json"
+        self.config = config
+        self.ssl_manager = ssl_manager
+        # En modo FPM: versión de PHP -> destino proxy:fcgi:// (para `php_version` por sitio).
+        self.php_handler = php_handler
+        self.renderer = ConfigRenderer()
+        self._index = None
+
+    # --- Configuración declarada ---
+
+    def load_vhosts_config(self):
+        try:
+            if self.vhosts_config_path.exists() and self.vhosts_config_path.stat().st_size > 0:
+                with open(self.vhosts_config_path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+        except json.JSONDecodeError as e:
+            print(f"⚠️ Error leyendo {self.vhosts_config_path.name}: {e}. Se ignora.")
+        return {}
+
+    # --- Descubrimiento incremental ---
+
+    def _load_index(self):
+        if self._index is None:
+            try:
+                with open(self.index_path, 'r', encoding='utf-8') as f:
+                    self._index = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                self._index = {'www_mtime': None, 'projects': {}}
+        return self._index
+
+    def discover_projects(self):
+        """
+        Devuelve {carpeta: document_root} para las carpetas de proyecto de `www/`.
+        Sólo lista `www/` si su mtime cambió y sólo examina los proyectos cuyo
+        mtime cambió desde el último escaneo.
+        """
+        index = self._load_index()
+        projects = index['projects']
+        try:
+            www_mtime = self.www_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            index['www_mtime'], index['projects'] = None, {}
+            return {}
+
+        dirty = index['www_mtime'] != www_mtime
+        if dirty:
+            with os.scandir(self.www_path) as entries:
+                names = {
+                    entry.name for entry in entries
+                    if entry.is_dir() and not entry.name.startswith('.')
+                }
+            for name in set(projects) - names:
+                del projects[name]
+            for name in names - set(projects):
+                projects[name] = {'mtime': None, 'document_root': None}
+            index['www_mtime'] = www_mtime
+
+        for name, entry in list(projects.items()):
+            project_path = self.www_path / name
+            try:
+                mtime = project_path.stat().st_mtime_ns
+            except FileNotFoundError:
+                del projects[name]
+                dirty = True
+                continue
+            if entry['mtime'] != mtime:
+                entry['mtime'] = mtime
+                entry['document_root'] = self._pick_document_root(project_path).as_posix()
+                dirty = True
+
+        if dirty:
+            atomic_write(self.index_path, json.dumps(index, indent=2))
+        return {name: entry['document_root'] for name, entry in projects.items()}
+
+    def _pick_document_root(self, project_path):
+        for sub in PUBLIC_DIRS:
+            candidate = project_path / sub
+            if candidate.is_dir():
+                return candidate
+        return project_path
+
+    # --- Sitios ---
+
+    def get_sites(self):
+        """Une los proyectos descubiertos con los declarados en vhosts.json."""
+        declared = self.load_vhosts_config()
+        tld = declared.get('tld', '.test')
+        if not tld.startswith('.'):
+            tld = '.' + tld
+
+        sites = {}
+        if declared.get('auto_discover', True):
+            for name, document_root in self.discover_projects().items():
+                slug = _slug(name)
+                sites[slug] = {
+                    'name': slug,
+                    'server_name': f"{slug}{tld}",
+                    'aliases': [],
+                    'document_root': document_root,
+                }
+
+        for name, overrides in declared.get('sites', {}).items():
+            slug = _slug(name)
+            if overrides.get('enabled', True) is False:
+                sites.pop(slug, None)
+                continue
+            site = sites.get(slug, {
+                'name': slug,
+                'server_name': f"{slug}{tld}",
+                'aliases': [],
+                'document_root': (self.www_path / name).as_posix(),
+            })
+            site.update({k: v for k, v in overrides.items() if k != 'enabled'})
+            document_root = Path(site['document_root'])
+            if not document_root.is_absolute():
+                document_root = self.www_path.parent / document_root
+            site['document_root'] = document_root.as_posix()
+            sites[slug] = site
+        return sites
+
+    def get_site_handler(self, site):
+        """Destino FastCGI si el sitio fija su propia versión de PHP (sólo en modo FPM)."""
+        version = site.get('php_version')
+        if not version or self.php_handler is None or self.config.get('php_mode', 'mod_php') != 'fpm':
+            return None
+        return self.php_handler(version)
+
+    def pinned_php_versions(self):
+        """Versiones de PHP fijadas por algún sitio en vhosts.json."""
+        return sorted({site['php_version'] for site in self.get_sites().values() if site.get('php_version')})
+
+    def generate_site_conf(self, site, cert=None, handler=None):
+        aliases = " ".join(site.get('aliases') or [])
+        alias_line = f"\n    ServerAlias {aliases}" if aliases else ""
+        document_root = site['document_root']
+        body = f"""    ServerName {site['server_name']}{alias_line}
+    DocumentRoot "{document_root}"
+    <Directory "{document_root}">
+        Options Indexes FollowSymLinks
+        AllowOverride All
+        Require all granted
+    </Directory>"""
+        if handler:
+            body += f"""
+    <FilesMatch "\\.php$">
+        SetHandler "{handler}"
+    </FilesMatch>"""
+        conf = f"""# Generado por PyLaragon para '{site['name']}'. No editar: usa config/vhosts.json.
+<VirtualHost *:{self.config['apache_http_port']}>
+{body}
+</VirtualHost>
+"""
+        if cert:
+            cert_path, key_path = cert
+            conf += f"""
+<IfModule ssl_module>
+<VirtualHost *:{self.config['apache_https_port']}>
+{body}
+    SSLEngine on
+    # Certificado SHA-256: {cert_fingerprint(cert_path)}
+    SSLCertificateFile "{Path(cert_path).as_posix()}"
+    SSLCertificateKeyFile "{Path(key_path).as_posix()}"
+</VirtualHost>
+</IfModule>
+"""
+        return conf
+
+    def site_conf_path(self, site_name):
+        return self.include_dir / f"{site_name}.conf"
+
+    def sync(self):
+        """
+        Escribe sólo los includes de los sitios que cambiaron y borra los de
+        sitios que ya no existen. Devuelve {'added', 'updated', 'removed',
+        'unchanged'}; si las tres primeras están vacías no hace falta recargar Apache.
+        """
+        sites = self.get_sites()
+        summary = {'added': [], 'updated': [], 'removed': [], 'unchanged': 0}
+        self.include_dir.mkdir(parents=True, exist_ok=True)
+
+        certs = {}
+        if self.ssl_manager and self.config.get('vhost_ssl', True):
+            hosts = {site['server_name']: list(site.get('aliases') or []) for site in sites.values()}
+            certs = self.ssl_manager.ensure_certs(hosts) or {}
+
+        for name, site in sites.items():
+            path = self.site_conf_path(name)
+            existed = path.exists()
+            cert = certs.get(site['server_name'])
+            handler = self.get_site_handler(site)
+            inputs = {
+                'site': site,
+                'http_port': self.config['apache_http_port'],
+                'https_port': self.config['apache_https_port'],
+                'cert': cert,
+                'handler': handler,
+                # La huella va también en el include: una renovación lo cambia y Apache se recarga.
+                'cert_fingerprint': cert_fingerprint(cert[0]) if cert else None,
+            }
+            result = self.renderer.render(
+                path, inputs,
+                lambda site=site, cert=cert, handler=handler: self.generate_site_conf(site, cert, handler),
+            )
+            if not result.changed:
+                summary['unchanged'] += 1
+            elif existed:
+                summary['updated'].append(name)
+            else:
+                summary['added'].append(name)
+
+        for path in self.include_dir.glob("*.conf"):
+            if path.stem not in sites:
+                path.unlink()
+                summary['removed'].append(path.stem)
+
+        if summary['added'] or summary['updated'] or summary['removed']:
+            print(
+                f"🌐 Hosts virtuales: {len(summary['added'])} nuevos, "
+                f"{len(summary['updated'])} actualizados, {len(summary['removed'])} eliminados."
+            )
+        return summary
+
+
+def _slug(name):
+    """Nombre de carpeta -> etiqueta DNS válida (también usada como nombre de archivo)."""
+    slug = re.sub(r'[^a-z0-9-]+', '-', name.lower()).strip('-')
+    return slug or 'sitio'
@@ -0,0 +1,66 @@
+import json
+import random
+
+from services.benchmark import SUB_BUCKET_HALF, LatencyHistogram
+
+
+def test_small_values_are_exact():
+    for value in range(2 * SUB_BUCKET_HALF):
+        index = LatencyHistogram.index_of(value)
+        assert LatencyHistogram.lowest(index) == LatencyHistogram.highest(index) == value
+
+
+def test_buckets_contain_their_values_within_relative_error():
+    rng = random.Random(1)
+    for _ in range(5000):
+        value = rng.randrange(1, 10**9)
+        index = LatencyHistogram.index_of(value)
+        low, high = LatencyHistogram.lowest(index), LatencyHistogram.highest(index)
+        assert low <= value <= high
+        assert (high - low) / low <= 1 / SUB_BUCKET_HALF
+
+
+def test_percentiles():
+    histogram = LatencyHistogram()
+    for micros in range(1, 1001):
+        histogram.record(micros)
+    assert histogram.total == 1000
+    assert histogram.min == 1
+    assert histogram.max == 1000
+    # Los percentiles redondean hacia arriba al final del cubo, sin pasar del máximo.
+    assert 500 <= histogram.percentile(50) <= 500 * (1 + 1 / SUB_BUCKET_HALF)
+    assert 990 <= histogram.percentile(99) <= 1000
+    assert histogram.percentile(100) == 1000
+    assert histogram.mean() == 500.5
+
+
+def test_empty_histogram():
+    histogram = LatencyHistogram()
+    assert histogram.percentile(50) is None
+    assert histogram.mean() is None
+    assert histogram.summary_ms() == {}
+
+
+def test_merge():
+    a, b = LatencyHistogram(), LatencyHistogram()
+    for micros in (10, 20, 30):
+        a.record(micros)
+    for micros in (5, 5000):
+        b.record(micros)
+    a.merge(b)
+    assert a.total == 5
+    assert (a.min, a.max) == (5, 5000)
+    assert a.sum == 10 + 20 + 30 + 5 + 5000
+
+
+def test_round_trip_through_json():
+    histogram = LatencyHistogram()
+    for micros in (3, 150, 2500, 2600, 90000):
+        histogram.record(micros)
+    restored = LatencyHistogram.from_dict(json.loads(json.dumps(histogram.to_dict())))
+    assert restored.counts == histogram.counts
+    assert restored.total == histogram.total
+    # Sólo se guardan los cubos: el máximo exacto pasa a ser el final de su cubo.
+    for q in (50, 90, 99):
+        original = histogram.percentile(q)
+        assert original <= restored.percentile(q) <= original * (1 + 1 / SUB_BUCKET_HALF)
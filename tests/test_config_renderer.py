@@ -0,0 +1,69 @@
+import pytest
+
+from services.config_renderer import ConfigRenderer, InvalidConfigError, atomic_write, inputs_digest
+
+
+def test_inputs_digest_is_stable():
+    assert inputs_digest({'a': 1, 'b': [1, 2]}) == inputs_digest({'b': [1, 2], 'a': 1})
+    assert inputs_digest({'a': 1}) != inputs_digest({'a': 2})
+
+
+def test_render_writes_only_on_change(tmp_path):
+    path = tmp_path / "httpd.conf"
+    renderer = ConfigRenderer()
+    calls = []
+
+    def render():
+        calls.append(1)
+        return "Listen 80\n"
+
+    first = renderer.render(path, {'port': 80}, render)
+    assert first.changed
+    assert path.read_text() == "Listen 80\n"
+
+    second = renderer.render(path, {'port': 80}, render)
+    assert not second.changed
+    assert second.digest == first.digest
+    # Con las mismas entradas ni siquiera se vuelve a generar el texto.
+    assert len(calls) == 1
+
+
+def test_same_content_from_new_inputs_is_not_a_change(tmp_path):
+    path = tmp_path / "php-fpm.conf"
+    renderer = ConfigRenderer()
+    renderer.render(path, {'v': 1}, lambda: "pm = dynamic\n")
+    assert not renderer.render(path, {'v': 2}, lambda: "pm = dynamic\n").changed
+
+
+def test_external_edit_is_overwritten(tmp_path):
+    path = tmp_path / "my.ini"
+    renderer = ConfigRenderer()
+    renderer.render(path, {}, lambda: "[mysqld]\n")
+    path.write_text("[mysqld]\nport=1\n")
+    assert renderer.render(path, {}, lambda: "[mysqld]\n").changed
+    assert path.read_text() == "[mysqld]\n"
+
+
+def test_invalid_content_leaves_live_file(tmp_path):
+    path = tmp_path / "httpd.conf"
+    path.write_text("Listen 80\n")
+    renderer = ConfigRenderer()
+
+    def validate(tmp):
+        assert tmp != path and tmp.parent == path.parent
+        return "Bogus" not in tmp.read_text(), "Invalid command 'Bogus'"
+
+    with pytest.raises(InvalidConfigError, match="Bogus"):
+        renderer.render(path, {'v': 1}, lambda: "Bogus\n", validate)
+    assert path.read_text() == "Listen 80\n"
+    assert [p.name for p in tmp_path.iterdir()] == ["httpd.conf"]
+    # Lo rechazado no se recuerda: la siguiente llamada lo vuelve a validar.
+    with pytest.raises(InvalidConfigError):
+        renderer.render(path, {'v': 1}, lambda: "Bogus\n", validate)
+    assert renderer.render(path, {'v': 2}, lambda: "Listen 8080\n", validate).changed
+
+
+def test_atomic_write_creates_parents(tmp_path):
+    path = tmp_path / "a" / "b" / "state.json"
+    atomic_write(path, "{}")
+    assert path.read_text() == "{}"
@@ -0,0 +1,84 @@
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+from services.config_watcher import ConfigWatcher, _Polling, affected_services, classify_changes
+
+BASE = Path("/srv/pylaragon")
+CONFIG = BASE / "config" / "services.json"
+VHOSTS = BASE / "config" / "vhosts.json"
+WWW = BASE / "www"
+SERVICES = ['apache', 'mysql', 'php_fpm', 'php_fpm@7.4.33', 'redis']
+
+
+def classify(*paths):
+    return classify_changes(paths, CONFIG, VHOSTS, WWW)
+
+
+def test_config_files():
+    assert classify(CONFIG)['config']
+    assert classify(VHOSTS)['vhosts']
+    plan = classify(CONFIG.parent)
+    assert plan['config'] and plan['vhosts']
+
+
+def test_www_changes():
+    assert classify(WWW / "blog")['vhosts']
+    assert classify(WWW / "blog" / "public")['vhosts']
+    assert classify(WWW / "blog" / "public" / "app.css")['assets']
+    plan = classify(WWW / "blog" / "src" / "index.php", BASE / "logs" / "apache.log")
+    assert plan == {'config': False, 'vhosts': False, 'assets': False, 'ignored': 2}
+
+
+def test_affected_services_by_key():
+    assert affected_services(['mysql_port'], SERVICES) == ['mysql']
+    # Los pools FPM van antes que Apache.
+    assert affected_services(['php_profile'], SERVICES) == ['php_fpm', 'php_fpm@7.4.33', 'apache']
+    assert affected_services(['redis_port'], SERVICES) == ['php_fpm', 'php_fpm@7.4.33', 'apache', 'redis']
+
+
+def test_keys_without_reload():
+    assert affected_services(['restart_policy', 'php_version', 'snapshot_workers'], SERVICES) == []
+
+
+def test_unknown_key_affects_everything():
+    assert sorted(affected_services(['something_new'], SERVICES)) == sorted(SERVICES)
+
+
+def test_polling_backend_reports_changes(tmp_path):
+    backend = _Polling([(tmp_path, True)], interval=0.01)
+    (tmp_path / "site").mkdir()
+    (tmp_path / "site" / "index.php").write_text("<?php")
+    (tmp_path / ".hidden").write_text("x")
+    changed = set(backend.read(0.01))
+    assert changed == {tmp_path / "site", tmp_path / "site" / "index.php"}
+    assert backend.read(0.01) == []
+
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason="inotify sólo existe en Linux")
+def test_watcher_falls_back_to_polling_when_backend_fails(tmp_path):
+    batches = []
+
+    def seen():
+        return any(tmp_path / "services.json" in batch for batch in batches)
+
+    watcher = ConfigWatcher([(tmp_path, True)], lambda batch, first: batches.append(batch),
+                            debounce=0.05, poll_interval=0.05)
+    watcher.start()
+    try:
+        def fail(timeout):
+            raise OSError(28, "No space left on device")
+        watcher.backend.read = fail
+        time.sleep(0.6)
+        assert isinstance(watcher.backend, _Polling)
+        (tmp_path / "services.json").write_text("{}")
+        deadline = time.monotonic() + 5
+        while not seen() and time.monotonic() < deadline:
+            time.sleep(0.05)
+    finally:
+        watcher.stop()
+    # Primero un lote con la raíz para revisarlo todo; luego el cambio nuevo.
+    assert batches[0] == {tmp_path}
+    assert seen()
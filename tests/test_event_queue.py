@@ -0,0 +1,40 @@
+import threading
+
+from gui.event_queue import CoalescingQueue
+
+
+def test_same_key_keeps_last_value():
+    queue = CoalescingQueue()
+    queue.put(('status', 'apache'), False)
+    queue.put(('status', 'mysql'), True)
+    queue.put(('status', 'apache'), True)
+    # Orden de la primera aparición de cada clave, valor de la última.
+    assert queue.drain() == [(('status', 'apache'), True), (('status', 'mysql'), True)]
+    assert queue.received == 3
+    assert queue.coalesced == 1
+
+
+def test_drain_empties_the_queue():
+    queue = CoalescingQueue()
+    queue.put('log')
+    assert queue.drain() == [('log', None)]
+    assert queue.drain() == []
+
+
+def test_concurrent_producers():
+    queue = CoalescingQueue()
+
+    def produce(worker):
+        for i in range(1000):
+            queue.put(('status', worker % 4), i)
+
+    threads = [threading.Thread(target=produce, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    events = queue.drain()
+    assert len(events) == 4
+    assert all(value == 999 for _, value in events)
+    assert queue.received == 8000
+    assert queue.coalesced == 8000 - 4
@@ -0,0 +1,58 @@
+import threading
+
+import pytest
+
+from services.orchestrator import run_in_dependency_order, topological_order
+
+STACK = {
+    'mysql': [],
+    'php_fpm': [],
+    'apache': ['php_fpm', 'mysql'],
+}
+
+
+def test_dependencies_come_first():
+    order = topological_order(STACK)
+    assert sorted(order) == sorted(STACK)
+    assert order.index('apache') > order.index('php_fpm')
+    assert order.index('apache') > order.index('mysql')
+
+
+def test_cycle_is_reported():
+    with pytest.raises(ValueError, match="circular"):
+        topological_order({'a': ['b'], 'b': ['c'], 'c': ['a']})
+
+
+def test_runs_after_dependencies():
+    finished = []
+    lock = threading.Lock()
+
+    def action(name):
+        with lock:
+            finished.append(name)
+        return True
+
+    results = run_in_dependency_order(STACK, action)
+    assert all(r['ok'] for r in results.values())
+    assert finished[-1] == 'apache'
+
+
+def test_failed_dependency_skips_dependents():
+    results = run_in_dependency_order(STACK, lambda name: name != 'mysql')
+    assert results['mysql']['ok'] is False
+    assert results['php_fpm']['ok'] is True
+    assert results['apache'].get('skipped') is True
+
+
+def test_reverse_stops_dependents_first_and_skips_nothing():
+    finished = []
+    lock = threading.Lock()
+
+    def action(name):
+        with lock:
+            finished.append(name)
+        return name != 'apache'
+
+    results = run_in_dependency_order(STACK, action, reverse=True)
+    assert finished[0] == 'apache'
+    assert not any(r.get('skipped') for r in results.values())
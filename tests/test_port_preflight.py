@@ -0,0 +1,53 @@
+import os
+import socket
+
+import pytest
+
+from services.port_preflight import check_ports, find_free_port, port_is_free, scan_listeners
+
+
+def listening_socket():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.bind(('127.0.0.1', 0))
+    sock.listen()
+    return sock
+
+
+def test_busy_port_is_reported():
+    sock = listening_socket()
+    port = sock.getsockname()[1]
+    try:
+        assert port_is_free(port)[0] is False
+        conflicts = check_ports({'apache_http_port': port})
+        assert [c['key'] for c in conflicts] == ['apache_http_port']
+    finally:
+        sock.close()
+
+
+def test_own_process_is_not_a_conflict():
+    sock = listening_socket()
+    port = sock.getsockname()[1]
+    try:
+        if scan_listeners([port]) is None:
+            pytest.skip("el sistema no deja listar los sockets en escucha")
+        assert check_ports({'mysql_port': port}, own_pids=[os.getpid()]) == []
+    finally:
+        sock.close()
+
+
+def test_find_free_port_skips_busy_and_excluded():
+    sock = listening_socket()
+    busy = sock.getsockname()[1]
+    try:
+        # El alternativo de un puerto cualquiera empieza en el siguiente.
+        found = find_free_port(busy - 1, exclude={busy + 1})
+        assert found is not None
+        assert found not in (busy, busy + 1)
+        assert found > busy - 1
+    finally:
+        sock.close()
+
+
+def test_privileged_ports_fall_back_to_8080_range():
+    found = find_free_port(80)
+    assert found is None or 8080 <= found < 9080
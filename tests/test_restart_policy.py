@@ -0,0 +1,76 @@
+import os
+
+import pytest
+
+from services.restart_policy import RestartTracker, describe_exit
+
+
+def test_on_failure_ignores_clean_exit():
+    tracker = RestartTracker('on-failure')
+    assert tracker.record_exit(0, uptime=5)['action'] == 'none'
+    assert tracker.record_exit(1, uptime=5)['action'] == 'restart'
+
+
+def test_clean_exit_is_not_a_crash():
+    tracker = RestartTracker('on-failure', max_crashes=2)
+    for _ in range(5):
+        tracker.record_exit(0, uptime=0.1)
+    assert tracker.state()['crashes'] == 0
+    assert tracker.record_exit(1, uptime=0.1)['action'] == 'restart'
+    assert tracker.state()['crashes'] == 1
+
+
+def test_never_and_always():
+    assert RestartTracker('never').record_exit(1, uptime=5)['action'] == 'none'
+    assert RestartTracker('always').record_exit(0, uptime=5)['action'] == 'restart'
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        RestartTracker('sometimes')
+
+
+def test_backoff_doubles_up_to_max():
+    tracker = RestartTracker(backoff=1.0, max_backoff=5.0, max_crashes=100)
+    delays = [tracker.record_exit(1, uptime=0.1)['delay'] for _ in range(5)]
+    assert delays == [1.0, 2.0, 4.0, 5.0, 5.0]
+
+
+def test_long_uptime_resets_backoff():
+    tracker = RestartTracker(backoff=1.0, reset_after=60.0, max_crashes=100)
+    tracker.record_exit(1, uptime=1)
+    tracker.record_exit(1, uptime=1)
+    assert tracker.record_exit(1, uptime=120)['delay'] == 1.0
+
+
+def test_crash_loop_gives_up_until_manual_start():
+    tracker = RestartTracker(max_crashes=3, window=60.0)
+    actions = [tracker.record_exit(1, uptime=0.1)['action'] for _ in range(3)]
+    assert actions == ['restart', 'restart', 'gave-up']
+    assert tracker.state()['gave_up']
+
+    # Un arranque manual olvida las caídas anteriores.
+    tracker.reset()
+    assert not tracker.gave_up
+    entry = tracker.record_exit(1, uptime=0.1)
+    assert entry['action'] == 'restart'
+    assert entry['delay'] == tracker.backoff
+
+
+def test_state_omits_log_tail():
+    tracker = RestartTracker()
+    tracker.record_exit(2, uptime=3, log_tail=["fatal"])
+    state = tracker.state()
+    assert state['crashes'] == 1
+    assert state['last_crash']['returncode'] == 2
+    assert 'log_tail' not in state['last_crash']
+
+
+def test_describe_exit():
+    assert describe_exit(None) == (None, None)
+    assert describe_exit(3) == (3, None)
+
+
+@pytest.mark.skipif(os.name == 'nt', reason="sólo POSIX informa la señal con un código negativo")
+def test_describe_exit_signal():
+    assert describe_exit(-9) == (None, 'SIGKILL')
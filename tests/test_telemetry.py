@@ -0,0 +1,23 @@
+import os
+
+from services.telemetry import ResourceSampler
+
+
+def test_latest_drops_services_without_process():
+    pids = {'apache': os.getpid()}
+    sampler = ResourceSampler(lambda: dict(pids))
+    sampler.sample_once()
+    assert list(sampler.latest()) == ['apache']
+    assert sampler.latest()['apache']['rss'] > 0
+
+    pids.clear()
+    sampler.sample_once()
+    assert sampler.latest() == {}
+    # El historial sigue disponible para las gráficas.
+    assert len(sampler.history('apache', 'rss')) == 1
+
+
+def test_dead_pid_is_not_reported():
+    sampler = ResourceSampler(lambda: {'mysql': 2 ** 22 + 12345})
+    assert sampler.sample_once() == {}
+    assert sampler.latest() == {}